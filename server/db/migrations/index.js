@@ -660,6 +660,189 @@ const MIGRATIONS = [
       console.log('Revert migration 19 complete.');
     }
   },
+  {
+    version: 20,
+    description: 'Create snippet selection pool for O(1) random snippet lookup',
+    up: async (client) => {
+      console.log('Migration 20: creating snippet_pool / snippet_pool_buckets');
+      // Every snippet gets a dense position (0..size-1) inside its
+      // (category, difficulty, subject) bucket, so Snippet.getRandom can pick a
+      // random row with two index lookups instead of ORDER BY RANDOM().
+      // Triggers on snippets keep it in step with every write (Snippet.create,
+      // seed scripts, edits, deletes); server/scraping's `pipeline.py sync-pool`
+      // (snippet_pipeline/selection_pool.py) checks and repairs it.
+      await client.query(`
+        CREATE TABLE IF NOT EXISTS snippet_pool (
+          category VARCHAR(100) NOT NULL,
+          difficulty INT NOT NULL,
+          subject VARCHAR(3) NOT NULL DEFAULT '',
+          position INT NOT NULL,
+          snippet_id INT NOT NULL UNIQUE REFERENCES snippets(id) ON DELETE CASCADE,
+          PRIMARY KEY (category, difficulty, subject, position)
+        );
+
+        CREATE TABLE IF NOT EXISTS snippet_pool_buckets (
+          category VARCHAR(100) NOT NULL,
+          difficulty INT NOT NULL,
+          subject VARCHAR(3) NOT NULL DEFAULT '',
+          size INT NOT NULL DEFAULT 0,
+          PRIMARY KEY (category, difficulty, subject)
+        );
+
+        WITH numbered AS (
+          SELECT id, category, difficulty,
+                 COALESCE(SUBSTRING(course_name FROM 1 FOR 3), '') AS subject,
+                 ROW_NUMBER() OVER (
+                   PARTITION BY category, difficulty, COALESCE(SUBSTRING(course_name FROM 1 FOR 3), '')
+                   ORDER BY id
+                 ) - 1 AS position
+          FROM snippets
+          WHERE category IS NOT NULL AND difficulty IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM snippet_pool p WHERE p.snippet_id = snippets.id)
+        )
+        INSERT INTO snippet_pool (category, difficulty, subject, position, snippet_id)
+        SELECT category, difficulty, subject, position, id FROM numbered;
+
+        INSERT INTO snippet_pool_buckets (category, difficulty, subject, size)
+        SELECT category, difficulty, subject, COUNT(*) FROM snippet_pool
+        GROUP BY category, difficulty, subject
+        ON CONFLICT (category, difficulty, subject) DO UPDATE SET size = EXCLUDED.size;
+
+        -- append a snippet to the end of its bucket; the bucket upsert row-locks
+        -- the bucket, so concurrent inserts into one bucket get distinct positions
+        CREATE OR REPLACE FUNCTION snippet_pool_add(p_id INT, p_category VARCHAR, p_difficulty INT, p_subject VARCHAR)
+        RETURNS void AS $$
+        DECLARE
+          new_size INT;
+        BEGIN
+          IF p_category IS NULL OR p_difficulty IS NULL THEN
+            RETURN;
+          END IF;
+          INSERT INTO snippet_pool_buckets AS b (category, difficulty, subject, size)
+          VALUES (p_category, p_difficulty, p_subject, 1)
+          ON CONFLICT (category, difficulty, subject) DO UPDATE SET size = b.size + 1
+          RETURNING size INTO new_size;
+          INSERT INTO snippet_pool (category, difficulty, subject, position, snippet_id)
+          VALUES (p_category, p_difficulty, p_subject, new_size - 1, p_id);
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- take a snippet out of its bucket and move the bucket's last snippet into
+        -- the freed position, so positions stay dense (no holes for getRandom)
+        CREATE OR REPLACE FUNCTION snippet_pool_remove(p_id INT)
+        RETURNS void AS $$
+        DECLARE
+          slot snippet_pool%ROWTYPE;
+          freed INT;
+          last_pos INT;
+        BEGIN
+          SELECT * INTO slot FROM snippet_pool WHERE snippet_id = p_id;
+          IF NOT FOUND THEN
+            RETURN;
+          END IF;
+          -- lock the bucket before touching its rows: removals from one bucket queue up here
+          UPDATE snippet_pool_buckets SET size = size - 1
+          WHERE (category, difficulty, subject) = (slot.category, slot.difficulty, slot.subject)
+          RETURNING size INTO last_pos;
+          -- re-read the position under the lock (a concurrent removal may have moved it)
+          DELETE FROM snippet_pool WHERE snippet_id = p_id RETURNING position INTO freed;
+          IF freed IS NOT NULL AND last_pos IS NOT NULL AND freed <> last_pos THEN
+            UPDATE snippet_pool SET position = freed
+            WHERE (category, difficulty, subject, position)
+                  = (slot.category, slot.difficulty, slot.subject, last_pos);
+          END IF;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION snippets_sync_pool()
+        RETURNS trigger AS $$
+        BEGIN
+          IF TG_OP = 'UPDATE'
+             AND (NEW.category, NEW.difficulty, COALESCE(SUBSTRING(NEW.course_name FROM 1 FOR 3), ''))
+                 IS NOT DISTINCT FROM
+                 (OLD.category, OLD.difficulty, COALESCE(SUBSTRING(OLD.course_name FROM 1 FOR 3), '')) THEN
+            RETURN NEW;
+          END IF;
+          IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM snippet_pool_remove(OLD.id);
+          END IF;
+          IF TG_OP = 'DELETE' THEN
+            RETURN OLD;
+          END IF;
+          PERFORM snippet_pool_add(NEW.id, NEW.category, NEW.difficulty,
+                                   COALESCE(SUBSTRING(NEW.course_name FROM 1 FOR 3), ''));
+          RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS snippets_pool_write ON snippets;
+        CREATE TRIGGER snippets_pool_write
+          AFTER INSERT OR UPDATE OF category, difficulty, course_name ON snippets
+          FOR EACH ROW EXECUTE FUNCTION snippets_sync_pool();
+
+        -- BEFORE, so the slot is refilled before ON DELETE CASCADE drops the pool row
+        DROP TRIGGER IF EXISTS snippets_pool_delete ON snippets;
+        CREATE TRIGGER snippets_pool_delete
+          BEFORE DELETE ON snippets
+          FOR EACH ROW EXECUTE FUNCTION snippets_sync_pool();
+      `);
+      console.log('Migration 20 complete.');
+    },
+    down: async (client) => {
+      console.log('Reverting migration 20: dropping snippet selection pool');
+      await client.query(`
+        DROP TRIGGER IF EXISTS snippets_pool_write ON snippets;
+        DROP TRIGGER IF EXISTS snippets_pool_delete ON snippets;
+        DROP FUNCTION IF EXISTS snippets_sync_pool();
+        DROP FUNCTION IF EXISTS snippet_pool_remove(INT);
+        DROP FUNCTION IF EXISTS snippet_pool_add(INT, VARCHAR, INT, VARCHAR);
+        DROP TABLE IF EXISTS snippet_pool;
+        DROP TABLE IF EXISTS snippet_pool_buckets;
+      `);
+      console.log('Revert migration 20 complete.');
+    }
+  },
+  {
+    version: 21,
+    description: 'Add snippet difficulty features and per-category difficulty quantile edges',
+    up: async (client) => {
+      console.log('Migration 21: adding snippet difficulty features / snippet_difficulty_edges');
+      // Typing-difficulty features computed on import (server/scraping,
+      // snippet_pipeline/difficulty.py); difficulty is bucketed by the
+      // per-category quantile cut points stored in snippet_difficulty_edges.
+      await client.query(`
+        ALTER TABLE snippets
+        ADD COLUMN IF NOT EXISTS punctuation_density DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS digit_density DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS capital_density DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS avg_word_length DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS rare_bigram_cost DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS difficulty_score DOUBLE PRECISION;
+
+        CREATE TABLE IF NOT EXISTS snippet_difficulty_edges (
+          category VARCHAR(100) PRIMARY KEY,
+          edges DOUBLE PRECISION[] NOT NULL,
+          computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+      `);
+      console.log('Migration 21 complete.');
+    },
+    down: async (client) => {
+      console.log('Reverting migration 21: dropping snippet difficulty features');
+      await client.query(`
+        DROP TABLE IF EXISTS snippet_difficulty_edges;
+
+        ALTER TABLE snippets
+        DROP COLUMN IF EXISTS punctuation_density,
+        DROP COLUMN IF EXISTS digit_density,
+        DROP COLUMN IF EXISTS capital_density,
+        DROP COLUMN IF EXISTS avg_word_length,
+        DROP COLUMN IF EXISTS rare_bigram_cost,
+        DROP COLUMN IF EXISTS difficulty_score;
+      `);
+      console.log('Revert migration 21 complete.');
+    }
+  },
 ];
 
 // Create migrations table if it doesn't exist
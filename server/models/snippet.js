@@ -8,11 +8,71 @@ const sanitizeSnippetText = (text) => {
   return text.replace(/(?:\r?\n)+\s*$/u, '');
 };
 
+// Random pick via the selection pool (migration 20, kept current by triggers on
+// snippets): draw one position across the matching (category, difficulty,
+// subject) buckets, then fetch that snippet by key. Returns null when the pool
+// has nothing for these filters or the draw misses (a pool that has not been
+// migrated or synced yet), so the caller can fall back to ORDER BY RANDOM().
+const getRandomFromPool = async ({ difficulty, category, subject }) => {
+  const conditions = ['size > 0'];
+  const queryParams = [];
+  let paramIndex = 1;
+
+  if (difficulty) {
+    conditions.push(`difficulty = $${paramIndex++}`);
+    queryParams.push(difficulty);
+  }
+
+  if (category) {
+    conditions.push(`category = $${paramIndex++}`);
+    queryParams.push(category);
+
+    if (category === 'course-reviews' && subject) {
+      conditions.push(`subject = $${paramIndex++}`);
+      queryParams.push(subject);
+    }
+  }
+
+  const query = `
+    WITH buckets AS (
+      SELECT category, difficulty, subject, size,
+             SUM(size) OVER (ORDER BY category, difficulty, subject) - size AS first_pos
+      FROM snippet_pool_buckets
+      WHERE ${conditions.join(' AND ')}
+    ),
+    pick AS (
+      SELECT FLOOR(RANDOM() * SUM(size))::int AS n FROM buckets
+    )
+    SELECT s.*
+    FROM pick
+    JOIN buckets b ON pick.n >= b.first_pos AND pick.n < b.first_pos + b.size
+    JOIN snippet_pool p
+      ON p.category = b.category AND p.difficulty = b.difficulty
+     AND p.subject = b.subject AND p.position = pick.n - b.first_pos
+    JOIN snippets s ON s.id = p.snippet_id`;
+
+  try {
+    const result = await db.query(query, queryParams);
+    return result.rows[0] || null;
+  } catch (err) {
+    if (err.code === '42P01') return null; // migration 20 not run yet
+    throw err;
+  }
+};
+
 // Snippet model for managing text snippets
 const Snippet = {
   // Get a random snippet based on optional filters
   async getRandom(filters = {}) {
     try {
+      const pooled = await getRandomFromPool(filters);
+      if (pooled) {
+        if (typeof pooled.text === 'string') {
+          pooled.text = sanitizeSnippetText(pooled.text);
+        }
+        return pooled;
+      }
+
       const { difficulty, category, subject } = filters;
       let query = 'SELECT * FROM snippets';
       const conditions = [];
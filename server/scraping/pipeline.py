@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+"""pipeline.py  – command line for the snippet_pipeline package (see snippet_pipeline/cli.py)."""
+
+from snippet_pipeline.cli import main
+
+if __name__ == "__main__":
+    main()
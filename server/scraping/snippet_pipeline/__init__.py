@@ -0,0 +1,31 @@
+"""
+snippet_pipeline  – the course-evaluation → TigerType snippet pipeline as an
+importable package. Every stage is a module with `add_arguments(parser)` and
+`run(args)`; nothing runs at import time and the heavy dependencies (`openai`,
+`psycopg2`) are only imported once a stage actually starts.
+
+  • extract    – comments → snippets via OpenAI    (process_evals.py)
+  • load       – snippets → public.snippets        (import_snippets.py)
+  • dedupe     – fold repeated comments before extract (dedupe-raw)
+  • prefilter  – train / evaluate the local pre-filter
+  • bench      – normalization throughput benchmark
+  • bench_e2e  – offline extract + import benchmark (fake_openai.py, synthetic.py)
+  • selection_pool – snippet_pool index behind Snippet.getRandom (sync-pool)
+  • renormalize – re-apply the import rules to rows already in the table
+  • difficulty – typing-difficulty features + per-category quantile buckets
+
+Command line: `python3 server/scraping/pipeline.py <stage> [options]`
+(see cli.py); `pipeline.py all` runs extract and load in one process,
+`pipeline.py stream` runs them concurrently (stream.py).
+
+SNIPPET_PIPELINE_DATA_DIR (shell env only, read at import) moves every
+intermediate file out of server/scraping/data/ – the benchmark uses it to
+run the real pipeline against a scratch directory.
+"""
+
+import os
+from pathlib import Path
+
+SCRAPING_DIR = Path(__file__).resolve().parent.parent
+PROJECT_ROOT = SCRAPING_DIR.parent.parent
+DATA_DIR     = Path(os.getenv("SNIPPET_PIPELINE_DATA_DIR") or SCRAPING_DIR / "data")
@@ -0,0 +1,120 @@
+"""
+batch_api.py  – thin interface over the OpenAI Batch API used by
+`process_evals.py --batch`.
+
+process_evals.py only talks to a `BatchBackend`, so the whole
+write → submit → poll → download flow can be exercised without the network:
+
+  • OpenAIBatchBackend  – the real thing (files.create / batches.create / …)
+  • LocalBatchBackend   – file-based stand-in that answers every request in a
+                          directory with a caller-supplied `responder(body)`;
+                          `--batch-backend local` wires it to fake_openai's answers
+"""
+
+import json, shutil, uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+ENDPOINT          = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+
+# statuses after which a batch will never change again
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchBackend(ABC):
+    """What process_evals.py needs from a batch provider."""
+
+    @abstractmethod
+    def submit(self, request_path: Path) -> str:
+        """Upload a JSONL request file and start a batch; returns the batch id."""
+
+    @abstractmethod
+    def status(self, batch_id: str) -> dict:
+        """{'status': ..., 'output_file_id': ..., 'error_file_id': ..., 'counts': ...}"""
+
+    @abstractmethod
+    def iter_results(self, file_id: str):
+        """Yield the decoded JSON objects of a result/error file, one per line."""
+
+
+class OpenAIBatchBackend(BatchBackend):
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, request_path):
+        with request_path.open("rb") as f:
+            upload = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id     = upload.id,
+            endpoint          = ENDPOINT,
+            completion_window = COMPLETION_WINDOW,
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        b = self.client.batches.retrieve(batch_id)
+        counts = getattr(b, "request_counts", None)
+        return {
+            "status"        : b.status,
+            "output_file_id": b.output_file_id,
+            "error_file_id" : b.error_file_id,
+            "counts"        : (f"{counts.completed}/{counts.total} done, {counts.failed} failed"
+                               if counts else ""),
+        }
+
+    def iter_results(self, file_id):
+        # stream the file instead of pulling the whole body into memory
+        with self.client.files.with_streaming_response.content(file_id) as resp:
+            for line in resp.iter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    File-based stand-in: `submit` immediately answers every request with
+    `responder(body) -> str` (the assistant message content) and writes an
+    OpenAI-shaped result file next to the request file.
+    """
+
+    def __init__(self, work_dir: Path, responder):
+        self.work_dir  = Path(work_dir)
+        self.responder = responder
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+
+    def submit(self, request_path):
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        inp = self.work_dir / f"{batch_id}_input.jsonl"
+        out = self.work_dir / f"{batch_id}_output.jsonl"
+        shutil.copyfile(request_path, inp)
+        with inp.open(encoding="utf-8") as src, out.open("w", encoding="utf-8") as dst:
+            for line in src:
+                if not line.strip():
+                    continue
+                req = json.loads(line)
+                content = self.responder(req["body"])
+                dst.write(json.dumps({
+                    "id"       : f"resp_{uuid.uuid4().hex[:12]}",
+                    "custom_id": req["custom_id"],
+                    "response" : {
+                        "status_code": 200,
+                        "body": {"choices": [{"message": {"role": "assistant", "content": content}}]},
+                    },
+                    "error"    : None,
+                }, ensure_ascii=False) + "\n")
+        return batch_id
+
+    def status(self, batch_id):
+        return {
+            "status"        : "completed",
+            "output_file_id": str(self.work_dir / f"{batch_id}_output.jsonl"),
+            "error_file_id" : None,
+            "counts"        : "",
+        }
+
+    def iter_results(self, file_id):
+        with open(file_id, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
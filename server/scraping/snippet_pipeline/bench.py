@@ -0,0 +1,57 @@
+"""
+bench.py  – throughput of import_snippets.py's normalization pipeline
+(snippet_rows.iter_rows) for different --workers counts, on synthetic records.
+No database needed; the DB writer is simulated by a fixed cost per row so the
+overlap between normalization and upload shows up in the numbers.
+
+    python3 server/scraping/pipeline.py bench-import --records 200000 --workers 1 2 4 8
+"""
+
+import os, random, time
+
+from .snippet_rows import iter_rows
+
+WORDS = ("the", "psets", "were", "brutal", "but", "Professor", "Kernighan", "made",
+         "lecture", "worth", "it", "—", "honestly", "“best", "class”", "I've", "taken…",
+         "office", "hours", "saved", "me", "’cause", "midterm", "was", "rough")
+
+def synthetic_records(n, seed=0):
+    rnd = random.Random(seed)
+    for i in range(n):
+        text = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(10, 50)))
+        yield {
+            "text": text + ("\n\n" if i % 7 == 0 else ""),
+            "source": "Princeton Course Reviews",
+            "category": "course-reviews",
+            "original_url": f"https://registrarapps.princeton.edu/course-evaluation?terminfo=1252&courseinfo={i % 100000:06d}",
+            "course_name": "COS 126: General Computer Science",
+        }
+
+def _time(n, workers, write_us):
+    t0, rows = time.perf_counter(), 0
+    for row in iter_rows(synthetic_records(n), workers=workers):
+        if row is not None:
+            rows += 1
+            if write_us:
+                # busy-wait: stands in for the single writer's per-row cost
+                end = time.perf_counter() + write_us / 1e6
+                while time.perf_counter() < end:
+                    pass
+    return rows, time.perf_counter() - t0
+
+DESCRIPTION = 'Benchmark import_snippets.py normalization.'
+
+def add_arguments(parser):
+    parser.add_argument('--records', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 4])
+    parser.add_argument('--write-us', type=float, default=0.0,
+                        help='simulated DB-writer cost per row in µs (0 = normalization only)')
+
+def run(args):
+    print(f"🔹 {args.records} synthetic records, simulated write cost {args.write_us} µs/row")
+    base = None
+    for w in args.workers:
+        rows, secs = _time(args.records, w, args.write_us)
+        rate = rows / secs
+        base = base or rate
+        print(f"  workers={w:<3} {rate:10,.0f} rows/s  ({secs:0.2f}s, {rate / base:0.2f}×)")
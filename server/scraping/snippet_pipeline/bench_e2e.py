@@ -0,0 +1,180 @@
+"""
+bench_e2e.py  – offline end-to-end benchmark: synthetic corpus → process_evals.py
+against a local fake OpenAI server → import_snippets.py into a local Postgres.
+
+    python3 server/scraping/pipeline.py bench-e2e --comments 5000 --concurrency 16 --pack 4 \\
+        --latency 0.8 --rate-limit-rate 0.02 --db-name tigertype_bench --out ~/tigertype-bench
+
+Both stages run as the real scripts, in child processes, inside a scratch
+data directory (SNIPPET_PIPELINE_DATA_DIR), so data/ is never touched and no
+API money is spent. Reports comments/sec and peak RSS for extract, rows/sec
+and peak RSS for import, and writes the numbers to bench_e2e.json in the
+scratch directory. With --out DIR they go to DIR/bench_e2e_<UTC time>.json
+instead, and the previous result in DIR for the same corpus size is printed
+alongside for comparison.
+
+The import stage only runs with --db-name: point it at a scratch database
+that already has the TigerType schema (`npm run migrate` with DB_NAME set),
+never at your dev database. The other DB_* settings come from env/.env.
+"""
+
+import json, os, shutil, subprocess, sys, tempfile, time
+from pathlib import Path
+
+from . import SCRAPING_DIR
+from . import fake_openai
+from .jsonstream import count_records
+from .synthetic import write_corpus
+
+RESULT_FILE = "bench_e2e.json"               # in the scratch directory
+OUT_FILE    = "bench_e2e_{stamp}.json"       # in --out, kept for comparison
+
+DESCRIPTION = 'Benchmark extract + import end to end against a fake OpenAI server.'
+
+def add_arguments(parser):
+    parser.add_argument('--comments', type=int, default=2_000, metavar='N',
+                        help='size of the synthetic corpus')
+    parser.add_argument('--concurrency', type=int, default=8, metavar='N')
+    parser.add_argument('--pack', type=int, default=1, metavar='K')
+    parser.add_argument('--workers', type=int, default=1, metavar='N', help='import --workers')
+    parser.add_argument('--loader', choices=['copy', 'values'], default='copy')
+    parser.add_argument('--db-name', metavar='NAME',
+                        help='scratch Postgres database to import into (omit to skip the import stage)')
+    parser.add_argument('--work-dir', type=Path,
+                        help='scratch data directory (default: a new temp dir, removed afterwards)')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch directory and logs')
+    parser.add_argument('--out', type=Path, metavar='DIR',
+                        help='keep the results in DIR and compare with the previous run there')
+    fake_openai.add_server_arguments(parser)
+
+def _run_child(cmd, env, log_path):
+    """Run one stage; returns (exit code, wall seconds, peak RSS in MiB)."""
+    t0 = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen(cmd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+    secs = time.perf_counter() - t0
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return os.waitstatus_to_exitcode(status), secs, rss
+
+def _previous(result_path, comments):
+    """The most recent earlier result for the same corpus size, if any."""
+    for path in sorted(result_path.parent.glob("bench_e2e_*.json"), reverse=True):
+        if path == result_path:
+            continue
+        try:
+            prev = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            continue
+        if prev.get("config", {}).get("comments") == comments:
+            return path, prev
+    return None, None
+
+def _compare(label, now, before):
+    if now is None or not before:
+        return f"{label}: {now if now is not None else '–'}"
+    return f"{label}: {now} (was {before}, {now / before:0.2f}×)"
+
+def run(args):
+    work = Path(args.work_dir or tempfile.mkdtemp(prefix="tigertype-bench-"))
+    work.mkdir(parents=True, exist_ok=True)
+    server = fake_openai.start(**fake_openai.server_config(args))
+    try:
+        write_corpus(work / "raw_evaluations.json", args.comments, args.seed)
+        print(f"🔹 {args.comments} synthetic comment(s) in {work}")
+        print(f"🔹 Fake OpenAI at {server.base_url} (latency {args.latency}s, "
+              f"errors {args.error_rate:.1%}, 429s {args.rate_limit_rate:.1%})")
+
+        env = {**os.environ,
+               "SNIPPET_PIPELINE_DATA_DIR": str(work),
+               "OPENAI_BASE_URL": server.base_url,
+               "OPENAI_API_KEY": "bench",
+               "PYTHONUNBUFFERED": "1"}
+        result = {
+            "config": {"comments": args.comments, "concurrency": args.concurrency, "pack": args.pack,
+                       "workers": args.workers, "loader": args.loader, "latency": args.latency,
+                       "jitter": args.jitter, "error_rate": args.error_rate,
+                       "rate_limit_rate": args.rate_limit_rate,
+                       "malformed_rate": args.malformed_rate, "seed": args.seed},
+        }
+
+        # ── extract ───────────────────────────────────────────────────────────
+        metrics_path = work / "extract_metrics.json"
+        code, secs, rss = _run_child(
+            [sys.executable, str(SCRAPING_DIR / "process_evals.py"),
+             "--concurrency", str(args.concurrency), "--pack", str(args.pack),
+             "--metrics-file", str(metrics_path)],
+            env, work / "extract.log")
+        if code != 0:
+            print(f"❌  extract exited with {code} – see {work / 'extract.log'}")
+            args.keep = True
+            return
+        metrics = json.loads(metrics_path.read_text(encoding="utf-8"))
+        rows    = count_records(work / "processed_snippets.json")
+        result["extract"] = {
+            "seconds":         round(secs, 3),
+            "comments":        metrics["comments"],
+            "comments_per_sec": round(metrics["comments"] / secs, 2),
+            "peak_rss_mib":    round(rss, 1),
+            "snippets":        rows,
+            "latency_p50":     metrics["latency_seconds"]["p50"],
+            "latency_p95":     metrics["latency_seconds"]["p95"],
+            "retries":         metrics["requests"]["retries"],
+            "failed":          metrics["requests"]["failed"],
+            "malformed":       metrics["responses"]["malformed"],
+            "server":          server.as_dict(),
+        }
+
+        # ── import ────────────────────────────────────────────────────────────
+        if args.db_name:
+            code, secs, rss = _run_child(
+                [sys.executable, str(SCRAPING_DIR / "import_snippets.py"), "--full",
+                 "--workers", str(args.workers), "--loader", args.loader],
+                {**env, "DB_NAME": args.db_name}, work / "import.log")
+            if code != 0:
+                print(f"❌  import exited with {code} – see {work / 'import.log'}")
+                args.keep = True
+            else:
+                result["import"] = {
+                    "seconds":      round(secs, 3),
+                    "rows":         rows,
+                    "rows_per_sec": round(rows / secs, 1) if secs else None,
+                    "peak_rss_mib": round(rss, 1),
+                }
+        else:
+            print("🔹 No --db-name – skipping the import stage")
+
+        # ── report ────────────────────────────────────────────────────────────
+        if args.out:
+            result_path = args.out / OUT_FILE.format(stamp=time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()))
+            result_path.parent.mkdir(parents=True, exist_ok=True)
+            prev_path, prev = _previous(result_path, args.comments)
+        else:
+            result_path, prev_path, prev = work / RESULT_FILE, None, None
+        result_path.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+        prev = prev or {}
+
+        ex, pex = result["extract"], prev.get("extract", {})
+        print(f"\n✅ Extract: {ex['comments']} comment(s) in {ex['seconds']}s  |  "
+              f"{ex['snippets']} snippet(s)  |  {ex['retries']} retried, {ex['failed']} failed, "
+              f"{ex['malformed']} malformed")
+        print("   " + _compare("comments/sec", ex["comments_per_sec"], pex.get("comments_per_sec")))
+        print("   " + _compare("peak RSS MiB", ex["peak_rss_mib"], pex.get("peak_rss_mib")))
+        print(f"   fake server: {server.summary()}")
+        if "import" in result:
+            im, pim = result["import"], prev.get("import", {})
+            print(f"✅ Import: {im['rows']} row(s) in {im['seconds']}s")
+            print("   " + _compare("rows/sec", im["rows_per_sec"], pim.get("rows_per_sec")))
+            print("   " + _compare("peak RSS MiB", im["peak_rss_mib"], pim.get("peak_rss_mib")))
+        if prev_path:
+            print(f"🔹 Compared with {prev_path.name}")
+        if args.out or args.keep or args.work_dir:
+            print(f"📈 Results written to {result_path}")
+    finally:
+        server.shutdown()
+        server.server_close()
+        if args.keep:
+            print(f"🔹 Scratch files kept in {work}")
+        elif not args.work_dir:
+            shutil.rmtree(work, ignore_errors=True)
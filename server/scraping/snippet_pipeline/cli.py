@@ -0,0 +1,72 @@
+"""
+cli.py  – one command line for every pipeline stage.
+
+    python3 server/scraping/pipeline.py extract --concurrency 8
+    python3 server/scraping/pipeline.py import --production
+    python3 server/scraping/pipeline.py all --concurrency 8 --production
+    python3 server/scraping/pipeline.py stream --concurrency 8 --production
+    python3 server/scraping/pipeline.py extract --shard 0/4   # then merge-shards
+    python3 server/scraping/pipeline.py prefilter train
+    python3 server/scraping/pipeline.py bench-import --workers 1 2 4
+    python3 server/scraping/pipeline.py bench-e2e --comments 5000 --concurrency 16
+
+Stage modules are imported only for the sub-command that runs, so `--help`
+never pulls in openai / psycopg2.
+"""
+
+import argparse, importlib, sys
+
+# sub-command → module(s) whose add_arguments() / run() it uses
+STAGES = {
+    "extract"     : ("extract",),
+    "import"      : ("load",),
+    "all"         : ("extract", "load"),
+    "stream"      : ("extract", "load", "stream"),
+    "merge-shards": ("merge",),
+    "dedupe-raw"  : ("dedupe",),
+    "renormalize" : ("renormalize",),
+    "difficulty"  : ("difficulty",),
+    "prefilter"   : ("prefilter",),
+    "bench-import": ("bench",),
+    "bench-e2e"   : ("bench_e2e",),
+    "fake-openai" : ("fake_openai",),
+    "synth-evals" : ("synthetic",),
+    "sync-pool"   : ("selection_pool",),
+}
+
+def _stage(name):
+    return importlib.import_module(f"{__package__}.{name}")
+
+def build_parser(command):
+    modules = [_stage(m) for m in STAGES[command]]
+    parser  = argparse.ArgumentParser(
+        prog=f"pipeline.py {command}",
+        description=" Then: ".join(m.DESCRIPTION for m in modules))
+    for m in modules:
+        m.add_arguments(parser)
+    return parser, modules
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in STAGES:
+        top = argparse.ArgumentParser(prog="pipeline.py", description="TigerType snippet pipeline.")
+        top.add_argument("command", choices=list(STAGES))
+        top.parse_args(argv[:1])    # prints usage / help and exits
+        return
+
+    command = argv[0]
+    parser, modules = build_parser(command)
+    args = parser.parse_args(argv[1:])
+    for m in modules:
+        if hasattr(m, "check_arguments"):
+            m.check_arguments(parser, args)
+
+    if command == "all":
+        extract, load = modules
+        records = extract.run(args, collect=True)
+        # hand this run's snippets straight over instead of re-reading the file
+        load.run(args, records=records)
+    elif command == "stream":
+        modules[-1].run(args)
+    else:
+        modules[0].run(args)
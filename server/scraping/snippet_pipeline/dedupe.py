@@ -0,0 +1,116 @@
+"""
+dedupe.py  – folds repeated comments in raw_evaluations.json into one record
+before extraction, so each distinct comment costs one model call.
+
+    python3 server/scraping/pipeline.py dedupe-raw [--raw-file PATH] [--canonical-course first]
+    python3 server/scraping/process_evals.py --dedupe
+
+scrape_evals.js writes one record per (course, comment): a cross-listed course
+and a re-scraped term both repeat the same comment_text under several
+course_ids. Comments are grouped by a hash of their normalized text (the same
+normalization the response cache keys on). One record per group is kept –
+the latest term, or the first seen with `first`. The other copies' course
+metadata is listed in its `cross_listings`, which build_records() copies onto
+every snippet. The snippets themselves are attributed to the kept course
+only, because public.snippets.text is UNIQUE and a second copy would be
+dropped by the import anyway.
+
+The response cache already skips a repeat once the first copy has been
+answered. It does not catch copies in flight at the same time
+(--concurrency / --pack), nor copies submitted together in one --batch. The
+rewrite is idempotent: running it again on a folded file changes nothing.
+"""
+
+import hashlib
+from pathlib import Path
+
+from . import DATA_DIR
+from .jsonstream import iter_records, write_records_atomic
+from .response_cache import normalize_comment
+
+COURSE_FIELDS  = ("course_id", "term", "course_name", "evaluation_url")
+CROSS_LISTINGS = "cross_listings"
+
+def comment_hash(text):
+    return hashlib.sha1(normalize_comment(text).encode("utf-8")).hexdigest()
+
+def course_meta(comment):
+    return {k: comment.get(k) for k in COURSE_FIELDS}
+
+def _newer(comment, than):
+    return str(comment.get("term") or "") > str(than.get("term") or "")
+
+def compact_raw(path: Path, canonical="latest", skip=None):
+    """
+    Rewrite `path` with one record per distinct comment text. Records whose
+    text is empty or matches `skip` (junk that never reaches the model) are
+    left alone. Returns {"records", "unique", "junk", "folded"}: `unique`
+    counts distinct comments only, `junk` the records passed through untouched,
+    and `folded` the model calls saved (fewer requests with --pack).
+    """
+    # pass 1: group by text hash – only course metadata is held, never the text
+    groups = {}     # hash → [index of kept record, kept record's meta, all metas]
+    for idx, c in enumerate(iter_records(path)):
+        text = (c.get("comment_text") or "").strip()
+        if not text or (skip and skip(text)):
+            continue
+        h     = comment_hash(text)
+        metas = [course_meta(c), *(c.get(CROSS_LISTINGS) or ())]
+        group = groups.get(h)
+        if group is None:
+            groups[h] = [idx, metas[0], metas]
+            continue
+        if canonical == "latest" and _newer(c, group[1]):
+            group[0], group[1] = idx, metas[0]
+        group[2].extend(metas)
+
+    stats = {"records": 0, "unique": 0, "junk": 0, "folded": 0}
+
+    # pass 2: stream the file again, keeping one record per group
+    def folded():
+        for idx, c in enumerate(iter_records(path)):
+            stats["records"] += 1
+            text = (c.get("comment_text") or "").strip()
+            if not text or (skip and skip(text)):
+                stats["junk"] += 1
+                yield c
+                continue
+            group = groups[comment_hash(text)]
+            if group[0] != idx:
+                stats["folded"] += 1
+            else:
+                stats["unique"] += 1
+                others, seen = [], {tuple(group[1].values())}
+                for meta in group[2]:
+                    key = tuple(meta.get(k) for k in COURSE_FIELDS)
+                    if key not in seen:
+                        seen.add(key)
+                        others.append(meta)
+                rec = {k: v for k, v in c.items() if k != CROSS_LISTINGS}
+                yield {**rec, CROSS_LISTINGS: others} if others else rec
+
+    write_records_atomic(path, folded())
+    return stats
+
+def describe(stats):
+    junk = f", {stats['junk']} empty / junk left as is" if stats["junk"] else ""
+    return (f"{stats['records']} comment record(s) → {stats['unique']} distinct{junk}, "
+            f"{stats['folded']} repeated comment(s) folded ({stats['folded']} model call(s) saved)")
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+DESCRIPTION = 'Fold repeated / cross-listed comments in raw_evaluations.json before extraction.'
+
+def add_arguments(parser):
+    parser.add_argument('--raw-file', type=Path, default=DATA_DIR / "raw_evaluations.json",
+                        help='raw comments to fold in place (JSON array or .jsonl)')
+    parser.add_argument('--canonical-course', choices=['latest', 'first'], default='latest',
+                        help='which copy keeps the snippets: latest term, or first in the file')
+
+def run(args):
+    from .extract import is_junk_comment
+    if not args.raw_file.exists():
+        print(f"❌  {args.raw_file} not found")
+        return None
+    stats = compact_raw(args.raw_file, args.canonical_course, skip=is_junk_comment)
+    print(f"✅  {args.raw_file.name}: {describe(stats)}")
+    return stats
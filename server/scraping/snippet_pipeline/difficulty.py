@@ -0,0 +1,344 @@
+"""
+difficulty.py  – typing-difficulty features for snippet text, computed for a
+whole batch at once, and the per-category quantile buckets that turn them into
+the 1–3 difficulty.
+
+    python3 server/scraping/pipeline.py difficulty                    # dry run
+    python3 server/scraping/pipeline.py difficulty --apply [--production] [--full]
+
+Features (stored as snippets columns, migration 21):
+
+  • punctuation_density / digit_density / capital_density – share of characters
+  • avg_word_length  – non-space characters per word
+  • rare_bigram_cost – share of adjacent letter pairs outside the most common
+                       English bigrams (awkward finger sequences)
+  • difficulty_score – log length plus the features above, weighted (WEIGHTS)
+
+With NumPy installed a batch is encoded once into one UTF-32 code-point array
+and every feature is a handful of array operations; without it the same
+numbers come from a plain loop (both paths round to 4 decimals).
+
+The `difficulty` command fills the columns for rows that lack them (--full:
+every row), then cuts each category's difficulty_score distribution at its
+1/3 and 2/3 quantiles (percentile_cont, so the whole corpus is re-bucketed in
+one statement) and stores the cut points in snippet_difficulty_edges. The
+import reads those edges once per run and buckets its new rows with them
+before the COPY, so every machine buckets the same way; a category without
+edges keeps the character-count tiers.
+
+A dry run is read-only: scores and cut points go into session temp tables
+(difficulty_planned / difficulty_planned_edges) and the quantiles and moves
+are computed from those, so it reports what --apply would do without
+locking or rewriting a single row.
+"""
+
+import functools, math, string, sys
+
+FEATURE_COLUMNS = ("punctuation_density", "digit_density", "capital_density",
+                   "avg_word_length", "rare_bigram_cost", "difficulty_score")
+
+# hand-set: length still dominates; the rest separates snippets of similar length
+WEIGHTS = {"length": 1.0, "punctuation_density": 3.0, "digit_density": 5.0,
+           "capital_density": 2.0, "avg_word_length": 0.15, "rare_bigram_cost": 1.0}
+
+# the most frequent letter pairs in English text; anything else counts as "rare"
+COMMON_BIGRAMS = frozenset("""
+    th he in er an re on at en nd ti es or te of ed is it al ar st to nt ng
+    se ha as ou io le ve co me de hi ri ro ic ne ea ra ce li ch ll be ma si
+""".split())
+
+BUCKETS = 3
+
+# ASCII only, so both paths agree on every input
+PUNCTUATION  = frozenset(string.punctuation)
+DIGITS       = frozenset(string.digits)
+CAPITALS     = frozenset(string.ascii_uppercase)
+WHITESPACE   = frozenset(string.whitespace)
+LETTERS      = string.ascii_lowercase
+LETTER_INDEX = {c: i for i, c in enumerate(LETTERS)} | {c: i for i, c in enumerate(string.ascii_uppercase)}
+
+# ── features ──────────────────────────────────────────────────────────────────
+def _score(cc, punct, digit, capital, avg_word, rare):
+    w = WEIGHTS
+    return (w["length"] * math.log1p(cc) + w["punctuation_density"] * punct
+            + w["digit_density"] * digit + w["capital_density"] * capital
+            + w["avg_word_length"] * avg_word + w["rare_bigram_cost"] * rare)
+
+def _features_py(texts):
+    out = []
+    for text in texts:
+        n      = len(text) or 1
+        space  = [c in WHITESPACE for c in text]
+        words  = sum(not sp and (i == 0 or space[i - 1]) for i, sp in enumerate(space)) or 1
+        li     = [LETTER_INDEX.get(c, -1) for c in text]
+        pairs  = [(a, b) for a, b in zip(li, li[1:]) if a >= 0 and b >= 0]
+        feats  = (sum(c in PUNCTUATION for c in text) / n,
+                  sum(c in DIGITS for c in text) / n,
+                  sum(c in CAPITALS for c in text) / n,
+                  space.count(False) / words,
+                  sum(LETTERS[a] + LETTERS[b] not in COMMON_BIGRAMS for a, b in pairs) / len(pairs)
+                  if pairs else 0.0)
+        out.append(tuple(round(v, 4) for v in (*feats, _score(len(text), *feats))))
+    return out
+
+@functools.cache
+def _numpy():
+    """NumPy, imported on first use (not at startup), or None if not installed."""
+    try:
+        import numpy
+    except ImportError:      # optional: the pure-Python path gives the same numbers
+        return None
+    return numpy
+
+def _lookup(np, members):
+    """128-entry boolean table over ASCII codes (index 127 doubles as 'non-ASCII')."""
+    table = np.zeros(128, dtype=bool)
+    table[[ord(c) for c in members]] = True
+    return table
+
+def _features_np(np, texts):
+    k       = len(texts)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=k)
+    ends    = np.cumsum(lengths)
+    begins  = ends - lengths
+    codes   = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    ascii_  = np.minimum(codes, 127)                       # every non-ASCII char → 127
+
+    def per_text(mask, pairs=False):
+        """Per-text sum of a per-character (or, with pairs, per-adjacent-pair) mask."""
+        total = np.concatenate(([0], np.cumsum(mask, dtype=np.int64)))
+        start = np.minimum(begins, len(mask))     # trailing empty texts start past the end
+        stop  = np.maximum(ends - 1, start) if pairs else ends
+        return (total[stop] - total[start]).astype(np.float64)
+
+    n       = np.maximum(lengths, 1)
+    punct   = per_text(_lookup(np, PUNCTUATION)[ascii_]) / n
+    digit   = per_text(_lookup(np, DIGITS)[ascii_]) / n
+    capital = per_text(_lookup(np, CAPITALS)[ascii_]) / n
+
+    space   = _lookup(np, WHITESPACE)[ascii_]
+    starts  = np.zeros(len(codes) + 1, dtype=bool)
+    starts[begins] = True
+    prev_sp = np.concatenate(([True], space[:-1])) | starts[:-1]
+    words   = np.maximum(per_text(~space & prev_sp), 1)
+    avg_wl  = per_text(~space) / words
+
+    # letter index 0–25 (case-folded), -1 for anything else
+    letter  = np.full(128, -1, dtype=np.int16)
+    letter[[ord(c) for c in LETTERS]] = np.arange(26)
+    letter[[ord(c) for c in string.ascii_uppercase]] = np.arange(26)
+    li      = letter[ascii_]
+    common  = np.zeros(26 * 26, dtype=bool)
+    common[[LETTER_INDEX[a] * 26 + LETTER_INDEX[b] for a, b in COMMON_BIGRAMS]] = True
+    valid   = (li[:-1] >= 0) & (li[1:] >= 0) & ~starts[1:-1]   # both letters, same text
+    rare    = valid & ~common[np.where(valid, li[:-1] * 26 + li[1:], 0)]
+    pairs   = per_text(valid, pairs=True)
+    rare_c  = np.divide(per_text(rare, pairs=True), pairs, out=np.zeros(k), where=pairs > 0)
+
+    w = WEIGHTS
+    score = (w["length"] * np.log1p(lengths) + w["punctuation_density"] * punct
+             + w["digit_density"] * digit + w["capital_density"] * capital
+             + w["avg_word_length"] * avg_wl + w["rare_bigram_cost"] * rare_c)
+    table = np.column_stack((punct, digit, capital, avg_wl, rare_c, score)).tolist()
+    return [tuple(round(v, 4) for v in row) for row in table]
+
+def extract_features(texts):
+    """One FEATURE_COLUMNS tuple per text, for a whole batch."""
+    texts = list(texts)
+    if not texts:
+        return []
+    np = _numpy()
+    return _features_np(np, texts) if np is not None else _features_py(texts)
+
+def bucket(score, edges):
+    """1 + number of cut points at or below `score`."""
+    return 1 + sum(score >= e for e in edges)
+
+# ── SQL ───────────────────────────────────────────────────────────────────────
+schema_sql = """
+SELECT COUNT(*) = 2 FROM information_schema.columns
+WHERE table_schema = 'public'
+  AND ((table_name = 'snippets' AND column_name = 'difficulty_score')
+    OR (table_name = 'snippet_difficulty_edges' AND column_name = 'edges'));
+"""
+
+edges_sql = "SELECT category, edges FROM public.snippet_difficulty_edges;"
+
+# re-bucket every scored row whose category has edges – corpus-wide, so only
+# the `difficulty` command runs it (the import buckets its rows in Python)
+apply_edges_sql = """
+WITH bucketed AS (
+    SELECT s.id,
+           1 + (SELECT COUNT(*) FROM unnest(e.edges) AS cut WHERE s.difficulty_score >= cut) AS difficulty
+    FROM public.snippets s
+    JOIN public.snippet_difficulty_edges e ON e.category = s.category
+    WHERE s.difficulty_score IS NOT NULL
+)
+UPDATE public.snippets s SET difficulty = b.difficulty
+FROM bucketed b
+WHERE s.id = b.id AND s.difficulty IS DISTINCT FROM b.difficulty;
+"""
+
+# {scores}: public.snippets, or PLANNED_SCORES in a dry run
+quantiles_sql = """
+SELECT category, COUNT(*), percentile_cont(%s::float8[]) WITHIN GROUP (ORDER BY difficulty_score)
+FROM {scores} AS s
+WHERE category IS NOT NULL AND difficulty_score IS NOT NULL
+GROUP BY category
+ORDER BY category;
+"""
+
+# ── dry run (read-only) ───────────────────────────────────────────────────────
+# temp tables are created before the transaction is switched to READ ONLY;
+# writing them afterwards is still allowed
+planned_tables_sql = """
+CREATE TEMP TABLE difficulty_planned (id INT PRIMARY KEY, difficulty_score DOUBLE PRECISION);
+CREATE TEMP TABLE difficulty_planned_edges AS
+SELECT category, edges FROM public.snippet_difficulty_edges;
+"""
+
+plan_scores_sql = "INSERT INTO difficulty_planned (id, difficulty_score) VALUES %s;"
+
+plan_edges_sql = """
+DELETE FROM difficulty_planned_edges WHERE category = %(category)s;
+INSERT INTO difficulty_planned_edges (category, edges) VALUES (%(category)s, %(edges)s);
+"""
+
+# the table as --apply would have left it after scoring
+PLANNED_SCORES = """(
+    SELECT s.id, s.category, s.difficulty,
+           COALESCE(p.difficulty_score, s.difficulty_score) AS difficulty_score
+    FROM public.snippets s
+    LEFT JOIN difficulty_planned p ON p.id = s.id
+)"""
+
+# apply_edges_sql's rowcount, without the UPDATE
+planned_moves_sql = f"""
+SELECT COUNT(*)
+FROM {PLANNED_SCORES} AS s
+JOIN difficulty_planned_edges e ON e.category = s.category
+WHERE s.difficulty_score IS NOT NULL
+  AND s.difficulty IS DISTINCT FROM
+      1 + (SELECT COUNT(*) FROM unnest(e.edges) AS cut WHERE s.difficulty_score >= cut);
+"""
+
+store_edges_sql = """
+INSERT INTO public.snippet_difficulty_edges (category, edges, computed_at)
+VALUES (%s, %s, NOW())
+ON CONFLICT (category) DO UPDATE SET edges = EXCLUDED.edges, computed_at = EXCLUDED.computed_at;
+"""
+
+def has_schema(cur):
+    """Whether migration 21 (feature columns + edges table) has run."""
+    cur.execute(schema_sql)
+    return bool(cur.fetchone()[0])
+
+def check_schema(cur):
+    """Exit with a hint if migration 21 (feature columns + edges table) has not run."""
+    if not has_schema(cur):
+        print("❌  snippets.difficulty_score / snippet_difficulty_edges missing – run `npm run migrate` first")
+        sys.exit(1)
+
+def load_edges(cur):
+    cur.execute(edges_sql)
+    return {category: list(edges) for category, edges in cur.fetchall()}
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+DESCRIPTION = 'Compute typing-difficulty features and re-bucket difficulty by per-category quantiles.'
+
+def add_arguments(parser):
+    parser.add_argument('--production', action='store_true',
+                        help='Connect to the production database using DATABASE_URL from .env')
+    parser.add_argument('--apply', action='store_true',
+                        help='Write the result (default: read-only dry run that only reports it)')
+    parser.add_argument('--full', action='store_true',
+                        help='Recompute the features of every row, not just rows without them')
+    parser.add_argument('--chunk', type=int, default=5000, metavar='N',
+                        help='rows per fetch / feature batch / UPDATE')
+
+def check_arguments(parser, args):
+    if args.chunk < 1:
+        parser.error("--chunk must be >= 1")
+
+scan_sql = "SELECT id, text FROM public.snippets {where} ORDER BY id;"
+
+update_sql = f"""
+UPDATE public.snippets AS s
+SET {", ".join(f"{c} = v.{c}" for c in FEATURE_COLUMNS)}
+FROM (VALUES %s) AS v(id, {", ".join(FEATURE_COLUMNS)})
+WHERE s.id = v.id;
+"""
+
+def run(args):
+    from .load import connection_params
+    from .selection_pool import sync as sync_selection_pool
+    target, params = connection_params(args.production)
+    print(f"🔹 {'APPLY' if args.apply else 'DRY-RUN'} against {target} DB "
+          f"({'NumPy' if _numpy() is not None else 'pure Python'} features, {args.chunk} row(s) per batch)")
+
+    import time
+    import psycopg2
+    from psycopg2.extras import execute_values
+    t0, scored = time.perf_counter(), 0
+    try:
+        with psycopg2.connect(**params) as read_conn, psycopg2.connect(**params) as write_conn:
+            with write_conn.cursor() as cur:
+                check_schema(cur)
+                if not args.apply:
+                    cur.execute(planned_tables_sql)
+            write_conn.commit()
+            if not args.apply:
+                write_conn.set_session(readonly=True)
+            # 1. features: streamed through a named cursor, one vectorized batch per chunk
+            with read_conn.cursor(name="difficulty_scan") as scan:
+                scan.execute(scan_sql.format(where="" if args.full else "WHERE difficulty_score IS NULL"))
+                while True:
+                    rows = scan.fetchmany(args.chunk)
+                    if not rows:
+                        break
+                    feats = extract_features(text for _, text in rows)
+                    with write_conn.cursor() as cur:
+                        if args.apply:
+                            execute_values(cur, update_sql, [(sid, *f) for (sid, _), f in zip(rows, feats)],
+                                           page_size=len(rows))
+                        else:
+                            execute_values(cur, plan_scores_sql, [(sid, f[-1]) for (sid, _), f in zip(rows, feats)],
+                                           page_size=len(rows))
+                    if args.apply:
+                        write_conn.commit()
+                    scored += len(rows)
+                    print(f"    … {scored} snippet(s) scored")
+
+            # 2. per-category quantile cut points, 3. re-bucket the whole corpus in SQL
+            with write_conn.cursor() as cur:
+                qs = [i / BUCKETS for i in range(1, BUCKETS)]
+                cur.execute(quantiles_sql.format(scores="public.snippets" if args.apply else PLANNED_SCORES),
+                            (qs,))
+                for category, n, edges in cur.fetchall():
+                    print(f"🔹 {category}: {n} snippet(s), cut at {', '.join(f'{e:0.3f}' for e in edges)}")
+                    if args.apply:
+                        cur.execute(store_edges_sql, (category, edges))
+                    else:
+                        cur.execute(plan_edges_sql, {"category": category, "edges": edges})
+                if args.apply:
+                    cur.execute(apply_edges_sql)
+                    moved = cur.rowcount
+                else:
+                    cur.execute(planned_moves_sql)
+                    moved = cur.fetchone()[0]
+                print(f"🔹 {moved} snippet(s) {'moved' if args.apply else 'would move'} to another difficulty")
+                if args.apply and moved:
+                    sync_selection_pool(cur)
+            if args.apply:
+                write_conn.commit()
+            else:
+                write_conn.rollback()
+    except Exception as e:
+        print(f"❌  DB error: {e}")
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - t0
+    if args.apply:
+        print(f"✅  {scored} snippet(s) scored, difficulty re-bucketed in {elapsed:0.1f}s")
+    else:
+        print(f"🔹 DRY-RUN complete in {elapsed:0.1f}s – nothing was written. Re-run with --apply.")
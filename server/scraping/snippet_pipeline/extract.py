@@ -0,0 +1,1223 @@
+"""
+extract.py  – extracts "typing‑game" snippets from Princeton course reviews
+and saves progress continuously so you can stop / restart at any time.
+(`process_evals.py` / `pipeline.py extract` on the command line, `run(args)`
+from Python – nothing happens at import time and `openai` is only imported
+once a run starts.)
+
+Files it maintains (in server/scraping/data/):
+
+  • raw_evaluations.json       – remaining comments still to process
+  • processed_snippets.json    – all extracted / validated snippets so far
+  • progress_journal.jsonl     – append-only log of comments finished since the
+                                 two files above were last rewritten
+  • metrics/extract_*.json     – per-run latency / token / cost metrics
+
+With --shard i/N all of the above (except the shared response cache) live in
+data/shards/<i>-of-<N>/ instead, starting from that shard's slice of
+raw_evaluations.json; `pipeline.py merge-shards` combines the shard outputs.
+"""
+# [AI DISCLAIMER: AI WAS USED TO HELP DEBUG / POLISH THIS SCRIPT]
+
+import argparse, asyncio, hashlib, json, os, re, signal, sys, time
+from collections import Counter
+from pathlib import Path
+
+from . import DATA_DIR, SCRAPING_DIR, PROJECT_ROOT
+from .rate_limiter import RateLimiter
+from .batch_api import OpenAIBatchBackend, LocalBatchBackend, ENDPOINT, TERMINAL_STATUSES
+from .response_cache import ResponseCache, cache_key
+from .journal import ProgressJournal
+from .jsonstream import iter_records, count_records, dump_records, is_jsonl
+from .snippet_rows import difficulty_from_char_count
+from .prefilter import PreFilter, make_scorer, OUTCOMES_FILE
+from .telemetry import RunMetrics
+from .dedupe import compact_raw, describe as describe_dedupe, CROSS_LISTINGS
+
+# ── ARG PARSING ───────────────────────────────────────────────────────────────
+DESCRIPTION = 'Extract typing snippets from course evaluations.'
+
+def parse_shard(value):
+    """'i/N' → (i, N) with 0 <= i < N."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"need 0 <= i < N, got {value!r}")
+    return index, count
+
+def add_arguments(parser):
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Max number of OpenAI requests in flight (N > 1 switches to the async engine)'
+    )
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help='Submit all pending comments through the OpenAI Batch API and poll for results'
+    )
+    parser.add_argument(
+        '--batch-backend',
+        choices=['openai', 'local'],
+        default='openai',
+        help='With --batch: the real Batch API, or an offline stand-in answered by fake_openai.py'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Bypass the on-disk response cache (always call the API)'
+    )
+    parser.add_argument(
+        '--raw-file',
+        type=Path,
+        help='Pending comments (JSON array or .jsonl); default data/raw_evaluations.json'
+    )
+    parser.add_argument(
+        '--processed-file',
+        type=Path,
+        help='Snippet output (JSON array, or JSONL if it ends in .jsonl); default data/processed_snippets.json'
+    )
+    parser.add_argument(
+        '--prefilter',
+        choices=['off', 'heuristic', 'model'],
+        default='off',
+        help='Local scorer that drops hopeless comments before any API call (see prefilter.py)'
+    )
+    parser.add_argument(
+        '--prefilter-threshold',
+        type=float,
+        default=None,
+        metavar='T',
+        help='Minimum pre-filter score (0–1) a comment needs to be sent to the model'
+    )
+    parser.add_argument(
+        '--pack',
+        type=int,
+        default=1,
+        metavar='K',
+        help='Send up to K reviews per request (shared instructions are paid for once)'
+    )
+    parser.add_argument(
+        '--metrics-file',
+        type=Path,
+        help='Where to write this run\'s metrics JSON; default data/metrics/extract_<UTC time>.json'
+    )
+    parser.add_argument(
+        '--shard',
+        type=parse_shard,
+        metavar='i/N',
+        help='Process only slice i of N (0-based), with its own progress files under data/shards/'
+    )
+    parser.add_argument(
+        '--shard-by',
+        choices=['course', 'comment'],
+        default='course',
+        help='Hash course_id (keeps a course together) or the comment text to pick the shard'
+    )
+    parser.add_argument(
+        '--dedupe',
+        action='store_true',
+        help='Fold repeated / cross-listed comments into one request before extracting (see dedupe.py)'
+    )
+    parser.add_argument(
+        '--canonical-course',
+        choices=['latest', 'first'],
+        default='latest',
+        help='With --dedupe: the copy whose course the snippets are attributed to'
+    )
+
+def check_arguments(parser, args):
+    if args.pack < 1:
+        parser.error("--pack must be >= 1")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be >= 1")
+    if args.batch and args.concurrency > 1:
+        parser.error("--batch and --concurrency are mutually exclusive")
+    if args.batch and args.pack > 1:
+        parser.error("--batch sends one review per request; it cannot be combined with --pack")
+    if args.batch_backend != 'openai' and not args.batch:
+        parser.error("--batch-backend only applies with --batch")
+
+# ── CONFIGURATION ──────────────────────────────────────────────────────────────
+RAW_DATA_FILE           = "raw_evaluations.json"
+PROCESSED_SNIPPETS_FILE = "processed_snippets.json"
+
+DEFAULT_SOURCE    = "Princeton Course Reviews"
+DEFAULT_CATEGORY  = "course-reviews"
+
+# gpt-5 cheaper than 4.1 w/ comparable context; 
+# best model would be ones best at creative writing
+MODEL_ID        = "gpt-5-mini"
+MAX_RETRIES     = 5     # increased from 3 to help w rate limiting
+INITIAL_DELAY   = 1     # fallback 429 back‑off when no retry-after header
+
+# starting budgets for the rate limiter; resized from x-ratelimit-* headers
+RATE_LIMIT_RPM        = 500
+RATE_LIMIT_TPM        = 200_000
+EST_COMPLETION_TOKENS = 1000   # reserved per call, settled against response.usage
+
+TMP_SUFFIX      = ".tmp"  # for atomic writes
+
+# progress journal: one appended line per finished comment, folded into the
+# two JSON files only at the end of a run (or on the next start after a crash)
+JOURNAL_FILE        = "progress_journal.jsonl"
+JOURNAL_FSYNC_EVERY = 20      # fsync after this many comments (every line is flushed)
+
+# --batch mode (OpenAI caps a batch at 50k requests / 200 MB input file)
+BATCH_STATE_FILE    = "batch_state.json"
+BATCH_REQUEST_FILE  = "batch_requests_{n}.jsonl"
+BATCH_MAX_REQUESTS  = 50_000
+BATCH_MAX_BYTES     = 180 * 1024 * 1024
+BATCH_POLL_INTERVAL = 60      # seconds between status checks
+BATCH_LOCAL_DIR     = "batch_local"   # --batch-backend local: its "uploaded" / result files
+
+# response cache (data/response_cache.sqlite3)
+CACHE_FILE          = "response_cache.sqlite3"
+CACHE_MAX_AGE_DAYS  = 365
+CACHE_MAX_BYTES     = 256 * 1024 * 1024
+
+# pre-filter default cut-off (override with --prefilter-threshold)
+PREFILTER_THRESHOLD = 0.2
+
+# per-run metrics (override with --metrics-file); see telemetry.py for prices
+METRICS_FILE        = "metrics/extract_{stamp}.json"
+QUALITY_FILE        = "metrics/response_quality.json"   # malformed rate per model, all runs
+
+# --shard i/N: per-shard progress files (relative to data/)
+SHARD_DIR           = "shards/{index}-of-{count}"
+
+# ── ENV / OPENAI SETUP ─────────────────────────────────────────────────────────
+# Run state: module globals (re)initialised by setup() at the start of run().
+args          = None
+data_dir      = DATA_DIR
+client        = None
+async_client  = None
+limiter       = None
+cache         = None
+prefilter     = None
+outcomes_path = None
+outcomes_log  = None
+metrics       = None
+record_sink   = None      # load.StreamLoader in `pipeline.py stream`
+RateLimitError = APIError = None    # bound from openai in setup()
+TransientErrors = ()                # connection drops / timeouts / 5xx, retried with back-off
+
+def setup():
+    global data_dir, client, async_client, limiter, cache, prefilter, outcomes_path, outcomes_log
+    global RateLimitError, APIError, TransientErrors
+    from dotenv import load_dotenv
+    import openai
+
+    data_dir = DATA_DIR
+    if args.shard:
+        index, count = args.shard
+        data_dir = DATA_DIR / SHARD_DIR.format(index=index, count=count)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    # load .env (either at project root or script directory)
+    dotenv_path = PROJECT_ROOT / ".env"
+    if not dotenv_path.exists():
+        dotenv_path = SCRAPING_DIR / ".env"
+    if dotenv_path.exists():
+        print(f"Loading environment variables from: {dotenv_path}")
+        load_dotenv(dotenv_path)
+    else:
+        print("⚠️  .env not found – relying on shell env vars")
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("❌  OPENAI_API_KEY not set.")
+        sys.exit(1)
+
+    RateLimitError, APIError = openai.RateLimitError, openai.APIError
+    TransientErrors = (openai.APIConnectionError, openai.InternalServerError)
+    # SDK retries off: a 429 the SDK swallowed would never reach the limiter,
+    # so request_content / _retry_pause own every retry
+    client       = openai.OpenAI(api_key=api_key, max_retries=0)
+    async_client = openai.AsyncOpenAI(api_key=api_key, max_retries=0) if args.concurrency > 1 else None
+    limiter      = RateLimiter(RATE_LIMIT_RPM, RATE_LIMIT_TPM)   # shared by every worker
+    # shared by every shard on this machine (SQLite handles the concurrent writers)
+    cache        = None if args.no_cache else ResponseCache(
+        DATA_DIR / CACHE_FILE, max_age_days=CACHE_MAX_AGE_DAYS, max_bytes=CACHE_MAX_BYTES)
+    prefilter    = None if args.prefilter == 'off' else PreFilter(
+        make_scorer(args.prefilter),
+        PREFILTER_THRESHOLD if args.prefilter_threshold is None else args.prefilter_threshold)
+
+    # every model verdict is logged here; prefilter.py trains / evaluates on it
+    outcomes_path = data_dir / OUTCOMES_FILE
+    outcomes_log  = outcomes_path.open("a", encoding="utf-8")
+
+# ── SMALL UTILS ───────────────────────────────────────────────────────────────
+def atomic_write(obj, path: Path):
+    """Safely dump JSON → path by writing to *.tmp then os.replace()."""
+    tmp = path.with_suffix(path.suffix + TMP_SUFFIX)
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)   # atomic on POSIX
+
+def load_json(path: Path, default):
+    if path.exists():
+        try:
+            with path.open(encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️  Could not load {path}: {e}")
+    return default
+
+def word_count(txt): return len(txt.split())
+def char_count(txt): return len(txt)
+
+# ── AI CALL ────────────────────────────────────────────────────────────────────
+def is_junk_comment(comment_text):
+    """Cheap sanity filter: very short strings, bare numbers and N/A."""
+    return len(comment_text) < 20 or bool(re.match(r"^[0-9.]+$|^N/A$|^n/a$", comment_text.strip()))
+
+def _prompt_instructions():
+    """Static instructions + good/bad/grammar examples shared by every prompt."""
+    # ——— GOOD examples ———
+    good_example_snippets = [
+        "This would be a great course if it was not taught by Joe Scanlan. Alas, it is taught by him. Do not take this class if you are uncomfortable having a racist professor.",
+        "This is the type of course that 10/10 dentists would recommend. You got better service on Ed than you would get at Verizon Wireless. Moretti/Li/Gabai had better offensive chemistry than Curry/Thompson/Durant.",
+        "This class definitely put me in my lowest lows, a lot of sobbing in JRR bathrooms and I considered dropping/PDFing it multiple times. In fact, countless people did end up dropping it. Everyday I questioned why I didn't follow suit.",
+        "This was when mental illness took a hold of me. Each assignment after was a similar fight for my life. I still do not think I know what a raytracer is or rasterizer despite spending a decade coding them. The only thing I knew was pain. I wanted to explore the intersection between visual arts and programming, and the only thing I need to explore now is therapy.",
+        "The assignment states that \"In this assignment you will create a simple 3D modeling program,\" yet it is nothing but \"simple\". It is perhaps \"simple\" to Alan Turing or an extremely experienced programmer but I am not a natural-born computer scientist. I did not come out of the womb coding JavaScript. My first words as a child were \"mom\", and not \"Hello World\" . So why and who thought it was brilliant to exponentially increase the difficulty to this significant level?",
+        "After five weeks of partaking in this course, I had to contact my psychiatric provider to prescribe me anti-depressants. This is because this course perpetuated my mental illness, with each assignment spurring new bouts of depression. Whenever I think I reached a new low, this course gave me a shovel and commanded me to dig deeper.",
+        "However, one heavenly force shielded me from the pain: Claire Gmachl. A goddess among us. Mother Teresa, or perhaps even God, reincarnated into a Princetonian.",
+        "Dr. Martinez mentioned she gets motion sickness very easily, so it's a miracle she can still teach this course given how fast we move between concepts and how quickly each exam comes up.",
+        "On the first day of lecture, I walked into McCosh 10, opened my laptop, and started playing coolmathgames.com. Let me tell you that when Vreeland started speaking, I had to PUT DOWN Papa's Pizzeria and listen to the eloquent stream of creativity this man constructed.",
+        "Like, if you want to learn how to suffer the slings and arrows of outrageous fortune, this is your class. If you want to bike home as the birdies sing every Friday dawn, this is your class. If you want to cry while reading the St. Crispin's day speech as the 9AM classes start to trickle in, this class is for you.",
+        "I have been giving this class my all. Body and soul. Sinew and stone. Of my own flesh have I made an offering. 80% of this term's allotted nightmares/stress dreams. Easily 70% of my homework time. But, I mean, now that I'm at the end, I feel kinda... forged. I am hot steel, about to plunge into the ice bucket of winter break. It has made a man out of me.",
+        "This class was the definition of masochism. As an alternative, try (1) playing a Knife Game with a cleaver, (2) chewing cactus, (3) drinking boiling water, (4) ordering \"Indian Spicy\" at a local Indian joint, (5) waterboarding yourself in the Public Policy school fountain, (6) driving with your feet across a mine field, (7) juggling hatchets whose handles were dipped in flaming oil, (9) walking barefoot on needles, (10) force‑pulling your teeth out with pliers and no anesthesia, (11) playing Marco Polo with a bear, (12) running through campus naked in the middle of winter, or (13) wiping your hand across a splintered board repeatedly.",
+        "Imagine this: you get a toddler, give them a book on differential equations that has 70% of its pages ripped, and ask them to find the wave function of a Hydrogen atom using Schrodinger's equation (without any guidance). This is EXACTLY how the assignments felt. They are torture devices intended for you to end up questioning your entire education and supposed intelligence.",
+        "I watched in horror as he poured his heart and soul into the code, ignoring the warnings and errors that flashed on the screen. As the hours ticked by, Max's energy began to flag. His paws moved slower, his eyes growing dimmer with each passing minute. I knew that he was pushing himself too far, but I couldn't stop him. The code grew more complex, a twisted labyrinth of logic and mathematics.",
+        "Max, the reincarnation of Helen Keller, had pushed the boundaries of coding too far. He had tried to defy the laws of computer science, and it had cost him his life. As I held Max's lifeless body, I knew that I would never forget the lessons he had taught me. He had shown me the power of coding, the limitless possibilities of the digital realm. And he had paid the ultimate price for his ambition. I buried Max in the backyard, surrounded by the code that had consumed him.",
+        "DO NOT TAKE THIS CLASS. RUN. GET OUT BEFORE IT'S TOO LATE! This class is the worst class I've ever taken. It even makes writing sem look good. If you think you might be interested in systems, don't take this course.",
+        "If you need to fulfill your systems requirement, don't take this course. If you're just looking for another cos class, don't take this course. If you're standing on the edge of a cliff and can either jump or take this course, I'd tell you to jump. STAY AWAY.",
+        "Its like he understands all the potential impediments to understanding math and has a solution to them.",
+        "We kind of acted like they didn't have anything else going on in their lives during the final project.",
+        "If you don't believe in God, then I would start quickly, because in that lab there is basically nothing you can do besides pray.",
+        "Integrated Science Curriculum? More like I Scream and Cry (everyday, everynight over this class).",
+        "Verilog, which is an awful language full of strange idiosyncracies that destroy your code for no reason.",
+        "If that isn't enough, literal billionaires come to speak to this class.",
+        "So procrastination is actually a good option.",
+        "This class is absolutely awful. The guy doesn't speak English. I have literally never once in my 15 years of formal education been in the presence of a teacher so atrocious.",
+        "In the sleepy afternoon light of McCosh 50 with the shades drawn and the brightest thing in the room being the screen of the wrestler in front of me's subway surfer emulator (Lord knows it isn't the professor), one cannot help but fall asleep as he mumbles into the microphone unintelligible sounds that masquerade as English words on statistical tests and methods.",
+        "This level of incompetence at conveying the material is simply unprecedented in Princeton; nay Ivy League; nay university; nay pedagogical history, since the dawn of mankind.",
+        "When I was a child, I got hit by a car.",
+        "It's like learning to swim by jumping into the water."
+        "The textbook is written in alien language by the way.",
+        "Simply pray to whatever God you believe in for the exams. You WILL need His grace.",
+        "My key takeaway from this class is how useless and unintelligent ChatGPT is when it comes to programming in a pre-existing environment.",
+        "Not only is 'C' the grade I am getting for this course, but it is also the coding language that caused me a semester full of torment and punishment.",
+        "David is hands down one of the best professors. He explains concepts in such a clear, digestable manner. If you're worried/nervous about math, David is your best bet!",
+    ]
+    good_examples_text = "\n\nHere are some examples of the *type* of snippets I want you to extract (focus on unique phrasing, strong opinions, humor, or vivid descriptions):\n"
+    for i, ex in enumerate(good_example_snippets):
+        good_examples_text += f"{i+1}. \"{ex}\"\n"
+
+    # --- BAD examples (what to AVOID) ---
+    bad_example_snippets = [
+        "The professor was knowledgeable and helpful.",
+        "The precepts were useful.",
+        "This course is not a good fifth course; it is a lot of work.",
+        "Teachers just solve basic problems in the class that never come up on an exam.",
+        "Problem sets were challenging but fair.",
+        "Start the assignments early.",
+        "pls for the love of god use the exam archive",
+        "professor Howard doesn't sugarcoat the fact that it's fast-paced.",
+        "if precepts attendance wasn't necessary I wouldn't attend precepts, all preceptors do are walk through pset problems that aren't particularly useful.",
+        "This class is SUPER fast-paced, and it is often difficult to properly digest the material in such a short period.",
+        "He is an incredible lecturer, and probably the only one who could teach this amount of material in a short Princeton semester.",
+        "I'm not sure if I would take this for the actual course content, for I didn't find it all that interesting, most of the psets felt like busy work, and some of the derivations and problems felt way too wishy-washy (although to be fair rigorous diffeqs would not be very fun either.)",
+        "unlike MAT 201 and 202, which felt like getting hit with a brick",
+        "It has been CRIMINALLY underrated in previous years.",
+        "He will single handedly carry you through this class.",
+        "There are many YouTube playlists about differential equations, but none of them go to the depth that this course does.",
+        "Dont take this class please :( UNLESS you absolutely have to",
+        "If it isn't, I would strongly recommend against this course, but if you can't avoid it, good luck.",
+        "This course is fine if you have to take it. It won't make you like math, though. And if you like math, then you'll want to test out of this class, or start with some upper level stuff (although I haven't heard particularly positive things about that either).",
+        "Starts with sequences/series which are arguably the hardest part, then gets easier, almost algorithmic after.",
+    ]
+    bad_examples_text = "\n\nConversely, here are examples of the *type* of snippets to *AVOID* (too bland, generic, or common):\n"
+    for i, ex in enumerate(bad_example_snippets):
+        bad_examples_text += f"{i+1}. \"{ex}\"\n"
+
+    # im no prompt engineer by any means but i think i cooked
+    system_prompt = (
+        "You are an *EXTREMELY SELECTIVE* assistant tasked with identifying ONLY the MOST engaging, funny, or uniquely phrased snippets from Princeton course reviews, suitable for a typing game."
+        "Your primary goal is MAXIMUM QUALITY over quantity. Be extremely critical: **it is FAR better to return NOTHING than to return a bland, generic, or uninspired snippet.**"
+        "The only users of the app are Princeton students so consider that the snippets, on top of being fun to type, can contain information useful for students deciding whether to take a course, *but only if presented in an interesting or funny way*."
+        "Focus on extracting short, self‑contained, interesting, humorous, witty, strongly opinionated, or insightful phrases/sentences (roughly 15‑150 words)."
+        "**AGGRESSIVELY AVOID** generic advice ('start early', 'go to office hours'), mundane praise/criticism ('good course', 'learned a lot', 'professor was nice'), boilerplate language, or purely factual statements unless the *wording itself* is exceptionally creative or funny."
+        "Prefer highly specific, vivid, or surprising wording (proper nouns, hyperbole, clever analogies, unexpected twists). Avoid bland lists, administrative info, or content whose humor depends on missing context."
+        "Before returning, internally score each candidate's comedic/interest value from 1–10 and include ONLY items scoring ≥ 6. Return AT MOST 2 snippets per review — the top-scoring ones. If none qualify, return []."
+        "For EACH valid snippet, include a difficulty rating: 1 (easy), 2 (medium), 3 (hard). Base this on factors like punctuation complexity, sentence structure, word length, and presence of numbers or symbols."
+        "The most important in rating the difficulty is the length of the snippet: Snippets with a character_count over 185 are of difficulty 3, snippets with a character_count between 100 and 185 are of difficulty 2, and snippets under 100 characters are of difficulty 1."
+        "Fix obvious typos or grammatical errors in the source text, but DO NOT change the meaning or wording significantly. Preserve the original student voice. Also for example, if you are taking a snippet from the middle of a sentence, ensure that enough context is present so that the snippet remains understandably funny, and grammar/punctuation-wise ensure the first letter is capitalized."
+        "***Return an empty list [] if absolutely nothing meets these strict criteria. Be EXTREMELY SELECTIVE in your filtering; only return the funniest of course evaluations.*** "
+        f"{good_examples_text}"
+        f"{bad_examples_text}"
+
+        "\\n**Grammar/Typo Correction Examples:**\\n"
+        "When fixing typos or grammar, aim for minimal changes that improve readability while keeping the original voice. Examples:\\n"
+        "- Original:  'it was so hard and i cried so much bc of it lol'\\n"
+        "- Corrected: 'It was so hard and I cried so much because of it lol.' (Capitalized start, expanded 'bc', added period)\\n"
+        "- Original:  'prof jones is ok but lecture is kinda boring tbh'\\n"
+        "- Corrected: 'Prof. Jones is okay, but lecture is kinda boring, to be honest.' (Capitalized name, abbreviation, added punctuation)\\n"
+        "- Original:  'u need to do all the psets no cap'\\n"
+        "- Corrected: 'You need to do all the problem sets, no cap.' (Expanded 'u', 'psets', added comma)\\n"
+
+    )
+    return system_prompt
+
+# Built once at import: the instructions + examples never change between calls,
+# so they go first as an identical system message (OpenAI's prompt caching
+# discounts a repeated prefix) and only the short user message varies.
+SYSTEM_PROMPT = _prompt_instructions()
+
+REVIEW_TEMPLATE = (
+    "Now analyze the following review:"
+    "\n\n[REVIEW START]\n{review}\n[REVIEW END]\n\n"
+    "Answer with the qualifying snippets as {{\"snippets\": [...]}}, e.g. "
+    "{{\"snippets\": [{{\"text\":\"…\",\"difficulty\":2}}]}} or {{\"snippets\": []}}."
+)
+PACKED_TEMPLATE = (
+    "Now analyze each of the following {n} reviews INDEPENDENTLY, "
+    "applying every rule above to each review on its own (at most 2 snippets per review):"
+    "{reviews}"
+    "\n\nAnswer with a JSON object whose keys are the review ids and whose values are "
+    "the lists of qualifying snippets for that review, e.g. "
+    "{{\"r0\": [{{\"text\":\"…\",\"difficulty\":2}}], \"r1\": []}}. "
+    "Include EVERY review id, with [] when nothing in that review qualifies."
+)
+
+# Strict structured output: the API guarantees the answer matches the schema,
+# so a response parses and validates in one pass with no shape guessing.
+SNIPPET_LIST_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "text":       {"type": "string"},
+            "difficulty": {"type": "integer", "enum": [1, 2, 3]},
+        },
+        "required": ["text", "difficulty"],
+        "additionalProperties": False,
+    },
+}
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {"snippets": SNIPPET_LIST_SCHEMA},
+    "required": ["snippets"],
+    "additionalProperties": False,
+}
+
+def _response_format(name, schema):
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+RESPONSE_FORMAT = _response_format("snippets", RESPONSE_SCHEMA)
+
+def packed_response_format(review_ids):
+    """Schema for a packed request: every review id is a required key."""
+    return _response_format("packed_snippets", {
+        "type": "object",
+        "properties": {rid: SNIPPET_LIST_SCHEMA for rid in review_ids},
+        "required": list(review_ids),
+        "additionalProperties": False,
+    })
+
+# changes whenever any prompt text or the response schema does: keys the
+# response cache and is stamped on every emitted snippet ("prompt_version")
+PROMPT_VERSION = hashlib.sha256("\0".join((
+    SYSTEM_PROMPT, REVIEW_TEMPLATE, PACKED_TEMPLATE, json.dumps(RESPONSE_SCHEMA, sort_keys=True),
+)).encode("utf-8")).hexdigest()[:12]
+
+def build_messages(comment_text):
+    """Chat messages for one review: stable system prefix + the review as the user turn."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user",   "content": REVIEW_TEMPLATE.format(review=comment_text)},
+    ]
+
+def build_packed_messages(reviews):
+    """
+    Same prefix, but several reviews in one user turn. `reviews` is a list of
+    (review_id, comment_text); the model must answer with one JSON object
+    mapping every review id to that review's snippet list.
+    """
+    body = "".join(f"\n\n[REVIEW {rid} START]\n{text}\n[REVIEW {rid} END]" for rid, text in reviews)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user",   "content": PACKED_TEMPLATE.format(n=len(reviews), reviews=body)},
+    ]
+
+def parse_ai_response(raw_json):
+    """
+    Validate a {"snippets": [...]} response (a bare list, as older prompt
+    versions returned, is accepted too) in one pass.
+    Returns (snippets, ok); ok is False if anything did not match the schema.
+    """
+    try:
+        parsed = json.loads(raw_json)
+    except (TypeError, json.JSONDecodeError):
+        return [], False
+    if isinstance(parsed, dict):
+        parsed = parsed.get("snippets")
+    return validate_snippets(parsed)
+
+def validate_snippets(items):
+    """Keep well-formed {'text', 'difficulty'} items, whitespace-normalized; (snippets, ok)."""
+    if not isinstance(items, list):
+        return [], False
+    cleaned, ok = [], True
+    for item in items:
+        try:
+            raw_text, diff = item["text"], item["difficulty"]
+        except (TypeError, KeyError):
+            ok = False
+            continue
+        if not isinstance(raw_text, str) or type(diff) is not int or diff not in (1, 2, 3):
+            ok = False
+            continue
+        txt = " ".join(raw_text.split())
+        # Guard against empty/placeholder values like "[]"
+        if txt and txt != "[]":
+            cleaned.append({"text": txt, "difficulty": diff})
+    return cleaned, ok
+
+def parse_packed_response(raw_json, review_ids):
+    """
+    Parse a multi-review response into ({review_id: snippet list}, ok).
+    Returns (None, False) when the payload as a whole is unusable; ids the
+    model left out (or answered with a non-list) are absent from the result.
+    """
+    try:
+        parsed = json.loads(raw_json)
+    except (TypeError, json.JSONDecodeError):
+        return None, False
+    if not isinstance(parsed, dict):
+        return None, False
+    out, all_ok = {}, True
+    for rid in review_ids:
+        items = parsed.get(rid)
+        snippets, ok = validate_snippets(items)
+        all_ok = all_ok and ok
+        if isinstance(items, list):
+            out[rid] = snippets
+    return out, all_ok
+
+def _request_kwargs(messages, response_format=RESPONSE_FORMAT):
+    return dict(
+        model           = MODEL_ID,
+        messages        = messages,
+        response_format = response_format
+    )
+
+def _estimate_tokens(messages, completions=1):
+    # ~4 chars per token for the prompt, plus room for the completion(s)
+    return sum(len(m["content"]) for m in messages) // 4 + EST_COMPLETION_TOKENS * completions
+
+def _used_tokens(response):
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+def _message_content(response):
+    """The answer text, or None when the model refused (structured outputs report it separately)."""
+    message = response.choices[0].message
+    if getattr(message, "refusal", None):
+        print(f"⚠️  Model refused: {message.refusal}")
+        metrics.record_refusal()
+        return None
+    return message.content
+
+def _error_headers(err):
+    return getattr(getattr(err, "response", None), "headers", None)
+
+def cache_lookup(comment_text):
+    if cache is None:
+        return None
+    return cache.get(cache_key(comment_text, MODEL_ID, PROMPT_VERSION))
+
+def cache_store(comment_text, content):
+    if cache is not None and content is not None:
+        cache.put(cache_key(comment_text, MODEL_ID, PROMPT_VERSION), content)
+
+def prefilter_drops(comment_text):
+    return prefilter is not None and not prefilter.keep(comment_text)
+
+def log_outcome(comment_text, snippets):
+    """Log the model's verdict for pre-filter training."""
+    outcomes_log.write(json.dumps({"comment_text": comment_text, "snippets": len(snippets)},
+                                  ensure_ascii=False) + "\n")
+
+def extracted(comment_text, content):
+    """
+    Snippets from an already-vetted (cached) response. Not logged again: its
+    outcome went to the log when the response was first fetched.
+    """
+    snippets, _ = parse_ai_response(content)
+    return snippets
+
+def resolve_locally(comment_text):
+    """Snippets we can settle without a request (junk, cache hit, pre-filter), else None."""
+    # quick sanity filter
+    if is_junk_comment(comment_text):
+        return []
+    cached = cache_lookup(comment_text)
+    if cached is not None:
+        return extracted(comment_text, cached)
+    if prefilter_drops(comment_text):
+        return []
+    return None
+
+def finish(comment_text, content, cache_it=True):
+    """A fresh model answer: validate it once, count it, and cache it only if well-formed."""
+    snippets, ok = parse_ai_response(content)
+    metrics.record_response(ok)
+    if not ok:
+        print(f"⚠️  Malformed AI response (kept {len(snippets)} valid snippet(s), not cached): {content!r}")
+    elif cache_it:
+        cache_store(comment_text, content)
+    log_outcome(comment_text, snippets)
+    return snippets
+
+def _completed(raw, t0, est):
+    """Parse a raw response, feed its timing/headers/usage to the limiter and metrics."""
+    response = raw.parse()
+    elapsed  = time.perf_counter() - t0
+    limiter.record_call(elapsed, raw.headers, est, _used_tokens(response))
+    metrics.record_request(elapsed, getattr(response, "usage", None))
+    return _message_content(response)
+
+def _retry_pause(err, retries):
+    """
+    Classify a failed attempt: None gives up, otherwise the seconds the caller
+    sleeps before retrying. Rate limits pause every worker through the limiter
+    (its next reserve() holds the pause, so 0 here); connection errors and 5xx
+    back off exponentially on their own.
+    """
+    backoff = INITIAL_DELAY * 2 ** (retries - 1)
+    if isinstance(err, RateLimitError):
+        pause = limiter.record_rate_limited(_error_headers(err), backoff)
+        metrics.record_retry(pause)
+        print(f"🌐 Rate‑limit, retrying in {pause:0.1f}s… ({retries}/{MAX_RETRIES})")
+        return 0.0
+    if isinstance(err, TransientErrors):
+        metrics.record_retry(backoff)
+        print(f"🌐 {type(err).__name__}, retrying in {backoff:0.1f}s… ({retries}/{MAX_RETRIES})")
+        return backoff
+    if isinstance(err, APIError):
+        print(f"❌ OpenAI API error: {err}")
+    else:
+        print(f"❌ Unexpected error: {err}")
+    metrics.record_failure()
+    return None
+
+def _gave_up():
+    print("❌ Reached max retries with OpenAI.")
+    metrics.record_failure()
+    return None
+
+def request_content(messages, est_tokens=None, response_format=RESPONSE_FORMAT):
+    """One chat completion with rate limiting + retries; returns content or None."""
+    est    = est_tokens or _estimate_tokens(messages)
+    kwargs = _request_kwargs(messages, response_format)
+    for retries in range(1, MAX_RETRIES + 1):
+        try:
+            wait = limiter.reserve(est)
+            if wait:
+                time.sleep(wait)
+            t0 = time.perf_counter()
+            return _completed(client.chat.completions.with_raw_response.create(**kwargs), t0, est)
+        except Exception as e:
+            pause = _retry_pause(e, retries)
+            if pause is None:
+                return None
+            if pause:
+                time.sleep(pause)
+    return _gave_up()
+
+async def async_request_content(messages, est_tokens=None, response_format=RESPONSE_FORMAT):
+    """Same as request_content, but on the AsyncOpenAI client."""
+    est    = est_tokens or _estimate_tokens(messages)
+    kwargs = _request_kwargs(messages, response_format)
+    for retries in range(1, MAX_RETRIES + 1):
+        try:
+            wait = limiter.reserve(est)
+            if wait:
+                await asyncio.sleep(wait)
+            t0 = time.perf_counter()
+            return _completed(await async_client.chat.completions.with_raw_response.create(**kwargs), t0, est)
+        except Exception as e:
+            pause = _retry_pause(e, retries)
+            if pause is None:
+                return None
+            if pause:
+                await asyncio.sleep(pause)
+    return _gave_up()
+
+def call_ai_to_extract_snippets(comment_text):
+    """
+    Calls the OpenAI API to analyze the comment, extract engaging snippets,
+    and assign a difficulty rating (1‑3) to each.
+    Returns a list of dicts, e.g. [{'text': 'snippet', 'difficulty': 2}].
+    """
+    local = resolve_locally(comment_text)
+    return local if local is not None else _extract_remote(comment_text)
+
+def _extract_remote(comment_text):
+    content = request_content(build_messages(comment_text))
+    return [] if content is None else finish(comment_text, content)
+
+async def async_call_ai_to_extract_snippets(comment_text):
+    """Same as call_ai_to_extract_snippets, but on the AsyncOpenAI client."""
+    local = resolve_locally(comment_text)
+    return local if local is not None else await _async_extract_remote(comment_text)
+
+async def _async_extract_remote(comment_text):
+    content = await async_request_content(build_messages(comment_text))
+    return [] if content is None else finish(comment_text, content)
+
+def _pack(comment_texts):
+    """
+    Split a group into (results, to_send): results[i] is filled for anything
+    resolved locally; to_send lists (review_id, index) still needing the model.
+    """
+    results = [resolve_locally(t) for t in comment_texts]
+    to_send = [(f"r{i}", i) for i, r in enumerate(results) if r is None]
+    return results, to_send
+
+def _unpack(comment_texts, results, to_send, content):
+    """Route a packed response back to its comments; returns indices needing a single call."""
+    if content is None:
+        return [i for _, i in to_send]
+    parsed, ok = parse_packed_response(content, [rid for rid, _ in to_send])
+    metrics.record_response(ok)
+    if parsed is None:
+        print(f"⚠️  Malformed packed response – falling back to one call per review: {content!r}")
+        return [i for _, i in to_send]
+    retry = []
+    for rid, i in to_send:
+        if rid in parsed:
+            snippets = parsed[rid]
+            # cached per comment, in the single-review shape
+            if ok:
+                cache_store(comment_texts[i], json.dumps({"snippets": snippets}, ensure_ascii=False))
+            log_outcome(comment_texts[i], snippets)
+            results[i] = snippets
+        else:
+            retry.append(i)
+    if retry:
+        print(f"⚠️  {len(retry)} review(s) missing from packed response – retrying singly")
+    return retry
+
+def call_ai_to_extract_snippets_packed(comment_texts):
+    """
+    Like call_ai_to_extract_snippets, for several comments in ONE request:
+    the shared instructions are paid for once instead of once per review.
+    Returns one snippet list per input comment, in order.
+    """
+    results, to_send = _pack(comment_texts)
+    if len(to_send) == 1:
+        i = to_send[0][1]
+        results[i] = _extract_remote(comment_texts[i])
+    elif to_send:
+        msgs    = build_packed_messages([(rid, comment_texts[i]) for rid, i in to_send])
+        content = request_content(msgs, _estimate_tokens(msgs, completions=len(to_send)),
+                                  packed_response_format([rid for rid, _ in to_send]))
+        for i in _unpack(comment_texts, results, to_send, content):
+            results[i] = _extract_remote(comment_texts[i])
+    return results
+
+async def async_call_ai_to_extract_snippets_packed(comment_texts):
+    """Same as call_ai_to_extract_snippets_packed, but on the AsyncOpenAI client."""
+    results, to_send = _pack(comment_texts)
+    if len(to_send) == 1:
+        i = to_send[0][1]
+        results[i] = await _async_extract_remote(comment_texts[i])
+    elif to_send:
+        msgs    = build_packed_messages([(rid, comment_texts[i]) for rid, i in to_send])
+        content = await async_request_content(msgs, _estimate_tokens(msgs, completions=len(to_send)),
+                                              packed_response_format([rid for rid, _ in to_send]))
+        for i in _unpack(comment_texts, results, to_send, content):
+            results[i] = await _async_extract_remote(comment_texts[i])
+    return results
+
+# ── STATE LOAD ────────────────────────────────────────────────────────────────
+# Neither file is ever held in memory: comments are streamed from raw_path,
+# finished work goes to the journal, and compact() streams both files into
+# their replacements.
+raw_path       = None
+processed_path = None
+journal        = None
+
+def _comment_key(comment):
+    return json.dumps(comment, sort_keys=True, ensure_ascii=False)
+
+def comment_id(comment):
+    """Stable id for a raw comment record (identical records share an id)."""
+    return hashlib.sha1(_comment_key(comment).encode("utf-8")).hexdigest()
+
+# comment ids finished since the files were last compacted (with multiplicity)
+done_comments = Counter()
+new_snippets  = 0
+emitted       = None    # run(collect=True): this run's new snippet records, handed back
+total_pending = 0
+folded        = 0       # repeated comments --dedupe removed before the run
+
+def _tmp(path):
+    return path.with_suffix(path.suffix + TMP_SUFFIX)
+
+def _swap_in():
+    """Second half of compact(): swap in whichever *.tmp is still there, drop the sealed journal."""
+    for path in (raw_path, processed_path):
+        if _tmp(path).exists():
+            os.replace(_tmp(path), path)
+    journal.discard_sealed()
+
+def compact():
+    """
+    Fold the journal into the two data files, then truncate it. Both
+    replacements are streamed to *.tmp first; the journal is sealed (see
+    journal.py) before they are swapped in, so a crash mid-swap is finished
+    by the next load_state() instead of replaying the journal twice.
+    Returns (remaining comments, total snippets).
+    """
+    journal.sync()
+    remaining = Counter(done_comments)
+
+    def pending():
+        for c in iter_records(raw_path):
+            cid = comment_id(c)
+            if remaining[cid]:
+                remaining[cid] -= 1
+            else:
+                yield c
+
+    def snippets():
+        yield from iter_records(processed_path)
+        for _, snips in journal.replay():
+            yield from snips
+
+    n_raw  = dump_records(_tmp(raw_path),       pending(),  jsonl=is_jsonl(raw_path))
+    n_proc = dump_records(_tmp(processed_path), snippets(), jsonl=is_jsonl(processed_path))
+    journal.seal()
+    _swap_in()
+    done_comments.clear()
+    return n_raw, n_proc
+
+def shard_of(comment, count, by="course"):
+    """Deterministic shard (0..count-1) for a raw comment, the same on every machine."""
+    key = comment.get("course_id") if by == "course" else comment.get("comment_text", "").strip()
+    digest = hashlib.sha1(str(key).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+def split_shard(source, dest):
+    """Write this shard's slice of `source` to `dest` (first run of a shard only)."""
+    index, count = args.shard
+    mine = (c for c in iter_records(source) if shard_of(c, count, args.shard_by) == index)
+    tmp  = dest.with_suffix(dest.suffix + TMP_SUFFIX)
+    n    = dump_records(tmp, mine, jsonl=is_jsonl(source))
+    os.replace(tmp, dest)
+    print(f"🔹 Shard {index}/{count}: {n} comment(s) split off from {source.name} into {dest}")
+
+def load_state():
+    global raw_path, processed_path, journal, new_snippets, total_pending, batch_state_path, folded
+    raw_path         = args.raw_file or DATA_DIR / RAW_DATA_FILE
+    if args.shard:
+        # the shared input is only read; the shard works on (and shrinks) its own copy
+        source   = raw_path
+        raw_path = data_dir / source.name
+        if not raw_path.exists():
+            split_shard(source, raw_path)
+    processed_path   = args.processed_file or data_dir / PROCESSED_SNIPPETS_FILE
+    batch_state_path = data_dir / BATCH_STATE_FILE
+    journal          = ProgressJournal(data_dir / JOURNAL_FILE, fsync_every=JOURNAL_FSYNC_EVERY)
+    done_comments.clear()
+    new_snippets, folded = 0, 0
+
+    if journal.sealed_path.exists():
+        print(f"🔹 Finishing a compaction interrupted mid-swap ({journal.sealed_path.name})")
+        _swap_in()
+
+    # replay whatever a previous (crashed / killed) run journaled but never compacted
+    replayed = 0
+    for cid, _ in journal.replay():
+        done_comments[cid] += 1
+        replayed += 1
+    if replayed:
+        print(f"🔹 Replayed {replayed} journaled comment(s) from {JOURNAL_FILE}")
+        compact()
+
+    # after the replay: folding changes the records, and with them their comment ids
+    if args.dedupe:
+        if batch_state_path.exists():
+            print(f"⚠️  {BATCH_STATE_FILE} exists – not folding comments while a batch is outstanding")
+        else:
+            stats  = compact_raw(raw_path, args.canonical_course, skip=is_junk_comment)
+            folded = stats["folded"]
+            print(f"🔹 Dedupe: {describe_dedupe(stats)}")
+
+    total_pending = count_records(raw_path)
+    print(f"🔹 Loaded {total_pending} pending comments")
+    print(f"🔹 Loaded {count_records(processed_path)} snippets already processed")
+
+# ── graceful Ctrl‑C ───────────────────────────────────────────────────────────
+interrupted = False
+def _handle_sigint(sig, frame):
+    global interrupted
+    interrupted = True
+    print("\n⚠️  Ctrl‑C detected – finishing in‑flight comment(s) then saving…",
+          file=sys.stderr)
+
+# ── PER‑COMMENT HELPERS ──────────────────────────────────────────────────────
+def build_records(comment, snippets, prompt_version=None):
+    """Validated processed_snippets.json records for *comment*."""
+    records = []
+    for snip in snippets:
+        txt  = re.sub(r"\s+", " ", snip["text"]).strip()
+        # Double-check guard at write time as well
+        if not txt or txt == "[]":
+            continue
+        # Derive counts and difficulty deterministically from final text
+        wc = word_count(txt)
+        cc = char_count(txt)
+        # Difficulty strictly from character count to match system prompt guidance;
+        # the import re-computes it with the quantile edges (difficulty.py)
+        diff = difficulty_from_char_count(cc)
+        records.append({
+            "text"               : txt,
+            "source"             : DEFAULT_SOURCE,
+            "category"           : DEFAULT_CATEGORY,
+            "difficulty"         : diff,
+            "word_count"         : wc,
+            "character_count"    : cc,
+            "is_princeton_themed": True,
+            "original_url"       : comment.get("evaluation_url"),
+            "original_course_id" : comment.get("course_id", "???"),
+            "original_term_id"   : comment.get("term",      "???"),
+            "course_name"        : comment.get("course_name"),  # may be None
+            "prompt_version"     : prompt_version or PROMPT_VERSION,
+        })
+        # --dedupe: the same comment under other course_ids / terms
+        if comment.get(CROSS_LISTINGS):
+            records[-1][CROSS_LISTINGS] = comment[CROSS_LISTINGS]
+    return records
+
+def _journal_done(comment, snippets, prompt_version=None):
+    """Keep a finished comment's snippets and journal it so we never revisit it."""
+    global new_snippets
+    records = build_records(comment, snippets, prompt_version)
+    new_snippets += len(records)
+    if emitted is not None:
+        emitted.extend(records)
+    metrics.record_comment(len(records))
+    cid = comment_id(comment)
+    done_comments[cid] += 1
+    journal.append(cid, records)
+    return records
+
+def _sink_failed():
+    """The stream loader died: stop like Ctrl-C."""
+    global interrupted
+    if not interrupted:
+        interrupted = True
+        print("\n⚠️  DB loader stopped – finishing in‑flight comment(s) then saving…", file=sys.stderr)
+
+def mark_done(comment, snippets, prompt_version=None):
+    """Record a finished comment; in `pipeline.py stream` also hand it to the DB loader (may block)."""
+    records = _journal_done(comment, snippets, prompt_version)
+    if record_sink is not None and records and not record_sink.put(records):
+        _sink_failed()
+
+async def async_mark_done(comment, snippets):
+    """
+    mark_done() for the event loop: a full loader queue is waited out on a
+    worker thread, so the other in-flight requests (and the limiter) keep going.
+    """
+    records = _journal_done(comment, snippets)
+    if record_sink is not None and records and not await asyncio.to_thread(record_sink.put, records):
+        _sink_failed()
+
+def iter_groups(size):
+    """Pending comments as lists of up to `size` (index, comment) pairs."""
+    group = []
+    for idx, comment in enumerate(iter_records(raw_path)):
+        group.append((idx, comment))
+        if len(group) == size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+def _announce(group, total):
+    for idx, comment in group:
+        cid  = comment.get("course_id", "???")
+        term = comment.get("term",      "???")
+        print(f"\n[{idx+1}/{total}] Course {cid} ({term}) – extracting…")
+
+def _split_empty(group):
+    """mark_done() comments without text; return the rest."""
+    keep = []
+    for idx, comment in group:
+        if comment.get("comment_text", "").strip():
+            keep.append((idx, comment))
+        else:
+            mark_done(comment, [])
+    return keep
+
+# ── MAIN LOOP (sequential) ────────────────────────────────────────────────────
+def run_sequential():
+    total = total_pending
+    for group in iter_groups(args.pack):
+        if interrupted:
+            break
+
+        group = _split_empty(group)
+        if not group:
+            continue
+        _announce(group, total)
+
+        texts = [c["comment_text"].strip() for _, c in group]
+        for (idx, comment), snippets in zip(group, call_ai_to_extract_snippets_packed(texts)):
+            print(f"    → [{idx+1}] {len(snippets)} snippet(s)")
+            mark_done(comment, snippets)
+
+# ── MAIN LOOP (async, bounded pool) ───────────────────────────────────────────
+async def run_concurrent(concurrency):
+    """
+    Runs `concurrency` workers that pull from one shared queue of pending
+    comments (in groups of --pack), so at most that many requests are in
+    flight at once. Each comment is journaled only after its snippets are
+    recorded, so a restart resumes exactly where we stopped. Since everything
+    runs on one event loop, the shared state needs no locks.
+    """
+    pending = iter_groups(args.pack)    # shared by all workers
+    total   = total_pending
+
+    async def worker():
+        for group in pending:
+            if interrupted:
+                return
+
+            group = _split_empty(group)
+            if not group:
+                continue
+            _announce(group, total)
+
+            texts   = [c["comment_text"].strip() for _, c in group]
+            results = await async_call_ai_to_extract_snippets_packed(texts)
+            for (idx, comment), snippets in zip(group, results):
+                print(f"    → [{idx+1}] {len(snippets)} snippet(s)")
+                await async_mark_done(comment, snippets)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    await async_client.close()
+
+# ── MAIN LOOP (Batch API) ─────────────────────────────────────────────────────
+batch_state_path = None
+
+def submit_batches(backend):
+    """
+    Write every pending comment into JSONL request file(s), submit them, and
+    persist the batch ids (plus the comment behind each custom_id) so a later
+    run can pick the results up even if this process is stopped while polling.
+    """
+    to_send = []
+    answered = 0
+    for comment in iter_records(raw_path):
+        comment_text = comment.get("comment_text", "").strip()
+        # junk never reaches the API, same as the per‑comment path
+        if not comment_text or is_junk_comment(comment_text):
+            mark_done(comment, [])
+            continue
+        # answer what we can from the cache before paying for anything
+        cached = cache_lookup(comment_text)
+        if cached is not None:
+            mark_done(comment, extracted(comment_text, cached))
+            answered += 1
+            continue
+        if prefilter_drops(comment_text):
+            mark_done(comment, [])
+            continue
+        to_send.append(comment)
+    if answered:
+        print(f"🔹 {answered} comment(s) answered from cache")
+    compact()
+
+    chunks = []     # [(path, {custom_id: comment})]
+    out, size = None, 0
+    for idx, comment in enumerate(to_send):
+        body = _request_kwargs(build_messages(comment["comment_text"].strip()))
+        custom_id = f"c{idx}"
+        line = json.dumps({"custom_id": custom_id, "method": "POST",
+                           "url": ENDPOINT, "body": body}, ensure_ascii=False) + "\n"
+        nbytes = len(line.encode("utf-8"))
+        if out is None or len(chunks[-1][1]) >= BATCH_MAX_REQUESTS or size + nbytes > BATCH_MAX_BYTES:
+            if out:
+                out.close()
+            path = data_dir / BATCH_REQUEST_FILE.format(n=len(chunks))
+            out, size = path.open("w", encoding="utf-8"), 0
+            chunks.append((path, {}))
+        out.write(line)
+        size += nbytes
+        chunks[-1][1][custom_id] = comment
+    if out:
+        out.close()
+
+    if not chunks:
+        print("🔹 Nothing to submit.")
+        return None
+
+    state = {"batches": []}
+    for path, comments in chunks:
+        batch_id = backend.submit(path)
+        print(f"🔹 Submitted {len(comments)} request(s) from {path.name} as {batch_id}")
+        state["batches"].append({"id": batch_id, "request_file": path.name,
+                                 "prompt_version": PROMPT_VERSION,
+                                 "comments": comments, "done": False})
+        atomic_write(state, batch_state_path)
+    return state
+
+def collect_batch(backend, batch, info):
+    """Stream a finished batch's results through the normal parse/record path."""
+    ok = 0
+    if info["output_file_id"]:
+        for res in backend.iter_results(info["output_file_id"]):
+            comment = batch["comments"].get(res.get("custom_id"))
+            if comment is None:
+                continue
+            resp = res.get("response") or {}
+            if res.get("error") or resp.get("status_code") != 200:
+                print(f"⚠️  {res.get('custom_id')} failed in batch: {res.get('error') or resp.get('status_code')}")
+                metrics.record_failure()
+                continue
+            try:
+                message = resp["body"]["choices"][0]["message"]
+                content = message["content"]
+            except (KeyError, IndexError, TypeError):
+                print(f"⚠️  {res.get('custom_id')}: unexpected result shape – skipping")
+                continue
+            if message.get("refusal"):
+                print(f"⚠️  {res.get('custom_id')}: model refused: {message['refusal']}")
+                metrics.record_refusal()
+                continue
+            metrics.record_request(None, resp["body"].get("usage"), batch=True)
+            comment_text = comment["comment_text"].strip()
+            # answered by whatever prompt was current at submit time
+            version = batch.get("prompt_version", PROMPT_VERSION)
+            snippets = finish(comment_text, content, cache_it=version == PROMPT_VERSION)
+            mark_done(comment, snippets, version)
+            ok += 1
+
+    # results must be durable before the batch is marked as collected
+    journal.sync()
+    print(f"    💾 {batch['id']}: {ok}/{len(batch['comments'])} comment(s) collected "
+          f"({len(batch['comments']) - ok} left in {raw_path.name} for a later run)")
+
+def batch_backend():
+    """The --batch-backend the run was started with."""
+    if args.batch_backend == 'local':
+        from .fake_openai import answer
+        return LocalBatchBackend(data_dir / BATCH_LOCAL_DIR, lambda body: answer(body["messages"]))
+    # file uploads / batch polls are not paced by the limiter: let the SDK retry them
+    return OpenAIBatchBackend(client.with_options(max_retries=2))
+
+def run_batch(backend):
+    state = load_json(batch_state_path, None)
+    if state is None:
+        state = submit_batches(backend)
+        if state is None:
+            return
+    else:
+        print(f"🔹 Resuming {len(state['batches'])} submitted batch(es) from {BATCH_STATE_FILE}")
+
+    while not interrupted:
+        pending = [b for b in state["batches"] if not b["done"]]
+        if not pending:
+            break
+        for b in pending:
+            info = backend.status(b["id"])
+            print(f"🔹 {b['id']}: {info['status']} {info['counts']}")
+            if info["status"] in TERMINAL_STATUSES:
+                collect_batch(backend, b, info)
+                b["done"] = True
+                atomic_write(state, batch_state_path)
+        if any(not b["done"] for b in state["batches"]):
+            for _ in range(BATCH_POLL_INTERVAL):   # short naps so Ctrl‑C is noticed
+                if interrupted:
+                    break
+                time.sleep(1)
+
+    if all(b["done"] for b in state["batches"]):
+        compact()
+        for b in state["batches"]:
+            (data_dir / b["request_file"]).unlink(missing_ok=True)
+        batch_state_path.unlink(missing_ok=True)
+    else:
+        print("⚠️  Batches still running – rerun with --batch to collect them.")
+
+# ── ENTRY POINT ───────────────────────────────────────────────────────────────
+def run(run_args, sink=None, collect=False):
+    """
+    One extraction pass over the pending comments. With collect=True, returns
+    the snippet records emitted by this run (already saved to
+    processed_snippets.json) so a caller can hand them straight to
+    load.run() – they are held in memory, so only ask when you need them;
+    otherwise returns None. With a `sink` (load.StreamLoader) every comment's
+    records are also put() to it as soon as they are journaled.
+    """
+    global args, interrupted, metrics, record_sink, emitted
+    args, interrupted, record_sink = run_args, False, sink
+    emitted = [] if collect else None
+    setup()
+    load_state()
+    metrics = RunMetrics(MODEL_ID, total_pending)
+    metrics.folded = folded
+    previous_handler = signal.signal(signal.SIGINT, _handle_sigint)
+    try:
+        start_time = time.perf_counter()
+        if args.batch:
+            run_batch(batch_backend())
+        elif batch_state_path.exists():
+            print(f"❌  {BATCH_STATE_FILE} exists – a batch is still outstanding. "
+                  f"Rerun with --batch to collect it first.")
+            sys.exit(1)
+        elif args.concurrency > 1:
+            print(f"🔹 Async mode: up to {args.concurrency} requests in flight")
+            asyncio.run(run_concurrent(args.concurrency))
+        else:
+            run_sequential()
+
+        # ── FINAL SAVE ────────────────────────────────────────────────────────
+        remaining, total_snippets = compact()
+
+        elapsed = time.perf_counter() - start_time
+        print(f"\n✅ Done. Remaining comments: {remaining}  |  "
+              f"total snippets: {total_snippets} ({new_snippets} new)  |  runtime: {elapsed:0.1f}s")
+        print(f"🌐 OpenAI: {limiter.summary()}")
+        print(f"📈 Metrics: {metrics.summary()}")
+        if cache is not None:
+            print(f"🗄️  Cache: {cache.summary()}")
+        if prefilter is not None:
+            print(f"🧹 Pre-filter: {prefilter.summary(outcomes_path)}")
+
+        metrics_path = args.metrics_file or data_dir / METRICS_FILE.format(
+            stamp=time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()))
+        metrics.write(metrics_path, limiter)
+        print(f"📈 Metrics written to {metrics_path}")
+        quality = metrics.update_quality(DATA_DIR / QUALITY_FILE)
+        if quality["responses"]:
+            print(f"📈 {MODEL_ID}: {quality['malformed']}/{quality['responses']} malformed response(s) "
+                  f"across all runs ({quality['malformed_rate']:.2%})")
+        return emitted
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        journal.close()
+        if cache is not None:
+            cache.close()
+        outcomes_log.close()
@@ -0,0 +1,225 @@
+"""
+fake_openai.py  – local stand-in for the OpenAI chat-completions endpoint, so
+extract can be benchmarked without spending API money.
+
+    python3 server/scraping/pipeline.py fake-openai --port 8089 --latency 0.8 --rate-limit-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=bench python3 server/scraping/process_evals.py
+
+Answers every POST .../chat/completions after a configurable (jittered)
+latency with snippets cut from the review(s) in the prompt – single reviews
+and --pack groups alike – plus a `usage` block and `x-ratelimit-*` headers
+like the real API. A share of requests can instead fail with a 500 or a 429
+(with retry-after), or come back as truncated / off-schema JSON. The Batch / Files API is not emulated over HTTP:
+`extract --batch --batch-backend local` answers its batch files with answer()
+in-process instead (batch_api.LocalBatchBackend).
+"""
+
+import json, random, re, threading, time, zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REVIEW_RE = re.compile(r"\[REVIEW START\]\n(.*?)\n\[REVIEW END\]", re.S)
+PACKED_RE = re.compile(r"\[REVIEW (\w+) START\]\n(.*?)\n\[REVIEW \1 END\]", re.S)
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+RATE_LIMIT_RPM = 30_000          # advertised in x-ratelimit-* headers
+RATE_LIMIT_TPM = 150_000_000
+CACHE_BLOCK    = 128             # prompt caching works in 128-token steps …
+CACHE_MIN      = 1024            # … once the prefix is at least this long
+
+def snippets_for(review):
+    """Up to two sentences of a reasonable length, chosen deterministically per review."""
+    rnd = random.Random(zlib.crc32(review.encode("utf-8")))
+    sentences = [s.strip() for s in SENTENCE_RE.split(review) if 40 <= len(s.strip()) <= 220]
+    picked = rnd.sample(sentences, min(len(sentences), rnd.choice((0, 1, 1, 2))))
+    return [{"text": s, "difficulty": 3 if len(s) > 185 else 2 if len(s) >= 100 else 1}
+            for s in picked]
+
+def answer(messages):
+    """JSON content the model would return for these chat messages."""
+    prompt = messages[-1].get("content", "") if messages else ""
+    packed = PACKED_RE.findall(prompt)
+    if packed:
+        return json.dumps({rid: snippets_for(text) for rid, text in packed})
+    single = REVIEW_RE.search(prompt)
+    return json.dumps({"snippets": snippets_for(single.group(1)) if single else []})
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5, jitter=0.3, error_rate=0.0,
+                 rate_limit_rate=0.0, retry_after=0.5, malformed_rate=0.0, seed=0):
+        super().__init__(address, _Handler)
+        self.latency         = latency
+        self.jitter          = jitter
+        self.error_rate      = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after     = retry_after
+        self.malformed_rate  = malformed_rate
+        self._rnd            = random.Random(seed)
+        self._lock           = threading.Lock()
+        self._prefixes       = set()     # system prompts already "cached"
+
+        # counters
+        self.requests     = 0
+        self.answered     = 0
+        self.errors       = 0
+        self.rate_limited = 0
+        self.malformed    = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def draw(self):
+        """(outcome, delay) for one request: 'ok', 'malformed', 'error' or '429'."""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self._rnd.gauss(self.latency, self.latency * self.jitter))
+            roll  = self._rnd.random()
+            if roll < self.rate_limit_rate:
+                self.rate_limited += 1
+                return "429", 0.0
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.errors += 1
+                return "error", delay
+            if roll < self.rate_limit_rate + self.error_rate + self.malformed_rate:
+                self.malformed += 1
+                return "malformed", delay
+            self.answered += 1
+            return "ok", delay
+
+    def cached_tokens(self, system_prompt, prompt_tokens):
+        """Mimic automatic prompt caching: a repeated system prefix is served from cache."""
+        prefix = len(system_prompt) // 4
+        with self._lock:
+            seen = system_prompt in self._prefixes
+            self._prefixes.add(system_prompt)
+        if not seen or prefix < CACHE_MIN:
+            return 0
+        return min(prompt_tokens, prefix - prefix % CACHE_BLOCK)
+
+    def summary(self):
+        return (f"{self.requests} request(s): {self.answered} answered, "
+                f"{self.errors} injected error(s), {self.rate_limited} injected 429(s), "
+                f"{self.malformed} malformed")
+
+    def as_dict(self):
+        return {"requests": self.requests, "answered": self.answered, "errors": self.errors,
+                "rate_limited": self.rate_limited, "malformed": self.malformed}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):   # keep the benchmark output readable
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("content-length") or 0))
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send(404, {"error": {"message": f"{self.path} is not emulated",
+                                              "type": "invalid_request_error"}})
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            return self._send(400, {"error": {"message": "invalid JSON body",
+                                              "type": "invalid_request_error"}})
+
+        outcome, delay = self.server.draw()
+        if outcome == "429":
+            retry = self.server.retry_after
+            return self._send(429, {"error": {"message": "Rate limit reached (injected)",
+                                              "type": "requests", "code": "rate_limit_exceeded"}},
+                              # a transient 429, not an exhausted quota: headers stay healthy
+                              {"retry-after": f"{retry:g}", **self._limit_headers()})
+        time.sleep(delay)
+        if outcome == "error":
+            return self._send(500, {"error": {"message": "The server had an error (injected)",
+                                              "type": "server_error"}})
+
+        messages = request.get("messages") or []
+        content  = answer(messages)
+        if outcome == "malformed":
+            content = content[: len(content) // 2]     # cut off mid-JSON, like a max-tokens stop
+        prompt   = sum(len(m.get("content") or "") for m in messages) // 4
+        system   = messages[0].get("content", "") if messages and messages[0].get("role") == "system" else ""
+        usage    = {"prompt_tokens": prompt,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": prompt + len(content) // 4,
+                    "prompt_tokens_details": {"cached_tokens": self.server.cached_tokens(system, prompt)}}
+        self._send(200, {
+            "id": f"chatcmpl-bench{self.server.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "length" if outcome == "malformed" else "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": usage,
+        }, self._limit_headers())
+
+    def _limit_headers(self):
+        return {
+            "x-ratelimit-limit-requests":     str(RATE_LIMIT_RPM),
+            "x-ratelimit-remaining-requests": str(RATE_LIMIT_RPM - 1),
+            "x-ratelimit-reset-requests":     "2ms",
+            "x-ratelimit-limit-tokens":       str(RATE_LIMIT_TPM),
+            "x-ratelimit-remaining-tokens":   str(RATE_LIMIT_TPM - 1),
+            "x-ratelimit-reset-tokens":       "0ms",
+        }
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+def start(host="127.0.0.1", port=0, **config):
+    """Serve on a background thread; returns the server (port 0 = any free port)."""
+    server = FakeOpenAIServer((host, port), **config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+DESCRIPTION = 'Serve a fake OpenAI chat-completions endpoint for offline benchmarks.'
+
+def add_arguments(parser):
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    add_server_arguments(parser)
+
+def add_server_arguments(parser):
+    parser.add_argument('--latency', type=float, default=0.5, metavar='SEC',
+                        help='mean response latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.3,
+                        help='latency standard deviation as a fraction of the mean')
+    parser.add_argument('--error-rate', type=float, default=0.0, metavar='P',
+                        help='share of requests answered with a 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, metavar='P',
+                        help='share of requests answered with a 429')
+    parser.add_argument('--retry-after', type=float, default=0.5, metavar='SEC',
+                        help='retry-after sent with injected 429s')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, metavar='P',
+                        help='share of answers cut off mid-JSON')
+    parser.add_argument('--seed', type=int, default=0)
+
+def server_config(args):
+    return dict(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                malformed_rate=args.malformed_rate, seed=args.seed)
+
+def run(args):
+    server = FakeOpenAIServer((args.host, args.port), **server_config(args))
+    print(f"🔹 Fake OpenAI listening – export OPENAI_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n🔹 {server.summary()}")
@@ -0,0 +1,86 @@
+"""
+journal.py  – append-only progress log for process_evals.py.
+
+Instead of rewriting raw_evaluations.json and processed_snippets.json after
+every comment, each finished comment appends one JSONL line
+
+    {"id": "<comment id>", "snippets": [ ...emitted snippet records... ]}
+
+and the line is flushed to the OS right away (a killed process loses
+nothing); only the fsync, which guards against a machine crash, is batched
+every few lines. On startup the journal is replayed
+on top of the two JSON files; at the end of a run it is compacted into them
+and truncated. A torn final line (crash mid-write) is ignored on replay.
+
+Compaction writes both replacements to *.tmp, then seal()s the journal –
+renames it to *.sealed, the marker that both *.tmp files are complete – and
+only then swaps them in and discards the sealed journal. A run that finds a
+sealed journal finishes those swaps instead of replaying it again, so a crash
+between the two swaps can never fold the same snippets in twice.
+"""
+
+import json, os
+from pathlib import Path
+
+SEALED_SUFFIX = ".sealed"
+
+
+class ProgressJournal:
+    def __init__(self, path: Path, fsync_every=25):
+        self.path        = Path(path)
+        self.fsync_every = max(1, fsync_every)
+        self._f          = None
+        self._unsynced   = 0
+
+    def replay(self):
+        """Yield (comment_id, snippets) for every complete line on disk."""
+        if not self.path.exists():
+            return
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️  Ignoring torn line at the end of {self.path.name}")
+                    break
+                yield rec["id"], rec.get("snippets", [])
+
+    def append(self, comment_id, snippets):
+        if self._f is None:
+            self._f = self.path.open("a", encoding="utf-8")
+        self._f.write(json.dumps({"id": comment_id, "snippets": snippets}, ensure_ascii=False) + "\n")
+        self._f.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        if self._f is not None and self._unsynced:
+            os.fsync(self._f.fileno())
+            self._unsynced = 0
+
+    @property
+    def sealed_path(self):
+        return self.path.with_name(self.path.name + SEALED_SUFFIX)
+
+    def seal(self):
+        """Close the journal and move it aside; replay() sees nothing from here on."""
+        self.close()
+        if self.path.exists():
+            os.replace(self.path, self.sealed_path)
+        else:
+            self.sealed_path.touch()
+
+    def discard_sealed(self):
+        self.sealed_path.unlink(missing_ok=True)
+
+    def truncate(self):
+        """Call only after the JSON files have been atomically rewritten."""
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+    def close(self):
+        if self._f is not None:
+            self.sync()
+            self._f.close()
+            self._f = None
@@ -0,0 +1,123 @@
+"""
+jsonstream.py  – constant-memory readers/writers for the pipeline's data files.
+
+Both formats are accepted on input and detected from the content:
+
+  • JSON array  – the historical pretty-printed `[ {...}, {...} ]` files,
+                  parsed incrementally one element at a time
+  • JSONL       – one record per line
+
+On output the format follows the file extension (`.jsonl` → JSONL, anything
+else → the same `indent=2` array layout json.dump produces).
+"""
+
+import json, os
+from pathlib import Path
+
+CHUNK_SIZE = 1 << 16
+TMP_SUFFIX = ".tmp"
+
+_decoder = json.JSONDecoder()
+_WS      = " \t\r\n"
+
+
+def _iter_array(f, buf):
+    """Yield the elements of a top-level JSON array read from text stream `f`."""
+    pos, eof = 1, False          # buf[0] == "["
+    while True:
+        # skip whitespace / separators, topping up the buffer as needed
+        while True:
+            while pos < len(buf) and buf[pos] in _WS + ",":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(CHUNK_SIZE), 0
+            eof = not buf
+        if pos >= len(buf):
+            # EOF before the closing bracket: a cut-off file, not an empty tail
+            raise json.JSONDecodeError("Unterminated array: expecting ']'", buf, pos)
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = _decoder.raw_decode(buf, pos)
+            # a value that ends exactly at the buffer edge might be truncated
+            if end == len(buf) and not eof:
+                raise json.JSONDecodeError("need more data", buf, end)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more = f.read(CHUNK_SIZE)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield obj
+        buf, pos = buf[end:], 0
+
+
+def iter_records(path: Path):
+    """Yield records from a JSON-array or JSONL file without loading it whole."""
+    path = Path(path)
+    if not path.exists():
+        return
+    with path.open(encoding="utf-8") as f:
+        head = f.read(CHUNK_SIZE)
+        stripped = head.lstrip()
+        if not stripped:
+            return
+        if stripped[0] == "[":
+            yield from _iter_array(f, stripped)
+            return
+        # JSONL: stitch the already-read head back in front of the rest
+        rest = head
+        while True:
+            *lines, rest = rest.split("\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            rest += chunk
+        if rest.strip():
+            yield json.loads(rest)
+
+
+def count_records(path: Path):
+    return sum(1 for _ in iter_records(path))
+
+
+def is_jsonl(path: Path):
+    return Path(path).suffix == ".jsonl"
+
+
+def dump_records(path: Path, records, jsonl=None):
+    """
+    Write `records` to `path` and return how many were written. The format
+    follows the extension unless `jsonl` says otherwise (e.g. for *.tmp files).
+    """
+    path = Path(path)
+    if jsonl is None:
+        jsonl = is_jsonl(path)
+    n = 0
+    with path.open("w", encoding="utf-8") as f:
+        if jsonl:
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                n += 1
+            return n
+        # identical layout to json.dump(records, f, indent=2)
+        for rec in records:
+            body = json.dumps(rec, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+            f.write(("[\n  " if n == 0 else ",\n  ") + body)
+            n += 1
+        f.write("[]" if n == 0 else "\n]")
+    return n
+
+
+def write_records_atomic(path: Path, records):
+    """dump_records to *.tmp then os.replace(), so readers never see a partial file."""
+    path = Path(path)
+    tmp  = path.with_suffix(path.suffix + TMP_SUFFIX)
+    n = dump_records(tmp, records, jsonl=is_jsonl(path))
+    os.replace(tmp, path)
+    return n
@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+import_snippets.py  – streams processed_snippets.json (JSON array or JSONL)
+and upserts the records into the `public.snippets` PostgreSQL table.
+
+ • Columns the script fills (the first 8 already existed):
+       text, source, category, difficulty, created_at,
+       word_count, character_count, is_princeton_themed,
+       princeton_course_url, term_code, course_id, course_name,
+       + the difficulty features (difficulty.py, migration 21)
+
+ • difficulty is bucketed by the per-category quantile edges in
+   snippet_difficulty_edges (written by `pipeline.py difficulty`), read once
+   per run; categories without edges keep the character-count tiers. Before
+   migration 21 the feature columns are left out and every row gets the tiers
+
+ • Row building / normalization lives in snippet_rows.py (process pool with
+   --workers N)
+
+ • Near-duplicates of snippets already in the table (or earlier in the file)
+   are rejected via a MinHash/LSH index (near_dupes.py); see --near-dupes
+
+ • The random-selection pool (snippet_pool, migration 20) is kept current by
+   triggers; the import checks it in the same transaction (selection_pool.py)
+
+ • `pipeline.py stream` feeds it from a running extract instead of a file:
+   StreamLoader commits micro-batches while the model calls are still going
+
+ • Reads DB credentials from env vars / .env :
+       DB_HOST / DB_PORT / DB_NAME / DB_USER / DB_PASSWORD
+"""
+
+# [AI DISCLAIMER: AI WAS USED TO HELP DEBUG THIS SCRIPT]
+
+import hashlib, itertools, json, os, queue, sys, threading, time
+from pathlib import Path
+
+from . import DATA_DIR, PROJECT_ROOT
+from .difficulty import FEATURE_COLUMNS, has_schema as has_feature_schema, load_edges
+from .jsonstream import iter_records
+from .near_dupes import NearDupIndex
+from .selection_pool import sync as sync_selection_pool
+from .snippet_rows import iter_rows
+
+# ── ARG PARSING ───────────────────────────────────────────────────────────────
+DESCRIPTION = 'Import snippets into database.'
+
+def add_arguments(parser):
+    parser.add_argument(
+        '--production',
+        action='store_true',
+        help='Connect to the production database using DATABASE_URL from .env'
+    )
+    parser.add_argument(
+        '--file',
+        type=Path,
+        help='Snippets to import (JSON array or .jsonl); default data/processed_snippets.json'
+    )
+    parser.add_argument(
+        '--full',
+        action='store_true',
+        help='Ignore the import manifest and re-send every record (full re-sync)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Normalize records on N processes while the main process uploads (default 1 = inline)'
+    )
+    parser.add_argument(
+        '--loader',
+        choices=['copy', 'values'],
+        default='copy',
+        help='copy: COPY into a temp staging table + one set-based merge (default); '
+             'values: the old paged INSERT ... VALUES'
+    )
+    parser.add_argument(
+        '--near-dupes',
+        choices=['reject', 'flag', 'off'],
+        default='reject',
+        help='What to do with snippets nearly identical to one already in the DB or earlier in the file'
+    )
+    parser.add_argument(
+        '--near-dup-threshold',
+        type=float,
+        default=None,
+        metavar='J',
+        help='Shingle Jaccard similarity (0–1) at which two snippets count as near-duplicates'
+    )
+
+def check_arguments(parser, args):
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+PROCESSED_FILE = "processed_snippets.json"
+MANIFEST_FILE  = "import_manifest.{target}.txt"  # hashes of records already committed
+NEAR_DUP_FILE  = "near_duplicates.jsonl"     # report of rejected / flagged near-duplicates
+NEAR_DUP_THRESHOLD = 0.8
+
+# Run state: module globals (re)initialised at the start of run().
+args      = None
+stats     = {}
+edges     = {}       # category → difficulty quantile cut points
+features  = True     # migration 21 ran: the feature columns are written
+
+# ── connection ────────────────────────────────────────────────────────────────
+def connection_params(production):
+    """(target label, psycopg2.connect kwargs); exits if the env is incomplete."""
+    from dotenv import load_dotenv
+
+    # pull DB creds from .env (same pattern as other scripts)
+    dotenv_path = PROJECT_ROOT / ".env"
+    if dotenv_path.exists():
+        load_dotenv(dotenv_path)
+
+    DATABASE_URL = os.getenv("DATABASE_URL")
+
+    if production:
+        if not DATABASE_URL:
+            print("❌  --production flag set, but DATABASE_URL not found in environment/.env")
+            sys.exit(1)
+        print("🔹 Targeting PRODUCTION database.")
+        return "Production", {"dsn": DATABASE_URL}
+
+    print("🔹 Targeting LOCAL database.")
+    DB_PARAMS = dict(
+        host     = os.getenv("DB_HOST", "localhost"),
+        port     = int(os.getenv("DB_PORT", 5432)),
+        dbname   = os.getenv("DB_NAME"),
+        user     = os.getenv("DB_USER"),
+        password = os.getenv("DB_PASSWORD"),
+    )
+    # Check required local parameters, allowing password to be missing/empty
+    if not all(DB_PARAMS[k] for k in ["host", "port", "dbname", "user"]):
+        print("❌  Set DB_HOST, DB_PORT, DB_NAME, DB_USER in env/.env for local connection (DB_PASSWORD optional)")
+        sys.exit(1)
+    return "Local", DB_PARAMS
+
+# ── import manifest ───────────────────────────────────────────────────────────
+# One content hash per line for every record already committed to this target
+# DB, so re-runs over a growing processed_snippets.json only normalize and
+# send the new records. Hashes are appended only after the transaction
+# commits; a crash in between just means those rows are re-sent (and skipped
+# by ON CONFLICT) next time.
+manifest_path   = None
+imported_hashes = set()
+new_hashes      = []
+manifest_reset  = False     # --full: the first save truncates the manifest
+
+def record_hash(rec):
+    return hashlib.sha1(json.dumps(rec, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def load_manifest(target):
+    global manifest_path, imported_hashes, new_hashes, manifest_reset
+    manifest_path   = DATA_DIR / MANIFEST_FILE.format(target=target)
+    imported_hashes = set()
+    new_hashes      = []
+    manifest_reset  = args.full
+    if not args.full and manifest_path.exists():
+        with manifest_path.open(encoding="utf-8") as f:
+            imported_hashes = {line.strip() for line in f if line.strip()}
+        print(f"🔹 Manifest {manifest_path.name}: {len(imported_hashes)} record(s) already imported (--full to re-send)")
+
+def save_manifest():
+    """Call only after the import transaction has committed."""
+    global manifest_reset
+    with manifest_path.open("w" if manifest_reset else "a", encoding="utf-8") as f:
+        for h in new_hashes:
+            f.write(h + "\n")
+    manifest_reset = False
+    new_hashes.clear()
+
+# ── near-duplicate index ──────────────────────────────────────────────────────
+# MinHash/LSH over every snippet already in the table plus each accepted
+# incoming one; exact repeats are left to ON CONFLICT (text).
+near_dup_index  = None
+near_dup_texts  = {}       # index key → snippet text, for the report
+near_dup_report = None
+near_dup_keys   = itertools.count()    # index keys for rows of this run
+
+def build_near_dup_index(conn):
+    global near_dup_index, near_dup_texts, near_dup_report, near_dup_keys
+    near_dup_index, near_dup_texts, near_dup_report = None, {}, None
+    near_dup_keys = itertools.count()
+    if args.near_dupes == 'off':
+        return
+    threshold = NEAR_DUP_THRESHOLD if args.near_dup_threshold is None else args.near_dup_threshold
+    near_dup_index = NearDupIndex(threshold)
+    # named cursor = server-side, so the table is streamed rather than fetched whole
+    with conn.cursor(name="near_dup_scan") as scan:
+        scan.itersize = 5000
+        scan.execute("SELECT id, text FROM public.snippets")
+        for sid, text in scan:
+            near_dup_index.add(sid, text)
+            near_dup_texts[sid] = text
+    print(f"🔹 Near-duplicate index: {len(near_dup_index)} existing snippet(s), threshold {threshold}")
+    near_dup_report = (DATA_DIR / NEAR_DUP_FILE).open("w", encoding="utf-8")
+
+def is_near_duplicate(text):
+    """True if `text` should be dropped as a near-duplicate (only ever in reject mode)."""
+    if near_dup_index is None:
+        return False
+    key   = f"new:{next(near_dup_keys)}"
+    match = near_dup_index.add_unless_duplicate(key, text)
+    if match is None:
+        near_dup_texts[key] = text
+        return False
+    other = near_dup_texts[match[0]]
+    if other == text:
+        return False                      # exact repeat – ON CONFLICT handles it
+    stats["near_dupes"] += 1
+    near_dup_report.write(json.dumps({"text": text, "similar_to": other, "similarity": round(match[1], 3),
+                                      "action": args.near_dupes}, ensure_ascii=False) + "\n")
+    return args.near_dupes == 'reject'
+
+# ── build rows ────────────────────────────────────────────────────────────────
+def new_records(snippets):
+    """Records not yet in the manifest (cheap hash check before any normalization)."""
+    for s in snippets:
+        stats["read"] += 1
+        h = record_hash(s)
+        if h in imported_hashes:
+            stats["unchanged"] += 1
+            continue
+        imported_hashes.add(h)
+        new_hashes.append(h)
+        yield s
+
+def build_rows(snippets, workers=None):
+    # normalization may run on a process pool; near-dup checks stay here,
+    # in order, because each accepted row is added to the shared index
+    for row in iter_rows(new_records(snippets), workers=workers or args.workers, edges=edges):
+        if row is None:
+            stats["skipped"] += 1
+            continue
+        if is_near_duplicate(row[0]):
+            continue
+        stats["prepared"] += 1
+        yield row if features else row[:len(BASE_COLS)]
+
+def report_near_dupes():
+    if near_dup_report is None:
+        return
+    near_dup_report.close()
+    verb = "rejected" if args.near_dupes == 'reject' else "flagged (still imported)"
+    print(f"🔹 {stats['near_dupes']} near-duplicate(s) {verb} – see {DATA_DIR / NEAR_DUP_FILE}")
+
+# ── bulk insert / upsert ──────────────────────────────────────────────────────
+BASE_COLS = ("text", "source", "category", "difficulty",
+             "created_at", "word_count", "character_count", "is_princeton_themed",
+             "princeton_course_url", "term_code", "course_id", "course_name")
+
+def statements(cols):
+    """(insert, staging, copy, merge) SQL writing these columns."""
+    names = ", ".join(cols)
+    insert_sql = f"""
+INSERT INTO public.snippets ({names})
+VALUES %s
+ON CONFLICT (text)           -- treat duplicate text as identical snippet
+DO NOTHING;
+"""
+    # COPY loader: stream every row into a temp table in one round-trip, then
+    # merge set-based and count what actually went in.
+    staging_sql = f"""
+CREATE TEMP TABLE snippets_staging ON COMMIT DROP AS
+SELECT {names} FROM public.snippets WITH NO DATA;
+"""
+    copy_sql  = f"COPY snippets_staging ({names}) FROM STDIN"
+    merge_sql = f"""
+WITH inserted AS (
+    INSERT INTO public.snippets ({names})
+    SELECT {names} FROM snippets_staging
+    ON CONFLICT (text) DO NOTHING
+    RETURNING 1
+)
+SELECT (SELECT COUNT(*) FROM snippets_staging), (SELECT COUNT(*) FROM inserted);
+"""
+    return insert_sql, staging_sql, copy_sql, merge_sql
+
+# reset by use_schema() once the DB has been checked
+cols = (*BASE_COLS, *FEATURE_COLUMNS)
+insert_sql, staging_sql, copy_sql, merge_sql = statements(cols)
+
+def use_schema(cur):
+    """
+    Read the quantile edges and pick the columns to write. Without migration 21
+    the feature columns are skipped and every row falls back to the char-count
+    tiers, so an import still works before the server has been migrated.
+    """
+    global edges, features, cols, insert_sql, staging_sql, copy_sql, merge_sql
+    features = has_feature_schema(cur)
+    if features:
+        edges = load_edges(cur)
+    else:
+        edges = {}
+        print("⚠️  snippets.difficulty_score / snippet_difficulty_edges missing – importing without "
+              "difficulty features (char-count tiers); run `npm run migrate` to enable them")
+    cols = (*BASE_COLS, *FEATURE_COLUMNS) if features else BASE_COLS
+    insert_sql, staging_sql, copy_sql, merge_sql = statements(cols)
+
+def _copy_field(v):
+    """One value in COPY text format (tab-separated, \\N = NULL)."""
+    if v is None:
+        return "\\N"
+    if isinstance(v, bool):
+        return "t" if v else "f"
+    return (str(v).replace("\\", "\\\\").replace("\t", "\\t")
+                  .replace("\n", "\\n").replace("\r", "\\r"))
+
+class CopyStream:
+    """File-like view over the row generator that copy_expert() can read() from."""
+
+    def __init__(self, rows):
+        self._lines = ("\t".join(map(_copy_field, r)) + "\n" for r in rows)
+        self._buf   = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buf) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buf += line
+        if size < 0:
+            out, self._buf = self._buf, ""
+        else:
+            out, self._buf = self._buf[:size], self._buf[size:]
+        return out
+
+
+def load_rows(conn, cur, rows):
+    """Returns (staged, inserted) for the COPY loader, (None, None) for execute_values."""
+    if args.loader == 'values':
+        from psycopg2.extras import execute_values
+        execute_values(cur, insert_sql, rows, page_size=100)
+        return None, None
+    cur.execute(staging_sql)
+    cur.copy_expert(copy_sql, CopyStream(rows))
+    cur.execute(merge_sql)
+    return cur.fetchone()
+
+def report(staged, inserted, target):
+    print(f"🔹 Prepared {stats['prepared']} row(s) for upsert (skipped {stats['skipped']} invalid, "
+          f"{stats['unchanged']} already imported per manifest)")
+    report_near_dupes()
+    if staged is None:
+        print(f"✅  Inserted (or skipped dupes) successfully into {target} DB.")
+    else:
+        print(f"✅  {target} DB: imported {inserted} new snippet(s) "
+              f"({staged - inserted} already present, skipped).")
+
+# ── ENTRY POINT ───────────────────────────────────────────────────────────────
+def run(run_args, records=None):
+    """
+    Import `records` (any iterable of processed-snippet dicts, e.g. what
+    extract.run(collect=True) returned) or, by default, the --file / processed_snippets.json
+    stream. Returns the stats dict.
+    """
+    global args, stats
+    args  = run_args
+    stats = {"read": 0, "prepared": 0, "skipped": 0, "near_dupes": 0, "unchanged": 0}
+    target, params = connection_params(args.production)
+
+    # Records are streamed straight from disk into the loader, so memory use
+    # stays flat no matter how large the file is.
+    file_path = args.file or DATA_DIR / PROCESSED_FILE
+    if records is None:
+        if not file_path.exists():
+            print(f"❌  Could not read {file_path}: file not found")
+            sys.exit(1)
+        print(f"🔹 Streaming snippets from {file_path}")
+        records = iter_records(file_path)
+    else:
+        print("🔹 Importing snippets handed over in-process")
+
+    load_manifest("production" if args.production else f"local-{params['dbname']}")
+
+    import psycopg2
+    try:
+        with psycopg2.connect(**params) as conn, conn.cursor() as cur:
+            use_schema(cur)
+            build_near_dup_index(conn)
+            report(*load_rows(conn, cur, build_rows(records)), target)
+            sync_selection_pool(cur)
+        save_manifest()
+    except json.JSONDecodeError as e:
+        print(f"❌  Could not read {file_path}: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌  DB error: {e}")
+        sys.exit(1)
+    return stats
+
+# ── streaming (pipeline.py stream) ────────────────────────────────────────────
+# extract hands every finished comment's records to StreamLoader.put(); a
+# background thread commits them in micro-batches of --micro-batch rows (or
+# whatever arrived within --flush-seconds). The queue holds at most
+# --queue-batches batches, so a slow database blocks the producer instead of
+# piling records up in memory (under --concurrency the wait happens on a worker
+# thread, see extract.async_mark_done, so in-flight requests keep going). Each batch is its own transaction and appends
+# its hashes to the manifest only after the commit, and extract journals every
+# comment as usual – a crash loses the DB writes of everything still queued
+# (up to --queue-batches batches) plus the batch in flight, and the next plain
+# `import` run sends exactly those records again.
+_FLUSH = object()     # sentinel: drain and stop
+
+class StreamLoader:
+    def __init__(self, conn, target, micro_batch, queue_batches, flush_seconds):
+        self.conn          = conn
+        self.target        = target
+        self.micro_batch   = micro_batch
+        self.flush_seconds = flush_seconds
+        self.queue         = queue.Queue(maxsize=micro_batch * queue_batches)
+        self.error         = None
+        self.batches       = 0
+        self.inserted      = 0
+        self.blocked       = 0.0     # seconds the producer waited on a full queue
+        self._blocked_lock = threading.Lock()    # put() may run on several executor threads
+        self._thread       = threading.Thread(target=self._run, name="stream-loader", daemon=True)
+        self._thread.start()
+
+    def put(self, records):
+        """
+        Queue one comment's records; blocks while the queue is full. False once
+        the loader failed. Thread-safe: the asyncio engine calls it via
+        asyncio.to_thread so a full queue never stalls the event loop.
+        """
+        for rec in records:
+            if self.error is not None:
+                return False
+            try:
+                self.queue.put_nowait(rec)
+                continue
+            except queue.Full:
+                pass
+            t0 = time.perf_counter()
+            while True:
+                try:
+                    self.queue.put(rec, timeout=1)
+                    break
+                except queue.Full:
+                    if self.error is not None:
+                        return False
+            with self._blocked_lock:
+                self.blocked += time.perf_counter() - t0
+        return True
+
+    def _run(self):
+        batch, deadline = [], None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                rec = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                rec = None
+            if rec is not None and rec is not _FLUSH:
+                batch.append(rec)
+                deadline = deadline or time.monotonic() + self.flush_seconds
+            if batch and (rec is None or rec is _FLUSH or len(batch) >= self.micro_batch):
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    self.conn.rollback()
+                    self.error = e
+                    print(f"❌  DB error in stream loader: {e}")
+                    return
+                batch, deadline = [], None
+            if rec is _FLUSH:
+                return
+
+    def _commit(self, batch):
+        with self.conn.cursor() as cur:
+            staged, inserted = load_rows(self.conn, cur, build_rows(batch, workers=1))
+            sync_selection_pool(cur, check=False, quiet=True)
+        self.conn.commit()
+        save_manifest()
+        self.batches  += 1
+        self.inserted += inserted or 0
+        if staged is None:
+            print(f"    💾 DB batch {self.batches}: {len(batch)} record(s) upserted")
+        else:
+            print(f"    💾 DB batch {self.batches}: {inserted}/{len(batch)} new snippet(s)")
+
+    def close(self):
+        """Flush what is queued, stop the thread, and settle the selection pool."""
+        if self.error is None:
+            self.queue.put(_FLUSH)
+        self._thread.join()
+        try:
+            if self.error is None:
+                with self.conn.cursor() as cur:
+                    sync_selection_pool(cur)
+                self.conn.commit()
+        finally:
+            self.conn.close()
+        report_near_dupes()
+        print(f"{'✅' if self.error is None else '⚠️ '}  {self.target} DB: {self.inserted} new snippet(s) in {self.batches} micro-batch(es) "
+              f"(skipped {stats['skipped']} invalid, {stats['unchanged']} already imported)  |  "
+              f"extract waited {self.blocked:0.1f}s on the DB")
+        return self.error is None
+
+def open_stream(run_args, micro_batch, queue_batches, flush_seconds):
+    """Connect, load the manifest and near-dup index, and start a StreamLoader."""
+    global args, stats
+    args  = run_args
+    stats = {"read": 0, "prepared": 0, "skipped": 0, "near_dupes": 0, "unchanged": 0}
+    target, params = connection_params(args.production)
+    load_manifest("production" if args.production else f"local-{params['dbname']}")
+
+    import psycopg2
+    try:
+        conn = psycopg2.connect(**params)
+        with conn.cursor() as cur:
+            use_schema(cur)
+        build_near_dup_index(conn)
+        conn.commit()
+    except Exception as e:
+        print(f"❌  DB error: {e}")
+        sys.exit(1)
+    print(f"🔹 Streaming into {target} DB in micro-batches of {micro_batch} row(s)")
+    return StreamLoader(conn, target, micro_batch, queue_batches, flush_seconds)
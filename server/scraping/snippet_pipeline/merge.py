@@ -0,0 +1,89 @@
+"""
+merge.py  – combine the outputs of `extract --shard i/N` runs into the one
+processed_snippets.json that import_snippets.py reads.
+
+    python3 server/scraping/pipeline.py merge-shards
+
+Streams the existing data/processed_snippets.json first, then every
+data/shards/*/processed_snippets.json (plus any journal a killed shard never
+compacted), keeping the first record for each snippet text, and swaps the
+result in atomically. Shard outcome logs are appended to
+data/extraction_outcomes.jsonl for the pre-filter and then removed, so running
+the merge twice adds nothing twice. Shards with comments left are listed –
+rerun those shards to finish them.
+"""
+
+import json, os, sys
+from pathlib import Path
+
+from . import DATA_DIR
+from .extract import PROCESSED_SNIPPETS_FILE, RAW_DATA_FILE, JOURNAL_FILE, TMP_SUFFIX
+from .journal import ProgressJournal
+from .jsonstream import iter_records, count_records, dump_records, is_jsonl
+from .prefilter import OUTCOMES_FILE
+
+SHARDS_DIR = "shards"
+
+DESCRIPTION = 'Merge per-shard extract outputs into one processed_snippets.json.'
+
+def add_arguments(parser):
+    parser.add_argument('--shards-dir', type=Path, default=DATA_DIR / SHARDS_DIR,
+                        help='directory holding the <i>-of-<N> shard folders')
+    parser.add_argument('--out', type=Path, default=DATA_DIR / PROCESSED_SNIPPETS_FILE,
+                        help='merged output (existing records are kept)')
+
+def shard_snippets(shard):
+    yield from iter_records(shard / PROCESSED_SNIPPETS_FILE)
+    for _, snips in ProgressJournal(shard / JOURNAL_FILE).replay():
+        yield from snips
+
+def run(args):
+    shards = sorted(d for d in args.shards_dir.glob("*-of-*") if d.is_dir())
+    if not shards:
+        print(f"❌  No shard folders found in {args.shards_dir}")
+        sys.exit(1)
+
+    seen, stats = set(), {"existing": 0, "added": 0, "duplicates": 0}
+
+    def merged():
+        for rec in iter_records(args.out):
+            seen.add(rec.get("text"))
+            stats["existing"] += 1
+            yield rec
+        for d in shards:
+            for rec in shard_snippets(d):
+                text = rec.get("text")
+                if text in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(text)
+                stats["added"] += 1
+                yield rec
+
+    tmp = args.out.with_suffix(args.out.suffix + TMP_SUFFIX)
+    dump_records(tmp, merged(), jsonl=is_jsonl(args.out))
+    os.replace(tmp, args.out)
+
+    # hand the shards' model verdicts to the pre-filter's training log
+    outcomes = DATA_DIR / OUTCOMES_FILE
+    with outcomes.open("a", encoding="utf-8") as out:
+        for d in shards:
+            log = d / OUTCOMES_FILE
+            if log.exists():
+                with log.open(encoding="utf-8") as f:
+                    out.writelines(f)
+                log.unlink()
+
+    unfinished = []
+    for d in shards:
+        raw = d / RAW_DATA_FILE
+        left = count_records(raw) if raw.exists() else 0
+        print(f"🔹 {d.name}: {count_records(d / PROCESSED_SNIPPETS_FILE)} snippet(s), {left} comment(s) left")
+        if left:
+            unfinished.append(d.name)
+
+    print(f"✅ Merged {len(shards)} shard(s) into {args.out}: {stats['added']} new snippet(s) "
+          f"added to {stats['existing']} ({stats['duplicates']} already present / duplicated)")
+    if unfinished:
+        print(f"⚠️  Unfinished shard(s): {', '.join(unfinished)} – rerun them with the same --shard "
+              f"and merge again")
@@ -0,0 +1,120 @@
+"""
+near_dupes.py  – MinHash / LSH index for spotting near-duplicate snippets.
+
+`ON CONFLICT (text)` only catches byte-identical snippets, so the same review
+extracted twice with slightly different typo fixes ends up in the table twice.
+Each snippet is reduced to a set of character shingles, summarised by a
+MinHash signature and bucketed by LSH bands; only snippets sharing a band are
+compared (exact Jaccard on the shingle sets), so building and querying the
+index is roughly linear in the number of snippets instead of quadratic.
+
+    index = NearDupIndex(threshold=0.85)
+    index.add(snippet_id, text)
+    match = index.query(other_text)      # → (snippet_id, similarity) or None
+"""
+
+import re
+
+SHINGLE_SIZE = 5     # characters per shingle
+NUM_PERM     = 96    # MinHash signature length
+BANDS        = 16    # LSH bands × rows = NUM_PERM; P(candidate) ≈ 1-(1-J^6)^16
+ROWS         = NUM_PERM // BANDS
+
+_MASK = (1 << 64) - 1
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def canonical(text):
+    """Lower-case, punctuation-free, whitespace-collapsed text used for shingling."""
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+def shingles(text):
+    t = canonical(text)
+    if len(t) <= SHINGLE_SIZE:
+        return {t} if t else set()
+    return {t[i:i + SHINGLE_SIZE] for i in range(len(t) - SHINGLE_SIZE + 1)}
+
+def signature(shingle_set):
+    """
+    NUM_PERM-slot MinHash signature via one-permutation hashing: every shingle
+    is hashed once and lands in one slot (min kept), instead of being hashed
+    NUM_PERM times. Empty slots borrow the next filled slot's value, tagged
+    with the distance, so short snippets still compare fairly.
+
+    Uses the built-in (per-process salted) str hash – signatures are only
+    ever compared within one run, never stored.
+    """
+    slots = [None] * NUM_PERM
+    for h in map(hash, shingle_set):
+        h &= _MASK
+        b, v = h % NUM_PERM, h // NUM_PERM
+        if slots[b] is None or v < slots[b]:
+            slots[b] = v
+    # walk backwards twice round the ring so each empty slot finds its next filled one
+    sig, nxt, dist = [None] * NUM_PERM, None, 0
+    for i in range(2 * NUM_PERM - 1, -1, -1):
+        b = i % NUM_PERM
+        if slots[b] is not None:
+            nxt, dist = slots[b], 0
+        else:
+            dist += 1
+        if i < NUM_PERM:
+            sig[b] = (nxt, dist)
+    return tuple(sig)
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NearDupIndex:
+    def __init__(self, threshold=0.85):
+        self.threshold = threshold
+        self._buckets  = {}     # (band, band hash values) → [key, ...]
+        self._shingles = {}     # key → shingle set, for verifying candidates
+
+    def __len__(self):
+        return len(self._shingles)
+
+    def _bands(self, sig):
+        for b in range(BANDS):
+            yield (b, sig[b * ROWS:(b + 1) * ROWS])
+
+    def add(self, key, text):
+        sh = shingles(text)
+        if sh:
+            self._insert(key, sh, signature(sh))
+
+    def query(self, text):
+        """Most similar indexed key at or above the threshold, as (key, similarity), else None."""
+        sh = shingles(text)
+        return self._best(sh, signature(sh)) if sh else None
+
+    def add_unless_duplicate(self, key, text):
+        """query() + add() with one signature; a snippet is only indexed if it had no match."""
+        sh = shingles(text)
+        if not sh:
+            return None
+        sig   = signature(sh)
+        match = self._best(sh, sig)
+        if match is None:
+            self._insert(key, sh, sig)
+        return match
+
+    def _insert(self, key, sh, sig):
+        self._shingles[key] = sh
+        for band in self._bands(sig):
+            self._buckets.setdefault(band, []).append(key)
+
+    def _best(self, sh, sig):
+        best, seen = None, set()
+        for band in self._bands(sig):
+            for key in self._buckets.get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                sim = jaccard(sh, self._shingles[key])
+                if sim >= self.threshold and (best is None or sim > best[1]):
+                    best = (key, sim)
+        return best
@@ -0,0 +1,233 @@
+"""
+prefilter.py  – cheap local scoring stage that runs before any paid API call
+in process_evals.py and drops comments that are very unlikely to yield a
+snippet (the prompt rejects bland reviews anyway, we just stop paying for it).
+
+Scorers (pick with `process_evals.py --prefilter NAME`):
+
+  • heuristic  – length, lexical richness, "vivid" signals (caps, !, digits,
+                 quotes, proper nouns, comparisons) minus generic-review words
+  • model      – tiny naive-Bayes classifier trained on past outcomes
+
+Every comment that reaches the model is appended to
+data/extraction_outcomes.jsonl as {"comment_text", "snippets"}; that log is
+the training / evaluation set:
+
+    python3 server/scraping/pipeline.py prefilter train
+    python3 server/scraping/pipeline.py prefilter evaluate --scorer heuristic --threshold 0.3
+"""
+
+import hashlib, json, math, re, sys
+from pathlib import Path
+
+from . import DATA_DIR
+from .jsonstream import iter_records
+
+OUTCOMES_FILE = "extraction_outcomes.jsonl"
+MODEL_FILE    = "prefilter_model.json"
+
+HOLDOUT_PERCENT = 20    # share of outcomes kept out of training for recall estimates
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z']*")
+
+# words that make up most of the "Problem sets were challenging but fair" reviews
+GENERIC_WORDS = {
+    "good", "great", "nice", "fine", "helpful", "interesting", "useful", "fair",
+    "challenging", "hard", "easy", "difficult", "course", "class", "professor",
+    "prof", "lecture", "lectures", "precept", "precepts", "preceptor", "pset",
+    "psets", "problem", "sets", "assignments", "material", "learned", "learn",
+    "lot", "recommend", "take", "start", "early", "office", "hours", "workload",
+    "work", "exam", "exams", "midterm", "final", "overall", "really", "very",
+}
+
+# ── scorers ───────────────────────────────────────────────────────────────────
+def _features(text):
+    words = _WORD_RE.findall(text)
+    lower = [w.lower() for w in words]
+    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    starts = {s.split()[0] for s in sentences if s.split()}
+    return {
+        "n_words"   : len(words),
+        "richness"  : len(set(lower)) / len(lower) if lower else 0.0,
+        "long_words": sum(len(w) > 6 for w in words) / len(words) if words else 0.0,
+        "generic"   : sum(w in GENERIC_WORDS for w in lower) / len(lower) if lower else 0.0,
+        "caps"      : sum(len(w) >= 3 and w.isupper() for w in words),
+        "proper"    : sum(w[0].isupper() and w not in starts and not w.isupper() and w != "I"
+                          for w in words),
+        "exclaim"   : text.count("!"),
+        "digits"    : len(re.findall(r"\d+", text)),
+        "quotes"    : text.count('"') // 2,
+        "compare"   : len(re.findall(r"\b(like|than|imagine|as if|more like)\b", text, re.I)),
+    }
+
+
+class HeuristicScorer:
+    """Hand-weighted score in [0, 1]; no training data needed."""
+    name = "heuristic"
+
+    def score(self, text):
+        f = _features(text)
+        if f["n_words"] < 5:
+            return 0.0
+        length = min(1.0, f["n_words"] / 40)
+        vivid  = min(1.0, 0.25 * min(f["caps"], 2) + 0.15 * min(f["proper"], 3)
+                          + 0.2 * min(f["exclaim"], 2) + 0.1 * min(f["digits"], 2)
+                          + 0.2 * min(f["quotes"], 1) + 0.2 * min(f["compare"], 2))
+        score = (0.35 * length + 0.15 * f["richness"] + 0.1 * f["long_words"]
+                 + 0.4 * vivid - 0.3 * f["generic"])
+        return max(0.0, min(1.0, score))
+
+
+def _tokens(text):
+    f = _features(text)
+    toks = {w.lower() for w in _WORD_RE.findall(text)}
+    toks.add(f"__len_{min(f['n_words'] // 10, 10)}")
+    for k in ("caps", "proper", "exclaim", "digits", "quotes", "compare"):
+        if f[k]:
+            toks.add(f"__{k}")
+    return toks
+
+
+class NaiveBayesScorer:
+    """Bernoulli naive Bayes over words + feature flags; score = P(yields a snippet)."""
+    name = "model"
+
+    def __init__(self, model):
+        self.prior   = model["prior"]        # log P(reject), log P(accept)
+        self.logodds = model["logodds"]      # token → log-odds contribution when present
+        self.base    = model["base"]         # sum of log P(absent|accept) - log P(absent|reject)
+
+    @classmethod
+    def train(cls, examples, alpha=1.0):
+        """examples: iterable of (text, accepted)."""
+        n = [0, 0]
+        df = ({}, {})
+        for text, accepted in examples:
+            c = int(accepted)
+            n[c] += 1
+            for t in _tokens(text):
+                df[c][t] = df[c].get(t, 0) + 1
+        total = n[0] + n[1]
+        prior = [math.log((n[0] + alpha) / (total + 2 * alpha)),
+                 math.log((n[1] + alpha) / (total + 2 * alpha))]
+        logodds, base = {}, 0.0
+        for t in set(df[0]) | set(df[1]):
+            p1 = (df[1].get(t, 0) + alpha) / (n[1] + 2 * alpha)
+            p0 = (df[0].get(t, 0) + alpha) / (n[0] + 2 * alpha)
+            absent = math.log(1 - p1) - math.log(1 - p0)
+            base += absent
+            logodds[t] = math.log(p1) - math.log(p0) - absent
+        return cls({"prior": prior, "logodds": logodds, "base": base,
+                    "examples": total, "accepted": n[1]})
+
+    def to_json(self):
+        return {"prior": self.prior, "logodds": self.logodds, "base": self.base}
+
+    def score(self, text):
+        z = self.prior[1] - self.prior[0] + self.base
+        z += sum(self.logodds.get(t, 0.0) for t in _tokens(text))
+        return 1.0 / (1.0 + math.exp(-max(-50.0, min(50.0, z))))
+
+
+def make_scorer(name, model_path=None):
+    if name == "heuristic":
+        return HeuristicScorer()
+    if name == "model":
+        path = Path(model_path or DATA_DIR / MODEL_FILE)
+        if not path.exists():
+            print(f"❌  No pre-filter model at {path} – train one first with "
+                  f"`python3 server/scraping/pipeline.py prefilter train`.")
+            sys.exit(1)
+        with path.open(encoding="utf-8") as f:
+            return NaiveBayesScorer(json.load(f))
+    raise ValueError(f"unknown prefilter scorer: {name}")
+
+
+# ── outcomes log / evaluation ─────────────────────────────────────────────────
+def _in_holdout(text):
+    h = int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+    return h % 100 < HOLDOUT_PERCENT
+
+def iter_outcomes(path, holdout=None):
+    """Yield (comment_text, accepted) from the outcomes log, optionally one split only."""
+    for rec in iter_records(path):
+        text = rec.get("comment_text", "")
+        if holdout is not None and _in_holdout(text) != holdout:
+            continue
+        yield text, rec.get("snippets", 0) > 0
+
+def estimate_recall(scorer, threshold, outcomes_path):
+    """
+    On the held-out outcomes: share of comments that DID yield a snippet which
+    the scorer would have kept, plus the share of all comments it would drop.
+    Returns (recall, drop_rate, n) or None without labelled data.
+    """
+    kept_pos = pos = dropped = n = 0
+    for text, accepted in iter_outcomes(outcomes_path, holdout=True):
+        keep = scorer.score(text) >= threshold
+        n += 1
+        dropped += not keep
+        if accepted:
+            pos += 1
+            kept_pos += keep
+    if not pos:
+        return None
+    return kept_pos / pos, dropped / n, n
+
+
+class PreFilter:
+    """Threshold gate with counters for the end-of-run report."""
+
+    def __init__(self, scorer, threshold):
+        self.scorer    = scorer
+        self.threshold = threshold
+        self.checked   = 0
+        self.dropped   = 0
+
+    def keep(self, text):
+        self.checked += 1
+        if self.scorer.score(text) >= self.threshold:
+            return True
+        self.dropped += 1
+        return False
+
+    def summary(self, outcomes_path):
+        line = (f"{self.scorer.name} ≥ {self.threshold}: dropped {self.dropped}/{self.checked} "
+                f"comment(s) → {self.dropped} API call(s) saved")
+        est = estimate_recall(self.scorer, self.threshold, outcomes_path)
+        if est:
+            recall, drop_rate, n = est
+            line += (f"  |  est. recall {100 * recall:0.1f}% "
+                     f"(drops {100 * drop_rate:0.1f}% of {n} held-out outcomes)")
+        return line
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+DESCRIPTION = 'Train / evaluate the process_evals.py pre-filter.'
+
+def add_arguments(parser):
+    parser.add_argument('command', choices=['train', 'evaluate'])
+    parser.add_argument('--outcomes', type=Path, default=DATA_DIR / OUTCOMES_FILE)
+    parser.add_argument('--model', type=Path, default=DATA_DIR / MODEL_FILE)
+    parser.add_argument('--scorer', choices=['heuristic', 'model'], default='model')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='evaluate: single threshold (default: sweep 0.1 … 0.9)')
+
+def run(args):
+    if args.command == 'train':
+        model = NaiveBayesScorer.train(iter_outcomes(args.outcomes, holdout=False))
+        with args.model.open("w", encoding="utf-8") as f:
+            json.dump(model.to_json(), f)
+        print(f"✅ Trained on {args.outcomes.name} → {args.model}")
+        args.scorer = 'model'
+
+    scorer = make_scorer(args.scorer, args.model)
+    thresholds = [args.threshold] if args.threshold is not None else [i / 10 for i in range(1, 10)]
+    for t in thresholds:
+        est = estimate_recall(scorer, t, args.outcomes)
+        if est is None:
+            print("⚠️  No accepted comments in the held-out outcomes – nothing to evaluate.")
+            return
+        recall, drop_rate, n = est
+        print(f"  {scorer.name} ≥ {t:0.2f}: recall {100 * recall:5.1f}%  |  "
+              f"calls saved {100 * drop_rate:5.1f}%  (n={n})")
@@ -0,0 +1,147 @@
+"""
+rate_limiter.py  – shared request/token pacing for the OpenAI calls made by
+process_evals.py.
+
+Two token buckets (requests/min and tokens/min) are refilled continuously and
+debited *before* each call, so callers wait a little up front instead of
+firing into a wall of 429s. The buckets start from conservative defaults and
+are re-sized from the `x-ratelimit-*` headers on every response.
+
+The limiter hands out *reservations* (seconds to wait) rather than sleeping
+itself, so the same instance serves both the blocking and the asyncio engine.
+"""
+
+import re, threading, time
+
+HEADROOM = 0.9   # pace to 90% of the advertised limit
+
+# "1s", "6m0s", "20ms", "1h2m3.5s" → seconds
+_DURATION_RE = re.compile(r"([0-9.]+)(ms|h|m|s)")
+_UNIT_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+def parse_reset(value):
+    """Parse an OpenAI reset duration (e.g. '6m0s', '20ms') into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[u] for n, u in parts)
+
+def _int_header(headers, name):
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class _Bucket:
+    """Continuous-refill bucket holding up to one minute of budget."""
+
+    def __init__(self, per_minute):
+        self.resize(per_minute)
+        self.level   = self.capacity
+        self.updated = time.monotonic()
+
+    def resize(self, per_minute):
+        self.capacity = max(1.0, per_minute * HEADROOM)
+        self.rate     = self.capacity / 60.0          # units per second
+        if hasattr(self, "level"):
+            self.level = min(self.level, self.capacity)
+
+    def refill(self, now):
+        self.level   = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Debit `amount` (may go negative) and return seconds until it is covered."""
+        self.refill(now)
+        amount = min(amount, self.capacity)   # a single huge call must still fit
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+
+class RateLimiter:
+    """
+    Paces calls to stay just under the requests/min and tokens/min limits.
+
+        wait = limiter.reserve(est_tokens)     # then sleep(wait) / await asyncio.sleep(wait)
+        ...make the call...
+        limiter.record_call(seconds, headers, est_tokens, used_tokens)
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self._lock         = threading.Lock()
+        self._requests     = _Bucket(requests_per_minute)
+        self._tokens       = _Bucket(tokens_per_minute)
+        self._paused_until = 0.0
+
+        # counters
+        self.calls         = 0
+        self.throttled     = 0
+        self.wait_seconds  = 0.0
+        self.call_seconds  = 0.0
+
+    # ── pacing ────────────────────────────────────────────────────────────────
+    def reserve(self, est_tokens):
+        """Claim budget for one request; returns how long the caller must wait."""
+        with self._lock:
+            now  = time.monotonic()
+            wait = max(self._requests.reserve(1, now),
+                       self._tokens.reserve(est_tokens, now),
+                       self._paused_until - now)
+            wait = max(0.0, wait)
+            self.wait_seconds += wait
+            return wait
+
+    def record_call(self, seconds, headers=None, est_tokens=0, used_tokens=None):
+        """Book a finished call and resync the buckets from its response headers."""
+        with self._lock:
+            self.calls        += 1
+            self.call_seconds += seconds
+            now = time.monotonic()
+            if used_tokens is not None:
+                # give back (or charge) the difference between estimate and reality
+                self._tokens.refill(now)
+                self._tokens.level = min(self._tokens.capacity,
+                                         self._tokens.level + est_tokens - used_tokens)
+            if headers is not None:
+                self._sync(headers, now)
+
+    def record_rate_limited(self, headers=None, fallback=1.0):
+        """A 429 came back: stop everyone until the server says we may resume."""
+        with self._lock:
+            self.throttled += 1
+            now = time.monotonic()
+            retry_after = None
+            if headers is not None:
+                self._sync(headers, now)
+                retry_after = parse_reset(headers.get("retry-after"))
+            if retry_after is None:
+                retry_after = fallback
+            self._paused_until   = max(self._paused_until, now + retry_after)
+            return retry_after
+
+    def _sync(self, headers, now):
+        for kind, bucket in (("requests", self._requests), ("tokens", self._tokens)):
+            limit     = _int_header(headers, f"x-ratelimit-limit-{kind}")
+            remaining = _int_header(headers, f"x-ratelimit-remaining-{kind}")
+            reset     = parse_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+            if limit:
+                bucket.resize(limit)
+            if remaining is not None:
+                bucket.refill(now)
+                # only ever tighten: the server does not see our in-flight reservations
+                bucket.level = min(bucket.level, remaining - (1 - HEADROOM) * (limit or 0))
+                if remaining <= 0 and reset:
+                    self._paused_until = max(self._paused_until, now + reset)
+
+    # ── reporting ─────────────────────────────────────────────────────────────
+    def summary(self):
+        return (f"{self.calls} call(s), {self.throttled} rate‑limited  |  "
+                f"waiting {self.wait_seconds:0.1f}s vs calling {self.call_seconds:0.1f}s")
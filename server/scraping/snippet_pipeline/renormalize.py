@@ -0,0 +1,216 @@
+"""
+renormalize.py  – re-applies the current import rules (snippet_rows.py:
+punctuation normalization, trailing-newline strip, word / character counts,
+difficulty features and difficulty) to the rows already in public.snippets.
+
+    python3 server/scraping/pipeline.py renormalize                 # dry run: diff only
+    python3 server/scraping/pipeline.py renormalize --apply [--production]
+
+The table is read through a named (server-side) cursor in --chunk sized
+fetches on one connection. Changed rows are written back on a second
+connection with one batched UPDATE per chunk, each committed on its own, so
+memory stays flat however big the table is and an interrupted run keeps the
+chunks it finished. A re-run simply finds nothing left to change. A dry run
+is read-only: the texts it would write go into a session-local temp table
+instead, and collisions are checked against that plus the live table, so it
+reports exactly the collisions --apply would hit without locking a single
+row or keeping any planned text in memory.
+
+text is UNIQUE: a row whose new text already belongs to another snippet (or to
+an earlier row of the same run) is left untouched and reported in
+data/renormalize_collisions.jsonl – deleting it would orphan the races that
+reference it. Every planned change is written to data/renormalize_diff.jsonl,
+in dry-run mode too. Difficulty uses the category's stored quantile edges
+(difficulty.py) where there are any. After an --apply run the selection pool is re-synced,
+since changed difficulties move snippets between buckets.
+"""
+
+import json, sys
+
+from . import DATA_DIR
+from .difficulty import FEATURE_COLUMNS, check_schema, load_edges
+from .snippet_rows import clean_text, text_stats
+from .selection_pool import sync as sync_selection_pool
+
+DIFF_FILE      = "renormalize_diff.jsonl"
+COLLISION_FILE = "renormalize_collisions.jsonl"
+SHOW_CHANGES   = 10      # diffs echoed to the console (all go to DIFF_FILE)
+
+FIELDS = ("text", "difficulty", "word_count", "character_count", *FEATURE_COLUMNS)
+
+select_sql = f"""
+SELECT id, category, {", ".join(FIELDS)}
+FROM public.snippets
+ORDER BY id;
+"""
+
+taken_sql = "SELECT id, text FROM public.snippets WHERE text = ANY(%s);"
+
+# dry run: renamed rows are recorded here instead of updated (temp tables are
+# writable inside a READ ONLY transaction)
+planned_sql = "CREATE TEMP TABLE renormalize_planned (id INT PRIMARY KEY, text TEXT NOT NULL);"
+
+plan_insert_sql = "INSERT INTO renormalize_planned (id, text) VALUES %s;"
+
+# taken_sql as it would read after the planned renames: planned texts, plus
+# live texts of rows that are not being renamed away
+planned_taken_sql = """
+SELECT id, text FROM renormalize_planned WHERE text = ANY(%s)
+UNION ALL
+SELECT s.id, s.text FROM public.snippets s
+WHERE s.text = ANY(%s)
+  AND NOT EXISTS (SELECT 1 FROM renormalize_planned p WHERE p.id = s.id);
+"""
+
+update_sql = f"""
+UPDATE public.snippets AS s
+SET {", ".join(f"{f} = v.{f}" for f in FIELDS)}
+FROM (VALUES %s) AS v(id, {", ".join(FIELDS)})
+WHERE s.id = v.id;
+"""
+
+DESCRIPTION = 'Re-apply the current normalization / difficulty rules to existing snippets.'
+
+# Run state: module globals (re)initialised at the start of run().
+args          = None
+stats         = {}
+diff_log      = None
+collision_log = None
+edges         = {}       # category → quantile cut points (snippet_difficulty_edges)
+
+def add_arguments(parser):
+    parser.add_argument('--production', action='store_true',
+                        help='Connect to the production database using DATABASE_URL from .env')
+    parser.add_argument('--apply', action='store_true',
+                        help='Write the changes (default: dry run that only reports the diff)')
+    parser.add_argument('--chunk', type=int, default=1000, metavar='N',
+                        help='rows fetched, compared and updated per round-trip')
+
+def check_arguments(parser, args):
+    if args.chunk < 1:
+        parser.error("--chunk must be >= 1")
+
+def plan(rows):
+    """[(id, new values)] for the rows the current rules would change; new values None = invalid."""
+    cleaned  = [(sid, category, clean_text(text), (text, *current))
+                for sid, category, text, *current in rows]
+    valid    = [c for c in cleaned if c[2] is not None]
+    computed = text_stats([c[2] for c in valid], [c[1] for c in valid], edges)
+    out      = [(sid, None) for sid, _, text, _ in cleaned if text is None]
+    for (sid, _, new_text, old), (wc, cc, diff, feats) in zip(valid, computed):
+        new = (new_text, diff, wc, cc, *feats)
+        if old != new:
+            out.append((sid, new))
+    return out
+
+def _show(sid, old, new):
+    print(f"  id={sid}:")
+    for field, a, b in zip(FIELDS, old, new):
+        if a != b:
+            print(f"    {field}: {a!r} → {b!r}")
+
+def plan_chunk(rows):
+    """[(id, new values)] for the rows in this chunk that need rewriting."""
+    changes = []
+    for sid, new in plan(rows):
+        if new is None:
+            stats["invalid"] += 1
+            print(f"⚠️  id={sid}: text is empty after normalization – left as is")
+            continue
+        changes.append((sid, new))
+    return changes
+
+def write_chunk(cur, changes, old):
+    """Drop text collisions, log the diff, and UPDATE the rest in one statement (--apply) or plan them."""
+    from psycopg2.extras import execute_values
+
+    # UNIQUE(text): who already holds each new text – including rows this run
+    # already rewrote (committed with --apply, planned in a dry run)
+    texts = [new[0] for sid, new in changes if new[0] != old[sid][0]]
+    if args.apply:
+        cur.execute(taken_sql, (texts,))
+    else:
+        cur.execute(planned_taken_sql, (texts, texts))
+    holder  = {text: sid for sid, text in cur.fetchall()}
+    updates = []
+    for sid, new in changes:
+        text  = new[0]
+        other = holder.get(text, sid)
+        if other != sid:
+            stats["collisions"] += 1
+            collision_log.write(json.dumps(
+                {"id": sid, "text": old[sid][0], "normalized": text, "collides_with": other},
+                ensure_ascii=False) + "\n")
+            continue
+        holder[text] = sid
+        updates.append((sid, *new))
+        stats["changed"] += 1
+        diff_log.write(json.dumps({"id": sid, "before": dict(zip(FIELDS, old[sid])),
+                                   "after": dict(zip(FIELDS, new))}, ensure_ascii=False) + "\n")
+        if stats["changed"] <= SHOW_CHANGES:
+            _show(sid, old[sid], new)
+    if args.apply and updates:
+        execute_values(cur, update_sql, updates, page_size=len(updates))
+        stats["updated"] += len(updates)
+    renamed = [(sid, text) for sid, text, *_ in updates if text != old[sid][0]]
+    if not args.apply and renamed:
+        execute_values(cur, plan_insert_sql, renamed, page_size=len(renamed))
+
+def run(run_args):
+    global args, stats, diff_log, collision_log, edges
+    args    = run_args
+    stats   = {"scanned": 0, "changed": 0, "updated": 0, "collisions": 0, "invalid": 0}
+
+    from .load import connection_params
+    target, params = connection_params(args.production)
+    diff_path, collision_path = DATA_DIR / DIFF_FILE, DATA_DIR / COLLISION_FILE
+    print(f"🔹 {'APPLY' if args.apply else 'DRY-RUN'} against {target} DB, {args.chunk} row(s) per chunk")
+
+    import psycopg2
+    try:
+        # reads stream through a named cursor on one connection; every chunk's
+        # writes go to the other, committed per chunk. A dry run's second
+        # connection is READ ONLY and only fills its temp table.
+        with psycopg2.connect(**params) as read_conn, psycopg2.connect(**params) as write_conn, \
+             diff_path.open("w", encoding="utf-8") as diff_log, \
+             collision_path.open("w", encoding="utf-8") as collision_log:
+            with write_conn.cursor() as cur:
+                check_schema(cur)
+                edges = load_edges(cur)
+                if not args.apply:
+                    cur.execute(planned_sql)
+            write_conn.commit()
+            if not args.apply:
+                write_conn.set_session(readonly=True)
+            with read_conn.cursor(name="renormalize_scan") as scan:
+                scan.execute(select_sql)
+                while True:
+                    rows = scan.fetchmany(args.chunk)
+                    if not rows:
+                        break
+                    stats["scanned"] += len(rows)
+                    changes = plan_chunk(rows)
+                    if changes:
+                        with write_conn.cursor() as cur:
+                            write_chunk(cur, changes, {r[0]: r[2:] for r in rows})
+                        if args.apply:
+                            write_conn.commit()
+                    print(f"    … {stats['scanned']} scanned, {stats['changed']} to change, "
+                          f"{stats['collisions']} collision(s)")
+
+            if args.apply and stats["updated"]:
+                with write_conn.cursor() as cur:
+                    sync_selection_pool(cur)
+            elif not args.apply:
+                write_conn.rollback()
+    except Exception as e:
+        print(f"❌  DB error: {e}")
+        sys.exit(1)
+
+    print(f"{'✅' if args.apply else '🔹'} {stats['scanned']} snippet(s) scanned: {stats['changed']} "
+          f"{'updated' if args.apply else 'would change'}, {stats['collisions']} skipped on text "
+          f"collision, {stats['invalid']} invalid")
+    print(f"🔹 Diff: {diff_path}" + (f"  |  collisions: {collision_path}" if stats["collisions"] else ""))
+    if not args.apply and stats["changed"]:
+        print("🔹 DRY-RUN complete. Re-run with --apply to write the changes.")
+    return stats
@@ -0,0 +1,108 @@
+"""
+response_cache.py  – content-addressed on-disk cache of model responses.
+
+Keyed by sha256(normalized comment_text, MODEL_ID, prompt version), so
+re-running process_evals.py over an overlapping term/subject (or the same
+file twice) does not pay for a comment the model has already seen with the
+same prompt. Backed by a single SQLite file with age and size eviction.
+"""
+
+import hashlib, re, sqlite3, threading, time, unicodedata
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    content    TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used  REAL NOT NULL,
+    size       INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+"""
+
+def normalize_comment(text):
+    """Unicode-NFC, whitespace-collapsed, stripped comment text."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+def cache_key(comment_text, model_id, prompt_version):
+    h = hashlib.sha256()
+    for part in (normalize_comment(comment_text), model_id, prompt_version):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """
+    cache.get(key) → raw response content or None
+    cache.put(key, content)
+    """
+
+    def __init__(self, path: Path, max_age_days=None, max_bytes=None):
+        self.path         = Path(path)
+        self.max_age_days = max_age_days
+        self.max_bytes    = max_bytes
+        self._lock        = threading.Lock()
+        self._db          = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+        self.hits    = 0
+        self.misses  = 0
+        self.stores  = 0
+        self.evicted = self.evict()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return row[0]
+
+    def put(self, key, content):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, content, created_at, last_used, size) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, content, now, now, len(content.encode("utf-8"))),
+            )
+            self._db.commit()
+            self.stores += 1
+
+    def evict(self):
+        """Drop entries older than max_age_days, then least-recently-used ones over max_bytes."""
+        removed = 0
+        with self._lock:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self._db.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,)).rowcount
+            if self.max_bytes is not None:
+                total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_bytes:
+                    doomed, freed = [], 0
+                    for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                        if total - freed <= self.max_bytes:
+                            break
+                        doomed.append((key,))
+                        freed += size
+                    self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+                    removed += len(doomed)
+            self._db.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def summary(self):
+        looked_up = self.hits + self.misses
+        rate = 100.0 * self.hits / looked_up if looked_up else 0.0
+        return (f"{self.hits} hit(s), {self.misses} miss(es) ({rate:0.1f}% hit rate), "
+                f"{self.stores} stored, {self.evicted} evicted")
@@ -0,0 +1,117 @@
+"""
+selection_pool.py  – keeps the snippet_pool / snippet_pool_buckets tables
+(migration 20) in step with public.snippets, so Snippet.getRandom can pick a
+random snippet with two index lookups instead of `ORDER BY RANDOM()`.
+
+    python3 server/scraping/pipeline.py sync-pool [--rebuild] [--production]
+
+Every snippet with a category and difficulty holds a dense position
+0..size-1 inside its (category, difficulty, subject) bucket, subject being the
+first three letters of course_name ('' when there is none). Triggers on
+snippets (migration 20) maintain it on every insert / update / delete, so
+sync() – called by the import inside its transaction – is a consistency
+check: it appends snippets the triggers never saw (rows from before the
+migration) and rebuilds from scratch if the pool disagrees with the table.
+"""
+
+import sys
+
+SUBJECT_SQL = "COALESCE(SUBSTRING(s.course_name FROM 1 FOR 3), '')"
+
+exists_sql = "SELECT to_regclass('public.snippet_pool') IS NOT NULL;"
+
+# getRandom's plain SELECTs are not blocked; this only serialises concurrent syncs
+lock_sql = "LOCK TABLE public.snippet_pool_buckets IN EXCLUSIVE MODE;"
+
+stale_sql = f"""
+SELECT EXISTS (
+           SELECT 1 FROM public.snippet_pool p
+           JOIN public.snippets s ON s.id = p.snippet_id
+           WHERE (p.category, p.difficulty, p.subject)
+                 IS DISTINCT FROM (s.category, s.difficulty, {SUBJECT_SQL})
+       )
+    OR (SELECT COALESCE(SUM(size), 0) FROM public.snippet_pool_buckets)
+       <> (SELECT COUNT(*) FROM public.snippet_pool);
+"""
+
+clear_sql = "DELETE FROM public.snippet_pool; DELETE FROM public.snippet_pool_buckets;"
+
+# Number every snippet that has no position yet after the current end of its
+# bucket, insert them, and grow the bucket sizes – all in one statement.
+append_sql = f"""
+WITH missing AS (
+    SELECT s.id, s.category, s.difficulty, {SUBJECT_SQL} AS subject
+    FROM public.snippets s
+    WHERE s.category IS NOT NULL AND s.difficulty IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM public.snippet_pool p WHERE p.snippet_id = s.id)
+),
+numbered AS (
+    SELECT m.id, m.category, m.difficulty, m.subject,
+           COALESCE(b.size, 0)
+             + ROW_NUMBER() OVER (PARTITION BY m.category, m.difficulty, m.subject ORDER BY m.id)
+             - 1 AS position
+    FROM missing m
+    LEFT JOIN public.snippet_pool_buckets b
+           ON (b.category, b.difficulty, b.subject) = (m.category, m.difficulty, m.subject)
+),
+appended AS (
+    INSERT INTO public.snippet_pool (category, difficulty, subject, position, snippet_id)
+    SELECT category, difficulty, subject, position, id FROM numbered
+    RETURNING category, difficulty, subject
+),
+grown AS (
+    INSERT INTO public.snippet_pool_buckets AS b (category, difficulty, subject, size)
+    SELECT category, difficulty, subject, COUNT(*) FROM appended
+    GROUP BY category, difficulty, subject
+    ON CONFLICT (category, difficulty, subject) DO UPDATE SET size = b.size + EXCLUDED.size
+    RETURNING 1
+)
+SELECT (SELECT COUNT(*) FROM appended), (SELECT COUNT(*) FROM grown);
+"""
+
+def sync(cur, rebuild=False, check=True, quiet=False):
+    """
+    Bring the pool up to date inside the caller's transaction. Returns
+    (appended, rebuilt) or None when the tables do not exist yet (migration 20
+    not run – getRandom keeps using the old query). check=False only appends
+    (the stream loader's per-batch sync; the full check runs once at the end).
+    """
+    cur.execute(exists_sql)
+    if not cur.fetchone()[0]:
+        if not quiet:
+            print("⚠️  snippet_pool table missing – run `npm run migrate` to enable fast random selection")
+        return None
+    cur.execute(lock_sql)
+    if check and not rebuild:
+        cur.execute(stale_sql)
+        rebuild = cur.fetchone()[0]
+    if rebuild:
+        cur.execute(clear_sql)
+    cur.execute(append_sql)
+    appended, buckets = cur.fetchone()
+    verb = "Rebuilt" if rebuild else "Updated"
+    if not quiet:
+        print(f"🔹 {verb} selection pool: {appended} snippet(s) positioned in {buckets} bucket(s)")
+    return appended, bool(rebuild)
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+DESCRIPTION = 'Sync (or rebuild) the snippet selection pool used for random snippet lookup.'
+
+def add_arguments(parser):
+    parser.add_argument('--production', action='store_true',
+                        help='Connect to the production database using DATABASE_URL from .env')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Renumber every bucket from scratch instead of appending new snippets')
+
+def run(args):
+    from .load import connection_params
+    target, params = connection_params(args.production)
+
+    import psycopg2
+    try:
+        with psycopg2.connect(**params) as conn, conn.cursor() as cur:
+            sync(cur, rebuild=args.rebuild)
+    except Exception as e:
+        print(f"❌  DB error: {e}")
+        sys.exit(1)
+    print(f"✅  {target} DB selection pool is up to date.")
@@ -0,0 +1,218 @@
+"""
+snippet_rows.py  – turns processed-snippet records into `public.snippets` rows
+for import_snippets.py: text cleanup, punctuation normalization, counts,
+difficulty and registrar-URL parsing.
+
+Everything here is a pure function of one record (the difficulty features
+are just computed a chunk at a time), so with `--workers N` the records are
+normalized in chunks on a process pool while the main process keeps
+streaming finished rows to Postgres.
+"""
+
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from .difficulty import extract_features, bucket
+
+CHUNK_SIZE  = 500    # records per pool task
+QUEUE_DEPTH = 4      # chunks in flight per worker (bounds memory + read-ahead)
+
+# ── helper funcs ──────────────────────────────────────────────────────────────
+def term_and_course_from_url(url: str):
+    """
+    registrar url → (term_code, course_id)
+    e.g. https://registrarapps.princeton.edu/course-evaluation?terminfo=1242&courseinfo=002051
+    """
+    term = None
+    cid  = None
+    m = re.search(r"terminfo=([0-9]{4})", url or "")
+    if m:
+        term = m.group(1)
+    m = re.search(r"courseinfo=([0-9]{5,6})", url or "")
+    if m:
+        cid = m.group(1).zfill(6)
+    return term, cid
+
+def princeton_courses_url(term: str, course_id: str):
+    """term=1242, course_id=002051 → https://www.princetoncourses.com/course/1242002051"""
+    if term and course_id:
+        return f"https://www.princetoncourses.com/course/{term}{course_id}"
+    return None
+
+def strip_trailing_empty_line(text: str) -> str:
+    """Remove one or more trailing newlines (CR/LF) and whitespace-only tail afterwards.
+    Does not modify internal content or spaces on the last non-empty line.
+    """
+    return re.sub(r'(?:\r?\n)+\s*$', '', text or '')
+
+# character mapping for normalize_punctuation (built once, not per call)
+_PUNCT_MAP = {
+    # dashes and minus variants → '-'
+    ord('\u2010'): '-',  # hyphen
+    ord('\u2011'): '-',  # non-breaking hyphen
+    ord('\u2012'): '-',  # figure dash
+    ord('\u2013'): '-',  # en dash
+    ord('\u2014'): '-',  # em dash
+    ord('\u2015'): '-',  # horizontal bar
+    ord('\u2212'): '-',  # minus sign
+    ord('\uFE58'): '-',  # small em dash
+    ord('\uFE63'): '-',  # small hyphen-minus
+    ord('\uFF0D'): '-',  # fullwidth hyphen-minus
+
+    # quotes → straight
+    ord('\u2018'): "'",  # left single
+    ord('\u2019'): "'",  # right single / apostrophe
+    ord('\u201A'): "'",  # single low-9
+    ord('\u201B'): "'",  # single high-reversed-9
+    ord('\u2032'): "'",  # prime
+
+    ord('\u201C'): '"',  # left double
+    ord('\u201D'): '"',  # right double
+    ord('\u201E'): '"',  # double low-9
+    ord('\u201F'): '"',  # double high-reversed-9
+    ord('\u00AB'): '"',  # «
+    ord('\u00BB'): '"',  # »
+    ord('\u2033'): '"',  # double prime
+
+    # bullets / middle dot
+    ord('\u2022'): '-',  # •
+    ord('\u00B7'): '-',  # ·
+
+    # ellipsis
+    ord('\u2026'): '...',
+
+    # spaces → normal space; zero-width removed
+    ord('\u00A0'): ' ',  # NBSP
+    ord('\u2000'): ' ',  # en quad
+    ord('\u2001'): ' ',  # em quad
+    ord('\u2002'): ' ',  # en space
+    ord('\u2003'): ' ',  # em space
+    ord('\u2004'): ' ',  # three-per-em space
+    ord('\u2005'): ' ',  # four-per-em space
+    ord('\u2006'): ' ',  # six-per-em space
+    ord('\u2007'): ' ',  # figure space
+    ord('\u2008'): ' ',  # punctuation space
+    ord('\u2009'): ' ',  # thin space
+    ord('\u200A'): ' ',  # hair space
+    ord('\u202F'): ' ',  # narrow no-break space
+    ord('\u205F'): ' ',  # medium mathematical space
+    ord('\u3000'): ' ',  # ideographic space
+    ord('\u200B'): None, # zero width space → remove
+    ord('\u200C'): None, # zero width non-joiner → remove
+    ord('\u200D'): None, # zero width joiner → remove
+}
+
+def normalize_punctuation(text: str) -> str:
+    """
+    Normalize Unicode punctuation to ASCII-friendly equivalents suitable for typing races.
+    - Map various dashes (em/en/minus/non-breaking) to '-'
+    - Convert curly/smart quotes to straight quotes
+    - Convert ellipsis to '...'
+    - Replace exotic spaces with normal spaces; drop zero-width
+    - Convert common bullets/middle dot to '-'
+    """
+    if not text:
+        return text
+    out = text.translate(_PUNCT_MAP)
+    # collapse multiple spaces introduced by replacements
+    out = re.sub(r"\s+", " ", out)
+    return out.strip()
+
+def difficulty_from_char_count(cc: int) -> int:
+    return 3 if cc > 185 else 2 if cc >= 100 else 1
+
+def clean_text(text):
+    """The stored form of a snippet's text, or None if it is not a usable snippet."""
+    # Validate snippet text strictly: must be a non-empty string and not a placeholder like "[]"
+    if not isinstance(text, str):
+        return None
+    text_clean = strip_trailing_empty_line(text).strip()
+    text_clean = normalize_punctuation(text_clean)
+    if not text_clean or text_clean == "[]":
+        return None
+    return text_clean
+
+def text_stats(texts_clean, categories=None, edges=None):
+    """
+    [(word_count, character_count, difficulty, features)] for a batch of
+    already-cleaned texts. Difficulty comes from the category's quantile cut
+    points when `edges` has them (difficulty.py), else from the char-count tiers.
+    """
+    edges = edges or {}
+    out   = []
+    for text, category, feats in zip(texts_clean, categories or [None] * len(texts_clean),
+                                     extract_features(texts_clean)):
+        cc   = len(text)
+        cuts = edges.get(category)
+        diff = bucket(feats[-1], cuts) if cuts else difficulty_from_char_count(cc)
+        out.append((len(text.split()), cc, diff, feats))
+    return out
+
+# ── record → row ──────────────────────────────────────────────────────────────
+def _row(s, text_clean, wc, cc, diff, feats):
+    term, cid = term_and_course_from_url(s.get("original_url"))
+    pc_url    = princeton_courses_url(term, cid)
+    return (
+        text_clean,
+        s.get("source"),
+        s.get("category"),
+        diff,
+        datetime.utcnow(),            # created_at
+        wc,
+        cc,
+        bool(s.get("is_princeton_themed", False)),
+        pc_url,                       # princeton_course_url
+        term,                         # term_code
+        cid,                          # course_id
+        s.get("course_name"),         # may be None if not scraped yet
+        *feats,                       # difficulty.FEATURE_COLUMNS
+    )
+
+def build_chunk(records, edges=None):
+    """
+    processed-snippet records → insert tuples (None where the text is invalid).
+    Difficulty features are computed for the whole chunk at once; difficulty
+    is bucketed by `edges` (category → quantile cut points, see difficulty.py)
+    and falls back to the char-count tiers for categories without any.
+    """
+    cleaned = [clean_text(s.get("text", "")) for s in records]
+    valid   = [(t, s.get("category")) for s, t in zip(records, cleaned) if t is not None]
+    # Recompute counts and difficulty from the final text to guarantee correctness
+    stats   = iter(text_stats([t for t, _ in valid], [c for _, c in valid], edges))
+    return [None if t is None else _row(s, t, *next(stats)) for s, t in zip(records, cleaned)]
+
+def build_row(s, edges=None):
+    """One processed-snippet record → insert tuple, or None if its text is invalid."""
+    return build_chunk([s], edges)[0]
+
+def _chunks(records, size):
+    chunk = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_rows(records, workers=1, chunk_size=CHUNK_SIZE, edges=None):
+    """
+    build_row() for every record, in input order (None for invalid ones).
+    With workers > 1, chunks are normalized on a process pool; at most
+    workers × QUEUE_DEPTH chunks are pending at once, so the reader never
+    runs far ahead of the DB writer consuming this generator.
+    """
+    if workers <= 1:
+        for chunk in _chunks(records, chunk_size):
+            yield from build_chunk(chunk, edges)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunks(records, chunk_size):
+            pending.append(pool.submit(build_chunk, chunk, edges))
+            if len(pending) >= workers * QUEUE_DEPTH:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
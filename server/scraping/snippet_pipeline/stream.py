@@ -0,0 +1,46 @@
+"""
+stream.py  – extract and import in one pass: every comment's snippets go to
+Postgres in micro-batches while the model calls are still running, instead of
+waiting for processed_snippets.json to be finished.
+
+    python3 server/scraping/pipeline.py stream --concurrency 8 --micro-batch 200 [--production]
+
+Takes every extract and import option. Rows go through the same
+normalization, manifest and near-duplicate checks as `import` (load.py's
+StreamLoader), inline on the loader thread (--workers does not apply). Each micro-batch is one transaction and the selection pool is
+extended with it, so new snippets become playable within seconds. The queue
+between the two sides holds at most --queue-batches batches: if the database
+falls behind, extraction waits rather than buffering.
+
+extract still journals every comment and writes processed_snippets.json, so
+what a crash keeps out of the DB – everything still queued plus the batch in
+flight, up to --queue-batches + 1 batches – is recoverable: a plain `import`
+run afterwards sends exactly those records (the others are in the manifest).
+"""
+
+import sys
+
+DESCRIPTION = 'Both at once: snippets are committed in micro-batches while extraction runs.'
+
+def add_arguments(parser):
+    parser.add_argument('--micro-batch', type=int, default=200, metavar='N',
+                        help='rows per DB transaction')
+    parser.add_argument('--queue-batches', type=int, default=4, metavar='N',
+                        help='micro-batches that may wait for the DB before extraction blocks')
+    parser.add_argument('--flush-seconds', type=float, default=5.0, metavar='SEC',
+                        help='commit a partial batch once its oldest row has waited this long')
+
+def check_arguments(parser, args):
+    if args.micro_batch < 1 or args.queue_batches < 1:
+        parser.error("--micro-batch and --queue-batches must be >= 1")
+
+def run(args):
+    from . import extract, load
+    loader = load.open_stream(args, args.micro_batch, args.queue_batches, args.flush_seconds)
+    try:
+        extract.run(args, sink=loader)
+    finally:
+        ok = loader.close()
+    if not ok:
+        print("⚠️  Some snippets did not reach the DB – run `import` to send them")
+        sys.exit(1)
@@ -0,0 +1,95 @@
+"""
+synthetic.py  – fake course-evaluation corpora in the shape scrape_evals.js
+writes to data/raw_evaluations.json, for benchmarking without a registrar
+session.
+
+    python3 server/scraping/pipeline.py synth-evals --comments 20000 --out /tmp/raw.json
+
+Comments are stitched together from review-like sentence fragments, with a
+realistic share of junk ("N/A", bare numbers, one-liners) so the junk filter
+and pre-filter paths get exercised too. Same seed → same corpus.
+"""
+
+import json, random
+from pathlib import Path
+
+TERM = "1252"
+
+SUBJECTS = ("COS", "MAT", "ECO", "PHY", "ORF", "ENG", "HIS", "MOL", "PSY", "ELE")
+TITLES   = ("Introduction to Programming Systems", "Linear Algebra", "Microeconomic Theory",
+            "Quantum Mechanics", "Probability and Stochastic Systems", "Shakespeare",
+            "Modern Europe", "Genetics", "Cognitive Psychology", "Digital Logic Design")
+
+OPENERS  = ("This class", "The course", "Honestly this class", "Lectures", "The problem sets",
+            "Precepts", "The midterm", "Office hours", "The final project", "Professor Smith")
+VERBS    = ("was", "were", "felt", "ended up being", "is genuinely", "turned out to be")
+JUDGMENTS = ("brutal but worth it", "the best thing I did at Princeton", "a total grind",
+             "surprisingly fun", "way harder than advertised", "a great introduction to the field",
+             "chaotic in the best way", "pretty disorganized", "life-changing, no exaggeration",
+             "fine if you keep up with the readings", "an absolute time sink")
+TAILS    = ("if you start the psets early", "as long as you go to office hours",
+             "even though I cried twice", "and I would take it again", "so plan your semester around it",
+             "but the curve saved me", "and the TAs were amazing", "unless you hate proofs",
+             "especially the last few weeks", "because the lectures were so clear")
+ADVICE   = ("Start the assignments early.", "Go to precept, seriously.", "Do the practice exams.",
+            "Don't take this with three other problem-set classes.", "Read the textbook before lecture.",
+            "Find a good study group.", "Ask questions on Ed, people are super helpful.")
+JUNK     = ("N/A", "n/a", "None", "5", "Good.", "ok", "no comment", "-", "Great class")
+
+JUNK_RATE = 0.08   # share of comments the junk filter should drop outright
+
+def sentence(rnd):
+    s = f"{rnd.choice(OPENERS)} {rnd.choice(VERBS)} {rnd.choice(JUDGMENTS)}"
+    if rnd.random() < 0.7:
+        s += f" {rnd.choice(TAILS)}"
+    return s + rnd.choice((".", ".", ".", "!", " lol."))
+
+def comment_text(rnd):
+    if rnd.random() < JUNK_RATE:
+        return rnd.choice(JUNK)
+    parts = [sentence(rnd) for _ in range(rnd.randint(1, 5))]
+    if rnd.random() < 0.5:
+        parts.insert(rnd.randint(0, len(parts)), rnd.choice(ADVICE))
+    text = " ".join(parts)
+    # a few lower-case / texting-style reviews, like the real data
+    return text.lower() if rnd.random() < 0.1 else text
+
+def synthetic_evaluations(n, seed=0, comments_per_course=12):
+    """`n` comment records in scrape_evals.js's output format."""
+    rnd = random.Random(seed)
+    course = None
+    for i in range(n):
+        if i % comments_per_course == 0:
+            course_id = f"{rnd.randint(0, 999999):06d}"
+            subject   = rnd.choice(SUBJECTS)
+            course = {
+                "course_id"     : course_id,
+                "term"          : TERM,
+                "course_name"   : f"{subject} {rnd.randint(100, 599)}: {rnd.choice(TITLES)}",
+                "evaluation_url": ("https://registrarapps.princeton.edu/course-evaluation"
+                                   f"?terminfo={TERM}&courseinfo={course_id}"),
+                "scores"        : {"Overall Quality of the Course": round(rnd.uniform(2.5, 5.0), 2),
+                                   "Lectures": round(rnd.uniform(2.5, 5.0), 2)},
+            }
+        yield {**course, "comment_text": comment_text(rnd)}
+
+def write_corpus(path: Path, n, seed=0):
+    """Write the corpus as scrape_evals.js does (pretty-printed JSON array)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(list(synthetic_evaluations(n, seed)), indent=2, ensure_ascii=False),
+                    encoding="utf-8")
+    return path
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+DESCRIPTION = 'Generate a synthetic raw_evaluations.json corpus.'
+
+def add_arguments(parser):
+    parser.add_argument('--comments', type=int, default=10_000, metavar='N')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=Path, required=True,
+                        help='output path (do not point this at the real data/raw_evaluations.json)')
+
+def run(args):
+    path = write_corpus(args.out, args.comments, args.seed)
+    print(f"✅  Wrote {args.comments} synthetic comment(s) to {path}")
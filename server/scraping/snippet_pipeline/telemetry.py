@@ -0,0 +1,226 @@
+"""
+telemetry.py  – per-run performance and cost metrics for the extract stage.
+
+Collects request latencies, token usage (from `response.usage`), retries and
+rate-limit waits, plus how many snippets each finished comment yielded.
+Prints a throttled progress line with an ETA while the run is going and
+writes everything as one JSON file at the end, so backfills can be sized and
+cost regressions spotted when MODEL_ID changes.
+
+    metrics = RunMetrics(MODEL_ID, total_comments)
+    metrics.record_request(seconds, response.usage)
+    metrics.record_comment(n_snippets)        # also prints progress now and then
+    metrics.write(path, limiter)
+    metrics.update_quality(path)              # running malformed-response rate per model
+"""
+
+import json, math, time
+from collections import Counter
+from datetime import datetime, timezone
+
+# USD per 1M tokens: (input, cached input, output). Unknown models get no cost.
+MODEL_PRICES = {
+    "gpt-5":       (1.25, 0.125, 10.00),
+    "gpt-5-mini":  (0.25, 0.025,  2.00),
+    "gpt-5-nano":  (0.05, 0.005,  0.40),
+    "gpt-4.1":     (2.00, 0.50,   8.00),
+    "gpt-4.1-mini":(0.40, 0.10,   1.60),
+}
+BATCH_DISCOUNT    = 0.5    # Batch API bills half price
+PROGRESS_INTERVAL = 30     # seconds between progress lines
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def usage_counts(usage):
+    """(prompt, cached, completion) tokens from an SDK usage object or a plain dict."""
+    if usage is None:
+        return 0, 0, 0
+    get = usage.get if isinstance(usage, dict) else (lambda k, d=None: getattr(usage, k, d))
+    details = get("prompt_tokens_details")
+    if isinstance(details, dict):
+        cached = details.get("cached_tokens")
+    else:
+        cached = getattr(details, "cached_tokens", None)
+    return get("prompt_tokens", 0) or 0, cached or 0, get("completion_tokens", 0) or 0
+
+def _round(value, ndigits=4):
+    return None if value is None else round(value, ndigits)
+
+def _fmt_duration(seconds):
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s   = divmod(rem, 60)
+    return f"{h}h{m:02d}m" if h else f"{m}m{s:02d}s"
+
+
+class RunMetrics:
+    def __init__(self, model_id, total_comments, progress_interval=PROGRESS_INTERVAL):
+        self.model_id          = model_id
+        self.total_comments    = total_comments
+        self.progress_interval = progress_interval
+        self.started           = time.monotonic()
+        self.started_at        = datetime.now(timezone.utc)
+        self._last_progress    = self.started
+
+        self.latencies         = []        # seconds per successful request
+        self.requests          = 0
+        self.failed            = 0         # gave up (API error / max retries)
+        self.retries           = 0         # 429s that were retried
+        self.retry_seconds     = 0.0       # back-off slept after those 429s
+        self.prompt_tokens     = 0
+        self.cached_tokens     = 0
+        self.completion_tokens = 0
+        self.cost              = 0.0
+        self.responses         = 0         # fresh model answers validated
+        self.malformed         = 0         # … of which did not match the schema
+        self.refusals          = 0
+        self.comments          = 0
+        self.folded            = 0         # repeated comments folded away before the run (--dedupe)
+        self.snippets          = 0
+        self.per_comment       = Counter() # snippets yielded → number of comments
+
+    # ── recording ─────────────────────────────────────────────────────────────
+    def record_request(self, seconds, usage, batch=False):
+        """One successful completion; `seconds` is None for Batch API results."""
+        self.requests += 1
+        if seconds is not None:
+            self.latencies.append(seconds)
+        prompt, cached, completion = usage_counts(usage)
+        self.prompt_tokens     += prompt
+        self.cached_tokens     += cached
+        self.completion_tokens += completion
+        price = MODEL_PRICES.get(self.model_id)
+        if price is not None:
+            cost = ((prompt - cached) * price[0] + cached * price[1]
+                    + completion * price[2]) / 1_000_000
+            self.cost += cost * (BATCH_DISCOUNT if batch else 1.0)
+
+    def record_retry(self, pause):
+        self.retries       += 1
+        self.retry_seconds += pause
+
+    def record_failure(self):
+        self.failed += 1
+
+    def record_response(self, ok):
+        self.responses += 1
+        if not ok:
+            self.malformed += 1
+
+    def record_refusal(self):
+        self.refusals += 1
+
+    def malformed_rate(self):
+        return self.malformed / self.responses if self.responses else None
+
+    def record_comment(self, n_snippets):
+        self.comments += 1
+        self.snippets += n_snippets
+        self.per_comment[n_snippets] += 1
+        now = time.monotonic()
+        if now - self._last_progress >= self.progress_interval:
+            self._last_progress = now
+            print(self.progress_line(now))
+
+    # ── reporting ─────────────────────────────────────────────────────────────
+    def comments_per_minute(self, now=None):
+        elapsed = (now or time.monotonic()) - self.started
+        return self.comments / elapsed * 60 if elapsed > 0 else 0.0
+
+    def progress_line(self, now=None):
+        rate = self.comments_per_minute(now)
+        left = max(0, self.total_comments - self.comments)
+        eta  = _fmt_duration(left / rate * 60) if rate > 0 else "?"
+        cost = f"  |  ${self.cost:0.2f}" if self.model_id in MODEL_PRICES else ""
+        return (f"⏱️  {self.comments}/{self.total_comments} comment(s)  |  "
+                f"{rate:0.1f}/min  |  ETA {eta}{cost}")
+
+    def summary(self):
+        lat = sorted(self.latencies)
+        p50, p95 = percentile(lat, 50), percentile(lat, 95)
+        latency = f"p50 {p50:0.2f}s / p95 {p95:0.2f}s" if lat else "no timed requests"
+        cost = f"${self.cost:0.4f}" if self.model_id in MODEL_PRICES else "unknown model price"
+        bad = f"{self.malformed}/{self.responses} malformed"
+        if self.refusals:
+            bad += f", {self.refusals} refused"
+        return (f"{self.requests} request(s), {latency}  |  "
+                f"{self.prompt_tokens + self.completion_tokens} token(s), {cost}  |  {bad}  |  "
+                f"{self.comments_per_minute():0.1f} comment(s)/min")
+
+    def as_dict(self, limiter=None):
+        lat = sorted(self.latencies)
+        out = {
+            "model":              self.model_id,
+            "started_at":         self.started_at.isoformat(timespec="seconds"),
+            "elapsed_seconds":    round(time.monotonic() - self.started, 3),
+            "comments":           self.comments,
+            "comments_pending":   max(0, self.total_comments - self.comments),
+            "comments_per_minute": round(self.comments_per_minute(), 2),
+            "comments_folded":    self.folded,
+            "snippets":           self.snippets,
+            "snippets_per_comment": {
+                "mean":      round(self.snippets / self.comments, 3) if self.comments else None,
+                "histogram": {str(k): v for k, v in sorted(self.per_comment.items())},
+            },
+            "requests": {
+                "ok":            self.requests,
+                "failed":        self.failed,
+                "retries":       self.retries,
+                "retry_seconds": round(self.retry_seconds, 3),
+            },
+            "latency_seconds": {
+                "count": len(lat),
+                "mean":  _round(sum(lat) / len(lat) if lat else None),
+                "p50":   _round(percentile(lat, 50)),
+                "p95":   _round(percentile(lat, 95)),
+                "p99":   _round(percentile(lat, 99)),
+                "max":   _round(lat[-1] if lat else None),
+            },
+            "tokens": {
+                "prompt":     self.prompt_tokens,
+                "cached":     self.cached_tokens,
+                "completion": self.completion_tokens,
+            },
+            "responses": {
+                "validated":      self.responses,
+                "malformed":      self.malformed,
+                "refusals":       self.refusals,
+                "malformed_rate": _round(self.malformed_rate()),
+            },
+            "cost_usd": round(self.cost, 6) if self.model_id in MODEL_PRICES else None,
+        }
+        if limiter is not None:
+            out["rate_limiter"] = {
+                "calls":                limiter.calls,
+                "rate_limited":         limiter.throttled,
+                "pacing_wait_seconds":  round(limiter.wait_seconds, 3),
+                "call_seconds":         round(limiter.call_seconds, 3),
+            }
+        return out
+
+    def write(self, path, limiter=None):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.as_dict(limiter), indent=2) + "\n", encoding="utf-8")
+
+    def update_quality(self, path):
+        """Add this run's response counts to the running per-model totals in `path`."""
+        try:
+            totals = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            totals = {}
+        entry = totals.setdefault(self.model_id, {"responses": 0, "malformed": 0, "refusals": 0})
+        entry["responses"] += self.responses
+        entry["malformed"] += self.malformed
+        entry["refusals"]  += self.refusals
+        entry["malformed_rate"] = (round(entry["malformed"] / entry["responses"], 4)
+                                   if entry["responses"] else None)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(totals, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        tmp.replace(path)
+        return entry
@@ -0,0 +1,166 @@
+"""
+Shared fixtures for the snippet_pipeline tests (`python -m pytest server/scraping/tests`).
+
+Every test runs against a scratch data directory; nothing here touches
+server/scraping/data/, the network or a database.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from snippet_pipeline import cli, extract      # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Point the extract stage's data directory at tmp_path."""
+    monkeypatch.setattr(extract, "DATA_DIR", tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    return tmp_path
+
+
+@pytest.fixture
+def extract_args():
+    """argv → parsed + checked `pipeline.py extract` arguments."""
+    def parse(*argv):
+        parser, _ = cli.build_parser("extract")
+        args = parser.parse_args(list(argv))
+        extract.check_arguments(parser, args)
+        return args
+    return parse
+
+
+# ── fake psycopg2 for the loader tests ───────────────────────────────────────
+def _copy_value(field):
+    """Inverse of load._copy_field (COPY text format)."""
+    if field == "\\N":
+        return None
+    out, chars = [], iter(field)
+    for c in chars:
+        if c == "\\":
+            c = {"t": "\t", "n": "\n", "r": "\r", "\\": "\\"}[next(chars)]
+        out.append(c)
+    return "".join(out)
+
+
+class FakeDB:
+    """
+    Just enough of a psycopg2 connection for load.run(): public.snippets is a
+    dict text → row, COPY rows are decoded from the text format, and the
+    `with conn:` block commits (or rolls back) like psycopg2 does.
+    """
+
+    def __init__(self):
+        self.table   = {}        # text → {column: value}
+        self.events  = []        # "commit" / "rollback", in order
+        self.fail    = None      # exception raised by the next COPY
+        self.features = True     # migration 21 (difficulty feature columns) has run
+        self._staged = []
+        self._merged = []
+
+    def connect(self, **params):
+        return _FakeConn(self)
+
+
+class _FakeConn:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.commit() if exc_type is None else self.rollback()
+
+    def cursor(self, name=None):
+        return _FakeCursor(self.db)
+
+    def commit(self):
+        for row in self.db._merged:
+            self.db.table.setdefault(row["text"], row)
+        self.db._merged = []
+        self.db.events.append("commit")
+
+    def rollback(self):
+        self.db._staged, self.db._merged = [], []
+        self.db.events.append("rollback")
+
+    def close(self):
+        pass
+
+
+class _FakeCursor:
+    def __init__(self, db):
+        self.db, self._rows, self.itersize = db, [], 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=None):
+        from snippet_pipeline import load
+        self._rows = []
+        if "information_schema" in sql:
+            self._rows = [(self.db.features,)]
+        elif "to_regclass" in sql:
+            self._rows = [(False,)]                 # no selection pool: sync is skipped
+        elif "SELECT id, text FROM public.snippets" in sql:
+            self._rows = [(i, t) for i, t in enumerate(self.db.table)]
+        elif "CREATE TEMP TABLE snippets_staging" in sql:
+            self.db._staged = []
+        elif sql == load.merge_sql:
+            seen = set(self.db.table)
+            new  = []
+            for row in self.db._staged:
+                if row["text"] not in seen:
+                    seen.add(row["text"])
+                    new.append(row)
+            self.db._merged += new
+            self._rows = [(len(self.db._staged), len(new))]
+
+    def copy_expert(self, sql, stream):
+        from snippet_pipeline import load
+        if self.db.fail is not None:
+            raise self.db.fail
+        data = stream.read()
+        for line in data.splitlines():
+            fields = [_copy_value(f) for f in line.split("\t")]
+            assert len(fields) == len(load.cols)
+            self.db._staged.append(dict(zip(load.cols, fields)))
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+@pytest.fixture
+def fake_db(tmp_path, monkeypatch):
+    """load.run() against FakeDB, with its data directory at tmp_path."""
+    import types
+    from snippet_pipeline import load
+
+    db = FakeDB()
+    monkeypatch.setitem(sys.modules, "psycopg2", types.SimpleNamespace(connect=db.connect))
+    monkeypatch.setattr(load, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(load, "connection_params", lambda production: ("Local", {"dbname": "test"}))
+    return db
+
+
+@pytest.fixture
+def import_args():
+    """argv → parsed `pipeline.py import` arguments."""
+    def parse(*argv):
+        parser, _ = cli.build_parser("import")
+        return parser.parse_args(list(argv))
+    return parse
@@ -0,0 +1,77 @@
+"""--batch end to end through LocalBatchBackend: submit → poll → collect → resume."""
+
+import pytest
+
+from snippet_pipeline import batch_api, extract
+from snippet_pipeline.jsonstream import count_records, dump_records, iter_records
+
+REVIEWS = [
+    "The problem sets were long but every single one of them taught me something new about algorithms.",
+    "Lectures moved quickly, so reading the textbook chapter beforehand made a huge difference for me.",
+    "Office hours were packed the night before each deadline, so start early and go on Mondays instead.",
+]
+
+
+def comments():
+    return [{"course_id": f"00{i}", "term": "1252", "course_name": f"COS 12{i}",
+             "evaluation_url": f"https://example.edu/eval?courseinfo={i}&terminfo=1252",
+             "comment_text": text} for i, text in enumerate(REVIEWS)]
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        batch_api.BatchBackend()
+
+
+def test_batch_backend_requires_batch(extract_args):
+    with pytest.raises(SystemExit):
+        extract_args("--batch-backend", "local")
+
+
+def test_batch_rejects_pack(extract_args, capsys):
+    with pytest.raises(SystemExit):
+        extract_args("--batch", "--pack", "4")
+    assert "--pack" in capsys.readouterr().err
+    assert extract_args("--batch", "--pack", "1").pack == 1
+
+
+def test_submit_poll_collect_resume(data_dir, extract_args, monkeypatch):
+    raw = data_dir / "raw_evaluations.json"
+    dump_records(raw, comments())
+    args = extract_args("--batch", "--batch-backend", "local", "--no-cache")
+    monkeypatch.setattr(extract, "BATCH_POLL_INTERVAL", 0)
+
+    # 1st run: stopped (Ctrl-C) while the batch is still running
+    def still_running(self, batch_id):
+        extract.interrupted = True
+        return {"status": "in_progress", "output_file_id": None, "error_file_id": None, "counts": ""}
+
+    with monkeypatch.context() as m:
+        m.setattr(batch_api.LocalBatchBackend, "status", still_running)
+        extract.run(args)
+
+    state = extract.load_json(data_dir / extract.BATCH_STATE_FILE, None)
+    assert state is not None and len(state["batches"]) == 1
+    assert not state["batches"][0]["done"]
+    assert (data_dir / "batch_requests_0.jsonl").exists()
+    assert count_records(raw) == len(REVIEWS)        # nothing collected yet
+
+    # a plain run refuses to start while the batch is outstanding
+    with pytest.raises(SystemExit):
+        extract.run(extract_args("--no-cache"))
+
+    # 2nd run: resumes the same batch instead of submitting again
+    submitted = []
+    monkeypatch.setattr(batch_api.LocalBatchBackend, "submit",
+                        lambda self, path: submitted.append(path) or "never")
+    assert extract.run(args) is None                 # records are only kept with collect=True
+    assert extract.emitted is None
+
+    assert submitted == []
+    assert not (data_dir / extract.BATCH_STATE_FILE).exists()
+    assert not (data_dir / "batch_requests_0.jsonl").exists()
+    assert count_records(raw) == 0
+    snippets = list(iter_records(data_dir / extract.PROCESSED_SNIPPETS_FILE))
+    assert snippets
+    assert {s["original_course_id"] for s in snippets} <= {c["course_id"] for c in comments()}
+    assert all(s["prompt_version"] == extract.PROMPT_VERSION for s in snippets)
@@ -0,0 +1,135 @@
+"""concurrent engine: --concurrency against fake_openai over HTTP – shared queue, Ctrl-C and the journal."""
+
+import math
+
+import pytest
+
+from snippet_pipeline import extract, fake_openai
+from snippet_pipeline.jsonstream import dump_records, iter_records
+
+
+def comments(n):
+    return [{"course_id": f"{i:03}", "term": "1252", "course_name": f"COS {i:03}",
+             "comment_text": f"Review number {i}: the weekly problem sets were long but they taught "
+                             f"me more than any other course here. Office hours with the TAs were the "
+                             f"best part of the week, and precept {i} was always worth showing up for."}
+            for i in range(n)]
+
+
+CORPUS = comments(9) + [{"course_id": "900", "term": "1252", "comment_text": "  "},
+                        {"course_id": "901", "term": "1252", "comment_text": "N/A"}]
+ASKED  = 9     # the empty and the junk comment are settled without a request
+
+
+def expected(cs):
+    """processed_snippets.json records fake_openai's answers turn into, per comment."""
+    out = []
+    for c in cs:
+        text = c["comment_text"].strip()
+        if text and not extract.is_junk_comment(text):
+            snippets, _ = extract.parse_ai_response(fake_openai.answer(extract.build_messages(text)))
+            out.extend(extract.build_records(c, snippets))
+    return out
+
+
+def key(record):
+    return record["original_course_id"], record["text"]
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """fake_openai on a free port; the AsyncOpenAI client is pointed at it."""
+    servers = []
+
+    def start(**config):
+        server = fake_openai.start(**{"latency": 0.02, "jitter": 0.0, **config})
+        servers.append(server)
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        return server
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def raw(data_dir):
+    path = data_dir / extract.RAW_DATA_FILE
+    dump_records(path, CORPUS)
+    return path
+
+
+def processed(data_dir):
+    return list(iter_records(data_dir / extract.PROCESSED_SNIPPETS_FILE))
+
+
+@pytest.mark.parametrize("pack", [1, 4])
+def test_workers_share_one_queue(data_dir, raw, extract_args, fake_api, pack):
+    server = fake_api()
+    extract.run(extract_args("--no-cache", "--concurrency", "4", "--pack", str(pack)))
+
+    assert server.requests == math.ceil(ASKED / pack)     # no comment is sent twice
+    assert sorted(map(key, processed(data_dir))) == sorted(map(key, expected(CORPUS)))
+    assert list(iter_records(raw)) == []
+    assert not (data_dir / extract.JOURNAL_FILE).exists()
+
+
+def test_rate_limits_are_retried(data_dir, raw, extract_args, fake_api, monkeypatch):
+    monkeypatch.setattr(extract, "INITIAL_DELAY", 0.01)
+    server = fake_api(rate_limit_rate=0.25, error_rate=0.1, retry_after=0.01, seed=2)
+    extract.run(extract_args("--no-cache", "--concurrency", "4"))
+
+    assert server.rate_limited and server.errors
+    assert server.answered == ASKED
+    assert sorted(map(key, processed(data_dir))) == sorted(map(key, expected(CORPUS)))
+
+
+def test_ctrl_c_finishes_in_flight_and_resumes(data_dir, raw, extract_args, fake_api, monkeypatch):
+    server, journal_done = fake_api(), extract._journal_done
+    finished = []
+
+    def ctrl_c_after_three(comment, snippets, prompt_version=None):
+        finished.append(comment)
+        records = journal_done(comment, snippets, prompt_version)
+        if len(finished) == 3:
+            extract._handle_sigint(None, None)
+        return records
+
+    monkeypatch.setattr(extract, "_journal_done", ctrl_c_after_three)
+    extract.run(extract_args("--no-cache", "--concurrency", "3"))
+
+    # the two other workers finish what they already sent, then nobody picks up more
+    assert 3 <= len(finished) <= 5
+    assert server.requests == len(finished)
+    remaining = list(iter_records(raw))
+    assert sorted(map(key, processed(data_dir))) == sorted(map(key, expected(finished)))
+    assert len(remaining) + len(finished) == len(CORPUS)
+
+    monkeypatch.setattr(extract, "_journal_done", journal_done)
+    extract.run(extract_args("--no-cache", "--concurrency", "3"))
+    assert server.requests == ASKED
+    assert sorted(map(key, processed(data_dir))) == sorted(map(key, expected(CORPUS)))
+
+
+def test_journal_holds_exactly_the_recorded_comments(data_dir, raw, extract_args, fake_api, monkeypatch):
+    server, journal_done = fake_api(), extract._journal_done
+    journaled = []
+
+    def killed_on_the_fourth(comment, snippets, prompt_version=None):
+        if len(journaled) == 3:
+            raise RuntimeError("killed")           # the process dies before this one is journaled
+        journaled.append(comment)
+        return journal_done(comment, snippets, prompt_version)
+
+    monkeypatch.setattr(extract, "_journal_done", killed_on_the_fourth)
+    with pytest.raises(RuntimeError):
+        extract.run(extract_args("--no-cache", "--concurrency", "3"))
+    ids = [cid for cid, _ in extract.ProgressJournal(data_dir / extract.JOURNAL_FILE).replay()]
+    assert ids == [extract.comment_id(c) for c in journaled]
+
+    # the next run replays those three and only asks for the rest
+    sent = server.requests
+    monkeypatch.setattr(extract, "_journal_done", journal_done)
+    extract.run(extract_args("--no-cache", "--concurrency", "3"))
+    assert server.requests - sent == ASKED - 3
+    assert sorted(map(key, processed(data_dir))) == sorted(map(key, expected(CORPUS)))
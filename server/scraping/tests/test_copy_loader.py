@@ -0,0 +1,81 @@
+"""COPY loader: text-format encoding, staging counts, and (opt-in) a real Postgres."""
+
+import os
+from datetime import datetime
+
+import pytest
+
+from snippet_pipeline import load
+from snippet_pipeline.jsonstream import dump_records
+from snippet_pipeline.snippet_rows import difficulty_from_char_count
+from conftest import _copy_value
+
+TRICKY = ["tab\there", "new\nline", "carriage\rreturn", "back\\slash", "\\N", "plain ünïcödé"]
+
+
+@pytest.mark.parametrize("value", TRICKY)
+def test_copy_field_round_trip(value):
+    encoded = load._copy_field(value)
+    assert "\t" not in encoded and "\n" not in encoded
+    assert _copy_value(encoded) == value
+
+
+def test_copy_field_types():
+    assert load._copy_field(None) == "\\N"
+    assert (load._copy_field(True), load._copy_field(False)) == ("t", "f")
+    assert load._copy_field(3) == "3"
+
+
+def test_copy_stream_reads_in_pieces():
+    rows   = [(t, None, i) for i, t in enumerate(TRICKY * 50)]
+    stream = load.CopyStream(iter(rows))
+    pieces = iter(lambda: stream.read(17), "")
+    lines  = "".join(pieces).splitlines()
+    assert [tuple(_copy_value(f) for f in l.split("\t")) for l in lines] == \
+        [(t, None, str(i)) for t, _, i in rows]
+
+
+def test_staged_vs_inserted(tmp_path, fake_db, import_args, capsys):
+    recs = [{"text": f"A reasonably long snippet about course {i}, with its own wording {i * 31}."}
+            for i in range(4)]
+    fake_db.table[recs[0]["text"]] = {"text": recs[0]["text"]}     # already in the table
+    dump_records(tmp_path / "in.jsonl", recs)
+    load.run(import_args("--file", str(tmp_path / "in.jsonl"), "--near-dupes", "off"))
+    assert "imported 3 new snippet(s) (1 already present, skipped)" in capsys.readouterr().out
+    assert len(fake_db.table) == 4
+
+
+
+def test_import_before_migration_21(tmp_path, fake_db, import_args, capsys):
+    fake_db.features = False
+    text = "A reasonably long snippet about a course, long enough to count as a real snippet."
+    dump_records(tmp_path / "in.jsonl", [{"text": text, "category": "course-reviews"}])
+    load.run(import_args("--file", str(tmp_path / "in.jsonl"), "--near-dupes", "off"))
+    assert "importing without difficulty features" in capsys.readouterr().out
+    assert load.cols == load.BASE_COLS
+    row = fake_db.table[text]
+    assert set(row) == set(load.BASE_COLS)
+    assert int(row["difficulty"]) == difficulty_from_char_count(len(text))
+
+# ── real database (opt-in) ────────────────────────────────────────────────────
+# SNIPPET_PIPELINE_TEST_DB=1 plus the usual DB_* variables of a migrated local
+# database; everything runs in one transaction that is rolled back.
+@pytest.mark.skipif(not os.getenv("SNIPPET_PIPELINE_TEST_DB"), reason="SNIPPET_PIPELINE_TEST_DB not set")
+def test_copy_merge_against_postgres(import_args):
+    psycopg2 = pytest.importorskip("psycopg2")
+    load.args = import_args()
+    _, params = load.connection_params(False)
+    marker = f"snippet_pipeline test {datetime.utcnow().isoformat()}"
+    row    = lambda text: (text, "test", "test", 1, datetime.utcnow(), 2, len(text), False,
+                           None, None, None, None, *([0.0] * len(load.FEATURE_COLUMNS)))
+    rows   = [row(f"{marker} {t}") for t in TRICKY] + [row(f"{marker} {TRICKY[0]}")]
+    conn = psycopg2.connect(**params)
+    try:
+        with conn.cursor() as cur:
+            staged, inserted = load.load_rows(conn, cur, iter(rows))
+            assert (staged, inserted) == (len(rows), len(TRICKY))
+            cur.execute("SELECT text FROM public.snippets WHERE text LIKE %s", (marker + "%",))
+            assert sorted(t for t, in cur.fetchall()) == sorted(f"{marker} {t}" for t in TRICKY)
+    finally:
+        conn.rollback()
+        conn.close()
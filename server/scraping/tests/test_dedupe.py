@@ -0,0 +1,78 @@
+"""dedupe: canonical copy, cross_listings, junk pass-through and an idempotent re-run."""
+
+import json
+
+import pytest
+
+from snippet_pipeline.dedupe import CROSS_LISTINGS, compact_raw, describe
+from snippet_pipeline.extract import is_junk_comment
+
+REVIEW = "Problem sets were long but the TAs made office hours genuinely useful."
+OTHER  = "Lectures were recorded, so I watched them at double speed most weeks."
+
+
+def comment(course_id, term, text, name=None):
+    return {"course_id": course_id, "term": term, "course_name": name or f"COS {course_id}",
+            "evaluation_url": f"https://example.edu/{term}/{course_id}", "comment_text": text}
+
+
+def raw_file(tmp_path, records):
+    path = tmp_path / "raw_evaluations.json"
+    path.write_text(json.dumps(records, indent=2), encoding="utf-8")
+    return path
+
+
+def read(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def corpus():
+    return [
+        comment("226", "1222", REVIEW),
+        comment("333", "1222", "N/A"),
+        comment("217", "1242", "  " + REVIEW.replace(" ", "\n ") + "\n"),   # same normalized text, newer term
+        comment("226", "1232", OTHER),
+        comment("333", "1232", ""),
+        comment("ECE 206", "1222", REVIEW),                     # a cross-listing of the first
+        comment("333", "1242", "N/A"),
+    ]
+
+
+@pytest.mark.parametrize("canonical, kept", [("latest", ("217", "1242")), ("first", ("226", "1222"))])
+def test_canonical_copy_and_cross_listings(tmp_path, canonical, kept):
+    path  = raw_file(tmp_path, corpus())
+    stats = compact_raw(path, canonical, skip=is_junk_comment)
+    assert stats == {"records": 7, "unique": 2, "junk": 3, "folded": 2}
+
+    records = read(path)
+    review  = [r for r in records if " ".join(r["comment_text"].split()) == REVIEW]
+    assert len(review) == 1
+    assert (review[0]["course_id"], review[0]["term"]) == kept
+    others = {(m["course_id"], m["term"]) for m in review[0][CROSS_LISTINGS]}
+    assert others == {("226", "1222"), ("217", "1242"), ("ECE 206", "1222")} - {kept}
+    assert all(set(m) == {"course_id", "term", "course_name", "evaluation_url"}
+               for m in review[0][CROSS_LISTINGS])
+    assert CROSS_LISTINGS not in next(r for r in records if r["comment_text"] == OTHER)
+
+
+def test_junk_passes_through_untouched(tmp_path):
+    path = raw_file(tmp_path, corpus())
+    compact_raw(path, skip=is_junk_comment)
+    junk = [r for r in read(path) if not r["comment_text"] or is_junk_comment(r["comment_text"])]
+    # repeated junk is neither folded nor given cross_listings
+    assert junk == [corpus()[1], corpus()[4], corpus()[6]]
+
+
+def test_rerun_is_idempotent(tmp_path):
+    path = raw_file(tmp_path, corpus())
+    compact_raw(path, skip=is_junk_comment)
+    once = read(path)
+    stats = compact_raw(path, skip=is_junk_comment)
+    assert read(path) == once
+    assert stats == {"records": 5, "unique": 2, "junk": 3, "folded": 0}
+
+
+def test_describe_reports_junk_apart():
+    line = describe({"records": 7, "unique": 2, "junk": 3, "folded": 2})
+    assert "2 distinct, 3 empty / junk left as is" in line
+    assert "junk" not in describe({"records": 2, "unique": 2, "junk": 0, "folded": 0})
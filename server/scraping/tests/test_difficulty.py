@@ -0,0 +1,68 @@
+"""difficulty: NumPy / pure-Python feature parity, quantile buckets and the fallback tiers."""
+
+import random
+
+import pytest
+
+from snippet_pipeline import difficulty
+from snippet_pipeline.difficulty import FEATURE_COLUMNS, bucket, extract_features
+from snippet_pipeline.snippet_rows import difficulty_from_char_count, text_stats
+
+ALPHABET = ("abcdefghijklmnopqrstuvwxyz" * 3 + "ABCDEFGHIJKLMNOPQRSTUVWXYZ" + "0123456789"
+            + " " * 12 + "\t\n" + ".,;:!?'\"()-" + "éü—“”…")
+
+
+def random_texts(n, seed=20251016):
+    rnd = random.Random(seed)
+    texts = ["".join(rnd.choice(ALPHABET) for _ in range(rnd.randint(0, 240))) for _ in range(n)]
+    # edge cases: empty (also trailing), whitespace-only, single characters, no letters
+    return texts + ["", " ", "  \t ", "a", "A1", "1234 5678", "é", "Hi. ", ""]
+
+
+def test_numpy_and_python_features_agree():
+    np = pytest.importorskip("numpy")
+    texts = random_texts(300)
+    fast, slow = difficulty._features_np(np, texts), difficulty._features_py(texts)
+    assert len(fast) == len(slow) == len(texts)
+    for text, a, b in zip(texts, fast, slow):
+        assert len(a) == len(b) == len(FEATURE_COLUMNS)
+        assert a == pytest.approx(b, abs=1e-4), text
+
+
+def test_extract_features_without_numpy(monkeypatch):
+    texts = random_texts(20)
+    monkeypatch.setattr(difficulty, "_numpy", lambda: None)
+    assert extract_features(texts) == difficulty._features_py(texts)
+    assert extract_features([]) == []
+
+
+def test_harder_text_scores_higher():
+    plain, dense = extract_features([
+        "the class was fun and the labs were easy to follow",
+        "Q3's PDE (Eq. 4.2) took 17+ hrs; CS/ECE majors: beware!",
+    ])
+    score = FEATURE_COLUMNS.index("difficulty_score")
+    assert dense[score] > plain[score]
+
+
+@pytest.mark.parametrize("score, expected", [(0.5, 1), (1.0, 2), (1.5, 2), (2.0, 3), (9.0, 3)])
+def test_bucket_counts_cut_points_at_or_below(score, expected):
+    assert bucket(score, [1.0, 2.0]) == expected
+
+
+def test_text_stats_uses_edges_per_category():
+    texts = ["Short and plain.", "A much longer review; it has 12 digits, CAPS and (punctuation)!" * 2]
+    scores = [f[-1] for f in extract_features(texts)]
+    edges  = {"course-reviews": [scores[0] + 1e-6, scores[1] + 1e-6]}    # each just below a cut …
+    assert [d for _, _, d, _ in text_stats(texts, ["course-reviews"] * 2, edges)] == [1, 2]
+    edges  = {"course-reviews": [min(scores) - 1, min(scores) - 0.5]}    # … or above both
+    assert [d for _, _, d, _ in text_stats(texts, ["course-reviews"] * 2, edges)] == [3, 3]
+
+
+def test_text_stats_falls_back_to_char_count_tiers():
+    texts = ["x" * 50, "y" * 120, "z" * 200]
+    edges = {"course-reviews": [0.0, 0.0]}                  # another category's edges
+    for categories in (["general"] * 3, None):
+        stats = text_stats(texts, categories, edges)
+        assert [d for _, _, d, _ in stats] == [difficulty_from_char_count(len(t)) for t in texts] == [1, 2, 3]
+        assert [(wc, cc) for wc, cc, _, _ in stats] == [(1, 50), (1, 120), (1, 200)]
@@ -0,0 +1,106 @@
+"""Progress journal: a killed run is replayed and compacted on the next start."""
+
+import json
+
+import pytest
+
+from snippet_pipeline import extract
+from snippet_pipeline.fake_openai import answer
+from snippet_pipeline.journal import ProgressJournal
+from snippet_pipeline.jsonstream import dump_records, iter_records
+
+
+def comments(n):
+    return [{"course_id": f"{i:03}", "term": "1252", "course_name": f"COS {i:03}",
+             "comment_text": f"Review number {i}: the weekly problem sets were long but they "
+                             f"taught me more than any other course I have taken here."}
+            for i in range(n)]
+
+
+def test_replay_stops_at_torn_line(tmp_path):
+    journal = ProgressJournal(tmp_path / "journal.jsonl", fsync_every=1)
+    journal.append("a", [{"text": "one"}])
+    journal.append("b", [])
+    journal.close()
+    with (tmp_path / "journal.jsonl").open("a", encoding="utf-8") as f:
+        f.write('{"id": "c", "snippets": [{"te')          # killed mid-write
+    assert list(journal.replay()) == [("a", [{"text": "one"}]), ("b", [])]
+    journal.truncate()
+    assert not (tmp_path / "journal.jsonl").exists()
+    assert list(journal.replay()) == []
+
+
+def test_every_append_reaches_the_file_before_fsync(tmp_path):
+    journal = ProgressJournal(tmp_path / "journal.jsonl", fsync_every=20)
+    for i in range(5):
+        journal.append(str(i), [])
+    # a second reader (the next run after a SIGKILL) already sees all five lines
+    assert [cid for cid, _ in ProgressJournal(tmp_path / "journal.jsonl").replay()] == list("01234")
+    journal.close()
+
+
+def test_killed_run_is_replayed_and_compacted(data_dir, extract_args, monkeypatch):
+    raw = data_dir / extract.RAW_DATA_FILE
+    dump_records(raw, comments(5))
+    calls, kill_at = [], [3]
+
+    def model(messages, *a, **k):
+        calls.append(messages)
+        if len(calls) == kill_at[0]:
+            raise RuntimeError("killed")                 # the process dies mid-run
+        return answer(messages)
+
+    monkeypatch.setattr(extract, "request_content", model)
+    with pytest.raises(RuntimeError):
+        extract.run(extract_args("--no-cache"))
+
+    # nothing was compacted: the two finished comments only live in the journal
+    journal = data_dir / extract.JOURNAL_FILE
+    assert len(journal.read_text(encoding="utf-8").splitlines()) == 2
+    assert len(list(iter_records(raw))) == 5
+    assert not (data_dir / extract.PROCESSED_SNIPPETS_FILE).exists()
+    with journal.open("a", encoding="utf-8") as f:
+        f.write('{"id": "torn')                           # half-written third line
+
+    # next start: replay + compact first, then only the three missing comments are sent
+    calls.clear()
+    kill_at[0] = None
+    records = extract.run(extract_args("--no-cache"), collect=True)
+    assert len(calls) == 3
+    assert not journal.exists()
+    assert list(iter_records(raw)) == []
+
+    processed = list(iter_records(data_dir / extract.PROCESSED_SNIPPETS_FILE))
+    assert records == processed[len(processed) - len(records):]
+    by_course = {r["original_course_id"] for r in processed}
+    expected  = {c["course_id"] for c in comments(5)
+                 if json.loads(answer(extract.build_messages(c["comment_text"])))["snippets"]}
+    assert by_course == expected
+
+
+def test_crash_between_the_swaps_does_not_fold_twice(data_dir, extract_args, monkeypatch):
+    raw = data_dir / extract.RAW_DATA_FILE
+    processed = data_dir / extract.PROCESSED_SNIPPETS_FILE
+    dump_records(raw, comments(4))
+    monkeypatch.setattr(extract, "request_content", lambda messages, *a, **k: answer(messages))
+
+    real_replace = extract.os.replace
+    def replace(src, dst):
+        if dst == processed:
+            raise RuntimeError("killed")                 # raw swapped, processed not yet
+        real_replace(src, dst)
+    monkeypatch.setattr(extract.os, "replace", replace)
+    with pytest.raises(RuntimeError):
+        extract.run(extract_args("--no-cache"))
+    monkeypatch.setattr(extract.os, "replace", real_replace)
+
+    journal = data_dir / extract.JOURNAL_FILE
+    assert not journal.exists()
+    assert (data_dir / (extract.JOURNAL_FILE + ".sealed")).exists()
+    assert list(iter_records(raw)) == []
+
+    # next start finishes the swap; the sealed journal is not replayed again
+    extract.run(extract_args("--no-cache"))
+    texts = [r["text"] for r in iter_records(processed)]
+    assert texts and len(texts) == len(set(texts))
+    assert not (data_dir / (extract.JOURNAL_FILE + ".sealed")).exists()
@@ -0,0 +1,88 @@
+"""jsonstream: both file formats round-trip without loading the file whole."""
+
+import json
+
+import pytest
+
+from snippet_pipeline import jsonstream
+from snippet_pipeline.jsonstream import (count_records, dump_records, iter_records,
+                                         write_records_atomic)
+
+RECORDS = [
+    {"text": "plain", "n": 1},
+    {"text": "unicode – “quotes” and ünïcödé", "nested": {"a": [1, 2, {"b": None}]}},
+    {"text": "brackets ] [ } { and commas , inside strings", "n": 3},
+    {"text": "line\nbreaks\tand \"escapes\" \\", "n": 4},
+]
+
+
+@pytest.mark.parametrize("name", ["records.json", "records.jsonl"])
+def test_round_trip(tmp_path, name):
+    path = tmp_path / name
+    assert dump_records(path, iter(RECORDS)) == len(RECORDS)
+    assert list(iter_records(path)) == RECORDS
+    assert count_records(path) == len(RECORDS)
+
+
+def test_array_layout_matches_json_dump(tmp_path):
+    path = tmp_path / "records.json"
+    dump_records(path, RECORDS)
+    assert path.read_text(encoding="utf-8") == json.dumps(RECORDS, indent=2, ensure_ascii=False)
+    dump_records(path, [])
+    assert json.loads(path.read_text(encoding="utf-8")) == []
+
+
+def test_jsonl_lines(tmp_path):
+    path = tmp_path / "records.jsonl"
+    dump_records(path, RECORDS)
+    assert [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines()] == RECORDS
+
+
+@pytest.mark.parametrize("name", ["records.json", "records.jsonl"])
+def test_records_span_read_chunks(tmp_path, monkeypatch, name):
+    # a tiny read size forces every record across several buffer refills
+    monkeypatch.setattr(jsonstream, "CHUNK_SIZE", 7)
+    path = tmp_path / name
+    many = [{"i": i, "text": "x" * (i % 23)} for i in range(200)]
+    dump_records(path, many)
+    assert list(iter_records(path)) == many
+
+
+def test_format_detected_from_content(tmp_path):
+    # a JSONL payload under a .json name (and vice versa) still reads correctly
+    path = tmp_path / "mislabelled.json"
+    dump_records(path, RECORDS, jsonl=True)
+    assert list(iter_records(path)) == RECORDS
+    path = tmp_path / "mislabelled.jsonl"
+    dump_records(path, RECORDS, jsonl=False)
+    assert list(iter_records(path)) == RECORDS
+
+
+def test_missing_and_empty_files(tmp_path):
+    assert list(iter_records(tmp_path / "absent.json")) == []
+    (tmp_path / "empty.json").write_text("  \n", encoding="utf-8")
+    assert list(iter_records(tmp_path / "empty.json")) == []
+
+
+def test_truncated_array_raises(tmp_path):
+    path = tmp_path / "cut.json"
+    dump_records(path, RECORDS)
+    path.write_text(path.read_text(encoding="utf-8")[:-20], encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_records(path))
+
+
+@pytest.mark.parametrize("text", ['[{"n": 1},', '[{"n": 1},\n  ', '[{"n": 1}', "[", "[\n"])
+def test_array_cut_between_elements_raises(tmp_path, text):
+    # every element parses, but the closing bracket never came
+    path = tmp_path / "cut.json"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError, match="expecting ']'"):
+        list(iter_records(path))
+
+
+def test_write_atomic_leaves_no_tmp(tmp_path):
+    path = tmp_path / "records.jsonl"
+    assert write_records_atomic(path, RECORDS) == len(RECORDS)
+    assert list(iter_records(path)) == RECORDS
+    assert [p.name for p in tmp_path.iterdir()] == ["records.jsonl"]
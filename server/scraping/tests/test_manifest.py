@@ -0,0 +1,65 @@
+"""Import manifest: records are skipped only once their transaction committed."""
+
+import pytest
+
+from snippet_pipeline import load
+from snippet_pipeline.jsonstream import dump_records
+
+
+def snippets(n, start=0):
+    return [{"text": f"Snippet number {i} about a course with quite distinct wording {i * 7919}.",
+             "source": "test", "category": "course-reviews", "difficulty": 1}
+            for i in range(start, start + n)]
+
+
+def manifest(tmp_path):
+    path = tmp_path / load.MANIFEST_FILE.format(target="local-test")
+    return path.read_text(encoding="utf-8").split() if path.exists() else []
+
+
+def test_manifest_written_after_commit(tmp_path, fake_db, import_args, monkeypatch):
+    dump_records(tmp_path / "in.jsonl", snippets(3))
+    order = []
+    save  = load.save_manifest
+    monkeypatch.setattr(load, "save_manifest", lambda: (order.extend(fake_db.events), save()))
+
+    stats = load.run(import_args("--file", str(tmp_path / "in.jsonl")))
+    assert order == ["commit"]                       # saved only after the commit
+    assert stats["prepared"] == 3 and len(fake_db.table) == 3
+    assert len(manifest(tmp_path)) == 3
+
+
+def test_rerun_skips_committed_records(tmp_path, fake_db, import_args):
+    path = tmp_path / "in.jsonl"
+    dump_records(path, snippets(3))
+    load.run(import_args("--file", str(path)))
+
+    dump_records(path, snippets(5))                  # the file grew by two records
+    stats = load.run(import_args("--file", str(path)))
+    assert (stats["unchanged"], stats["prepared"]) == (3, 2)
+    assert len(fake_db.table) == 5
+    assert len(manifest(tmp_path)) == 5
+
+    stats = load.run(import_args("--file", str(path), "--full"))
+    assert (stats["unchanged"], stats["prepared"]) == (0, 5)
+    assert len(manifest(tmp_path)) == 5              # --full rewrites, not appends
+
+
+def test_failed_import_leaves_manifest_untouched(tmp_path, fake_db, import_args):
+    path = tmp_path / "in.jsonl"
+    dump_records(path, snippets(2))
+    load.run(import_args("--file", str(path)))
+    before = manifest(tmp_path)
+
+    dump_records(path, snippets(4))
+    fake_db.fail = RuntimeError("connection lost")
+    with pytest.raises(SystemExit):
+        load.run(import_args("--file", str(path)))
+    assert fake_db.events[-1] == "rollback"
+    assert manifest(tmp_path) == before
+
+    # the next run re-sends exactly the records that never committed
+    fake_db.fail = None
+    stats = load.run(import_args("--file", str(path)))
+    assert (stats["unchanged"], stats["prepared"]) == (2, 2)
+    assert len(fake_db.table) == 4
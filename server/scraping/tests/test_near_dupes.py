@@ -0,0 +1,55 @@
+"""near_dupes: MinHash/LSH candidates, exact-Jaccard threshold."""
+
+import pytest
+
+from snippet_pipeline.near_dupes import NearDupIndex, jaccard, shingles
+
+BASE  = ("The weekly problem sets were brutal, but by the end of the semester I could "
+         "write a recursive descent parser without looking anything up.")
+TYPO  = BASE.replace("recursive descent", "recursive decent")
+OTHER = "Lectures were recorded, so I mostly watched them at double speed before the midterm."
+
+
+def test_formatting_only_differences_are_identical():
+    index = NearDupIndex(threshold=0.8)
+    index.add("a", BASE)
+    key, sim = index.query(BASE.upper().replace(",", "").replace(".", " !"))
+    assert (key, sim) == ("a", 1.0)
+
+
+def test_threshold_is_exact_jaccard():
+    sim = jaccard(shingles(BASE), shingles(TYPO))
+    assert 0.9 < sim < 1.0          # high enough that LSH all but always pairs them
+    below, above = NearDupIndex(threshold=sim), NearDupIndex(threshold=sim + 0.01)
+    for index in (below, above):
+        index.add("a", BASE)
+    assert below.query(TYPO) == ("a", pytest.approx(sim))
+    assert above.query(TYPO) is None
+
+
+def test_unrelated_text_is_not_a_duplicate():
+    index = NearDupIndex(threshold=0.5)
+    index.add("a", BASE)
+    assert index.query(OTHER) is None
+
+
+def test_best_match_wins():
+    index = NearDupIndex(threshold=0.8)
+    index.add("typo", TYPO)
+    index.add("exact", BASE)
+    assert index.query(BASE) == ("exact", 1.0)
+
+
+def test_add_unless_duplicate_only_indexes_new_snippets():
+    index = NearDupIndex(threshold=0.8)
+    assert index.add_unless_duplicate("a", BASE) is None
+    assert index.add_unless_duplicate("b", TYPO)[0] == "a"
+    assert index.add_unless_duplicate("c", OTHER) is None
+    assert len(index) == 2
+
+
+def test_empty_text_is_ignored():
+    index = NearDupIndex()
+    assert index.add_unless_duplicate("a", " ... ") is None
+    assert index.query("") is None
+    assert len(index) == 0
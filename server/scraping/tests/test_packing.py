@@ -0,0 +1,77 @@
+"""--pack: packed-response parsing and the per-review fallback."""
+
+import io
+import json
+
+import pytest
+
+from snippet_pipeline import extract
+from snippet_pipeline.telemetry import RunMetrics
+
+TEXTS = [f"Review {i}: the lectures were clear and the problem sets were fair but long." for i in range(3)]
+SNIP  = {"text": "The lectures were clear.", "difficulty": 1}
+
+
+def test_parse_packed_response():
+    ids = ["r0", "r1"]
+    assert extract.parse_packed_response(json.dumps({"r0": [SNIP], "r1": []}), ids) == \
+        ({"r0": [SNIP], "r1": []}, True)
+    # a missing id or a non-list answer is left out (→ retried singly)
+    assert extract.parse_packed_response(json.dumps({"r0": [SNIP], "r1": "none"}), ids) == \
+        ({"r0": [SNIP]}, False)
+    assert extract.parse_packed_response(json.dumps({"r1": [SNIP]}), ids) == ({"r1": [SNIP]}, False)
+    # a bad item is dropped, the rest of that review kept
+    assert extract.parse_packed_response(json.dumps({"r0": [SNIP, {"text": "x"}], "r1": []}), ids) == \
+        ({"r0": [SNIP], "r1": []}, False)
+
+
+@pytest.mark.parametrize("payload", ['{"r0": [{"text": "cut off', "[]", "null", None])
+def test_parse_packed_response_unusable(payload):
+    assert extract.parse_packed_response(payload, ["r0", "r1"]) == (None, False)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Stub request_content: packed requests get `packed`, single ones a fixed answer."""
+    monkeypatch.setattr(extract, "cache", None)
+    monkeypatch.setattr(extract, "prefilter", None)
+    monkeypatch.setattr(extract, "metrics", RunMetrics(extract.MODEL_ID, len(TEXTS)))
+    monkeypatch.setattr(extract, "outcomes_log", io.StringIO())
+    calls = {"packed": 0, "single": []}
+    state = {"packed": None}
+
+    def request_content(messages, est_tokens=None, response_format=extract.RESPONSE_FORMAT):
+        if response_format is extract.RESPONSE_FORMAT:
+            review = messages[-1]["content"]
+            calls["single"].append(next(i for i, t in enumerate(TEXTS) if t in review))
+            return json.dumps({"snippets": [{"text": "Single answer.", "difficulty": 1}]})
+        calls["packed"] += 1
+        return state["packed"]
+
+    monkeypatch.setattr(extract, "request_content", request_content)
+    return calls, state
+
+
+def test_packed_answer_used_as_is(model):
+    calls, state = model
+    state["packed"] = json.dumps({"r0": [SNIP], "r1": [], "r2": [SNIP]})
+    assert extract.call_ai_to_extract_snippets_packed(TEXTS) == [[SNIP], [], [SNIP]]
+    assert calls == {"packed": 1, "single": []}
+
+
+@pytest.mark.parametrize("packed", ['{"r0": [', "not json", None])
+def test_unusable_packed_answer_falls_back_to_single_calls(model, packed):
+    calls, state = model
+    state["packed"] = packed
+    results = extract.call_ai_to_extract_snippets_packed(TEXTS)
+    assert calls == {"packed": 1, "single": [0, 1, 2]}
+    assert results == [[{"text": "Single answer.", "difficulty": 1}]] * 3
+
+
+def test_missing_reviews_retried_singly(model):
+    calls, state = model
+    state["packed"] = json.dumps({"r0": [SNIP], "r2": "oops"})
+    results = extract.call_ai_to_extract_snippets_packed(TEXTS)
+    assert calls == {"packed": 1, "single": [1, 2]}
+    assert results[0] == [SNIP]
+    assert results[1] == results[2] == [{"text": "Single answer.", "difficulty": 1}]
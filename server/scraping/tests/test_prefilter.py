@@ -0,0 +1,108 @@
+"""prefilter: heuristic scoring, the threshold gate, the recall estimate and scorer construction."""
+
+import json
+
+import pytest
+
+from snippet_pipeline import extract
+from snippet_pipeline.fake_openai import answer
+from snippet_pipeline.jsonstream import dump_records
+from snippet_pipeline.prefilter import (HeuristicScorer, NaiveBayesScorer, PreFilter, _in_holdout,
+                                        estimate_recall, iter_outcomes, make_scorer)
+
+BLAND = [
+    "Problem sets were challenging but fair.",
+    "Great course overall, the professor was really helpful and the problem sets were fair.",
+]
+VIVID = ('Professor Kernighan explained pointers like a magician pulling rabbits out of a hat!! '
+         'I spent 40 hours on the "Tiger" assignment and loved every MINUTE of it.')
+
+
+class FixedScorer:
+    """Scores from a dict, so the tests pick exactly which comments pass."""
+    name = "fixed"
+
+    def __init__(self, scores):
+        self.scores = scores
+
+    def score(self, text):
+        return self.scores[text]
+
+
+def outcomes_file(tmp_path, outcomes):
+    path = tmp_path / "extraction_outcomes.jsonl"
+    dump_records(path, [{"comment_text": t, "snippets": n} for t, n in outcomes])
+    return path
+
+
+def split_texts(n, holdout):
+    """n distinct comment texts that all land in (or all out of) the held-out split."""
+    texts = (f"comment number {i} about the course" for i in range(10_000))
+    return [t for t in texts if _in_holdout(t) == holdout][:n]
+
+
+# ── heuristic scorer ──────────────────────────────────────────────────────────
+def test_heuristic_ranks_vivid_over_bland():
+    scorer = HeuristicScorer()
+    assert all(0.0 <= scorer.score(t) <= 1.0 for t in BLAND + [VIVID])
+    assert max(map(scorer.score, BLAND)) < extract.PREFILTER_THRESHOLD < scorer.score(VIVID)
+    assert scorer.score("Good class, would recommend.") == 0.0     # under five words
+    assert scorer.score("") == 0.0
+
+
+# ── threshold gate ────────────────────────────────────────────────────────────
+def test_threshold_keeps_scores_at_or_above_it(tmp_path):
+    gate = PreFilter(FixedScorer({"low": 0.29, "edge": 0.3, "high": 0.9}), threshold=0.3)
+    assert [gate.keep(t) for t in ("low", "edge", "high", "low")] == [False, True, True, False]
+    assert (gate.checked, gate.dropped) == (4, 2)
+    assert "dropped 2/4 comment(s) → 2 API call(s) saved" in gate.summary(tmp_path / "missing.jsonl")
+
+
+# ── recall estimate ───────────────────────────────────────────────────────────
+def test_estimate_recall_on_held_out_outcomes(tmp_path):
+    held, trained = split_texts(4, True), split_texts(2, False)
+    path = outcomes_file(tmp_path, [(held[0], 2), (held[1], 1), (held[2], 0), (held[3], 0),
+                                    (trained[0], 3), (trained[1], 0)])
+    scorer = FixedScorer({held[0]: 0.9, held[1]: 0.1, held[2]: 0.9, held[3]: 0.1,
+                          trained[0]: 0.0, trained[1]: 0.0})
+    # one of the two held-out comments with snippets survives; half of all four are dropped
+    assert estimate_recall(scorer, 0.5, path) == (0.5, 0.5, 4)
+    assert estimate_recall(scorer, 0.05, path) == (1.0, 0.0, 4)
+    # training only ever sees the other split
+    assert [t for t, _ in iter_outcomes(path, holdout=False)] == trained
+
+    gate = PreFilter(scorer, 0.5)
+    assert "est. recall 50.0% (drops 50.0% of 4 held-out outcomes)" in gate.summary(path)
+
+
+def test_estimate_recall_needs_accepted_examples(tmp_path):
+    held = split_texts(2, True)
+    path = outcomes_file(tmp_path, [(t, 0) for t in held])
+    assert estimate_recall(FixedScorer(dict.fromkeys(held, 1.0)), 0.5, path) is None
+
+
+# ── in extract ────────────────────────────────────────────────────────────────
+def test_dropped_comments_never_reach_the_model(data_dir, extract_args, monkeypatch):
+    calls = []
+    monkeypatch.setattr(extract, "request_content",
+                        lambda messages, *a, **k: calls.append(messages) or answer(messages))
+    dump_records(data_dir / extract.RAW_DATA_FILE,
+                 [{"course_id": "226", "term": "1252", "comment_text": t} for t in BLAND + [VIVID]])
+    extract.run(extract_args("--no-cache", "--prefilter", "heuristic"))
+    assert len(calls) == 1 and VIVID in calls[0][-1]["content"]
+    assert extract.prefilter.dropped == 2
+
+
+def test_missing_model_exits_with_a_hint(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exc:
+        make_scorer("model", tmp_path / "prefilter_model.json")
+    assert exc.value.code == 1
+    assert "prefilter train" in capsys.readouterr().out
+
+
+def test_trained_model_round_trips(tmp_path):
+    model = NaiveBayesScorer.train([("vivid and specific", True), ("good class", False)] * 3)
+    path = tmp_path / "prefilter_model.json"
+    path.write_text(json.dumps(model.to_json()), encoding="utf-8")
+    scorer = make_scorer("model", path)
+    assert scorer.score("vivid and specific") > scorer.score("good class")
@@ -0,0 +1,96 @@
+"""rate_limiter: bucket reservations, header resync and the 429 pause, on a fake clock."""
+
+import pytest
+
+from snippet_pipeline import rate_limiter
+from snippet_pipeline.rate_limiter import HEADROOM, RateLimiter, _Bucket, parse_reset
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    return clock
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("6m0s", 360.0), ("20ms", 0.02), ("1h2m3.5s", 3723.5), ("1.5", 1.5), (2, 2.0),
+    ("soon", None), (None, None),
+])
+def test_parse_reset(value, seconds):
+    assert parse_reset(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+
+def test_bucket_reservation_math(clock):
+    bucket, t = _Bucket(60), clock.now            # 54 per minute after headroom, 0.9 / s
+    assert bucket.capacity == pytest.approx(60 * HEADROOM)
+    assert bucket.reserve(54, now=t) == 0.0       # the full minute up front
+    assert bucket.reserve(9, now=t) == pytest.approx(10.0)
+    assert bucket.reserve(0, now=t + 10) == 0.0   # ten seconds later the debt is paid
+    # one call larger than the whole bucket still only waits for a full bucket
+    assert bucket.reserve(1000, now=t + 10) == pytest.approx(60.0)
+
+
+def test_reserve_paces_requests(clock):
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=1_000_000)
+    assert limiter.reserve(10) == 0.0
+    wait = limiter.reserve(10)                    # 1.8 requests of budget → 0.2 short
+    assert wait == pytest.approx(0.2 / (2 * HEADROOM / 60))
+    assert limiter.wait_seconds == pytest.approx(wait)
+    clock.now += wait
+    assert limiter.reserve(0) == pytest.approx(1 / (2 * HEADROOM / 60))   # the next call, one interval on
+
+
+def test_token_estimate_is_settled_after_the_call(clock):
+    limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=1000)   # 900 tokens
+    assert limiter.reserve(900) == 0.0
+    assert limiter.reserve(100) > 0.0             # budget exhausted by the estimates
+    limiter.record_call(1.0, est_tokens=900, used_tokens=300)
+    limiter.record_call(1.0, est_tokens=100, used_tokens=100)
+    assert limiter.reserve(500) == 0.0            # 600 tokens came back
+    assert limiter.calls == 2 and limiter.call_seconds == 2.0
+
+
+def test_headers_resize_and_tighten(clock):
+    limiter = RateLimiter(requests_per_minute=10, tokens_per_minute=1_000_000)
+    headers = {"x-ratelimit-limit-requests": "600", "x-ratelimit-remaining-requests": "590",
+               "x-ratelimit-limit-tokens": "1000000", "x-ratelimit-remaining-tokens": "999000"}
+    limiter.record_call(0.5, headers)
+    assert limiter._requests.capacity == pytest.approx(600 * HEADROOM)
+    # resizing never hands out budget the server did not report
+    assert limiter._requests.level <= 590 - (1 - HEADROOM) * 600
+
+
+def test_exhausted_window_pauses_until_reset(clock):
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=1_000_000)
+    limiter.record_call(0.5, {"x-ratelimit-limit-requests": "600",
+                              "x-ratelimit-remaining-requests": "0",
+                              "x-ratelimit-reset-requests": "6s"})
+    assert limiter.reserve(1) >= 6.0
+
+
+def test_rate_limited_pause_uses_retry_after(clock):
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=1_000_000)
+    assert limiter.record_rate_limited({"retry-after": "2"}, fallback=8.0) == 2.0
+    assert limiter.throttled == 1
+    assert limiter.reserve(1) == pytest.approx(2.0)
+    clock.now += 1.5
+    assert limiter.reserve(1) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert limiter.reserve(1) == 0.0
+
+
+def test_rate_limited_pause_falls_back_and_never_shortens(clock):
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=1_000_000)
+    assert limiter.record_rate_limited(None, fallback=4.0) == 4.0
+    assert limiter.record_rate_limited({"retry-after": "1"}) == 1.0   # a shorter one …
+    assert limiter.reserve(1) == pytest.approx(4.0)                   # … keeps the longer pause
+    assert limiter.throttled == 2
@@ -0,0 +1,190 @@
+"""renormalize: the diff, text collisions, a read-only dry run and an idempotent re-run."""
+
+import json, sys, types
+
+import pytest
+
+from snippet_pipeline import cli, difficulty, renormalize, selection_pool
+from snippet_pipeline.snippet_rows import text_stats
+
+CLEAN  = 'The professor said "start early" and she meant it, every single week.'
+LONG   = "Weekly problem sets took me about ten hours each, but they were worth it."
+
+
+class SnippetsDB:
+    """
+    public.snippets as {id: row} for renormalize.run(): committed rows, one
+    pending UPDATE set per connection, and the dry run's temp table.
+    """
+
+    def __init__(self, rows):
+        self.rows    = {r["id"]: dict(r) for r in rows}
+        self.updates = 0           # UPDATE statements that reached the table
+
+    def connect(self, **params):
+        return _Conn(self)
+
+
+class _Conn:
+    def __init__(self, db):
+        self.db, self.pending, self.planned, self.readonly = db, {}, {}, False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.commit() if exc_type is None else self.rollback()
+
+    def set_session(self, readonly=False):
+        self.readonly = readonly
+
+    def cursor(self, name=None):
+        return _Cursor(self)
+
+    def commit(self):
+        for sid, row in self.pending.items():
+            self.db.rows[sid].update(row)
+        self.pending = {}
+
+    def rollback(self):
+        self.pending = {}
+
+    def close(self):
+        pass
+
+    def text_holders(self):
+        rows = {sid: {**row, **self.pending.get(sid, {})} for sid, row in self.db.rows.items()}
+        return {row["text"]: sid for sid, row in rows.items()}
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn, self._rows = conn, []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=None):
+        self._rows = []
+        if sql == difficulty.schema_sql:
+            self._rows = [(True,)]
+        elif sql == selection_pool.exists_sql:
+            self._rows = [(False,)]
+        elif sql == renormalize.select_sql:
+            self._rows = [(r["id"], r["category"], *(r[f] for f in renormalize.FIELDS))
+                          for _, r in sorted(self.conn.db.rows.items())]
+        elif sql == renormalize.taken_sql:
+            holders = self.conn.text_holders()
+            self._rows = [(holders[t], t) for t in params[0] if t in holders]
+        elif sql == renormalize.planned_taken_sql:
+            planned = {t: sid for sid, t in self.conn.planned.items()}
+            holders = {t: sid for t, sid in self.conn.text_holders().items()
+                       if sid not in self.conn.planned}
+            self._rows = [(src[t], t) for t in params[0] for src in (planned, holders) if t in src]
+        elif sql != difficulty.edges_sql and sql != renormalize.planned_sql:
+            raise AssertionError(f"unexpected SQL: {sql}")
+
+    def values(self, sql, rows):
+        if sql == renormalize.plan_insert_sql:
+            self.conn.planned.update(rows)
+            return
+        assert sql == renormalize.update_sql and not self.conn.readonly
+        self.conn.db.updates += 1
+        for sid, *new in rows:
+            self.conn.pending[sid] = dict(zip(renormalize.FIELDS, new))
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchmany(self, n):
+        out, self._rows = self._rows[:n], self._rows[n:]
+        return out
+
+
+def row(sid, text, stale=False):
+    wc, cc, diff, feats = text_stats([text], ["course-reviews"])[0]
+    values = dict(zip(renormalize.FIELDS, (text, diff, wc, cc, *feats)))
+    if stale:
+        values["word_count"] = 0
+    return {"id": sid, "category": "course-reviews", **values}
+
+
+@pytest.fixture
+def snippets_db(tmp_path, monkeypatch):
+    from snippet_pipeline import load
+
+    def make(rows):
+        db = SnippetsDB(rows)
+        psycopg2 = types.SimpleNamespace(connect=db.connect)
+        extras   = types.SimpleNamespace(
+            execute_values=lambda cur, sql, rows, page_size=None: cur.values(sql, rows))
+        monkeypatch.setitem(sys.modules, "psycopg2", psycopg2)
+        monkeypatch.setitem(sys.modules, "psycopg2.extras", extras)
+        monkeypatch.setattr(renormalize, "DATA_DIR", tmp_path)
+        monkeypatch.setattr(load, "connection_params", lambda production: ("Local", {"dbname": "test"}))
+        return db
+    return make
+
+
+def renormalize_args(*argv):
+    parser, _ = cli.build_parser("renormalize")
+    args = parser.parse_args(list(argv))
+    renormalize.check_arguments(parser, args)
+    return args
+
+
+def corpus():
+    return [
+        row(1, CLEAN),                                              # already normalized
+        row(2, CLEAN.replace('"start early"', "“start early”")),    # → CLEAN: collides with 1
+        row(3, LONG + "\n"),                                        # → LONG
+        row(4, LONG.replace("ten hours", "ten\u00a0hours")),        # → LONG as well: collides with 3
+        row(5, "Lectures were recorded, so I watched them at double speed.", stale=True),
+    ]
+
+
+def test_dry_run_is_read_only_and_matches_apply(snippets_db, tmp_path):
+    db = snippets_db(corpus())
+    before = {sid: dict(r) for sid, r in db.rows.items()}
+    dry = renormalize.run(renormalize_args("--chunk", "1"))
+    assert db.updates == 0 and db.rows == before
+    dry_diff = (tmp_path / renormalize.DIFF_FILE).read_text(encoding="utf-8")
+    dry_coll = (tmp_path / renormalize.COLLISION_FILE).read_text(encoding="utf-8")
+
+    applied = renormalize.run(renormalize_args("--chunk", "1", "--apply"))
+    assert (tmp_path / renormalize.DIFF_FILE).read_text(encoding="utf-8") == dry_diff
+    assert (tmp_path / renormalize.COLLISION_FILE).read_text(encoding="utf-8") == dry_coll
+    assert {k: dry[k] for k in ("changed", "collisions")} == \
+           {k: applied[k] for k in ("changed", "collisions")} == {"changed": 2, "collisions": 2}
+    assert applied["updated"] == 2
+
+
+def test_diff_and_collisions(snippets_db, tmp_path):
+    db = snippets_db(corpus())
+    renormalize.run(renormalize_args("--apply"))
+    assert db.rows[3]["text"] == LONG
+    assert db.rows[5]["word_count"] == len(db.rows[5]["text"].split())
+    assert db.rows[2]["text"] != CLEAN and db.rows[4]["text"] != LONG     # left untouched
+
+    collisions = [json.loads(l) for l in
+                  (tmp_path / renormalize.COLLISION_FILE).read_text(encoding="utf-8").splitlines()]
+    assert {(c["id"], c["collides_with"]) for c in collisions} == {(2, 1), (4, 3)}
+    diff = [json.loads(l) for l in
+            (tmp_path / renormalize.DIFF_FILE).read_text(encoding="utf-8").splitlines()]
+    assert {d["id"] for d in diff} == {3, 5}
+    assert diff[0]["before"]["text"] == LONG + "\n" and diff[0]["after"]["text"] == LONG
+
+
+def test_rerun_finds_nothing_to_change(snippets_db):
+    db = snippets_db(corpus())
+    renormalize.run(renormalize_args("--apply"))
+    updates = db.updates
+    again = renormalize.run(renormalize_args("--apply"))
+    assert again["changed"] == 0 and again["collisions"] == 2
+    assert db.updates == updates
@@ -0,0 +1,102 @@
+"""response_cache: key normalization, prompt-version invalidation, eviction and the outcomes log."""
+
+import json, time
+
+import pytest
+
+from snippet_pipeline import extract
+from snippet_pipeline.fake_openai import answer
+from snippet_pipeline.jsonstream import dump_records
+from snippet_pipeline.response_cache import ResponseCache, cache_key, normalize_comment
+
+REVIEW = "The weekly problem sets were long, but they taught me more than any lecture did."
+
+
+def test_key_ignores_whitespace_and_unicode_form():
+    composed, decomposed = "Caf\u00e9 hours were great.", "Cafe\u0301 hours were great."
+    assert normalize_comment(f"  {composed}\n") == normalize_comment(decomposed) == composed
+    assert cache_key("a  b\tc\n", "m", "v") == cache_key("a b c", "m", "v")
+    assert cache_key(composed, "m", "v") == cache_key(decomposed, "m", "v")
+    # the text, the model and the prompt version are all part of the key
+    assert len({cache_key("a b", "m", "v"), cache_key("a  c", "m", "v"),
+                cache_key("a b", "n", "v"), cache_key("a b", "m", "w")}) == 4
+    # fields cannot run into each other
+    assert cache_key("ab", "c", "v") != cache_key("a", "bc", "v")
+
+
+def test_get_and_put(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite3")
+    assert cache.get("k") is None
+    cache.put("k", '{"snippets": []}')
+    assert cache.get("k") == '{"snippets": []}'
+    assert (cache.hits, cache.misses, cache.stores) == (1, 1, 1)
+    cache.close()
+    # persisted across runs
+    assert ResponseCache(tmp_path / "cache.sqlite3").get("k") == '{"snippets": []}'
+
+
+def test_evicts_old_entries(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "cache.sqlite3")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now - 3 * 86400)
+    cache.put("old", "x")
+    monkeypatch.setattr(time, "time", lambda: now)
+    cache.put("new", "y")
+    cache.close()
+    cache = ResponseCache(tmp_path / "cache.sqlite3", max_age_days=2)
+    assert cache.evicted == 1
+    assert cache.get("old") is None and cache.get("new") == "y"
+
+
+def test_evicts_least_recently_used_over_size(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    cache = ResponseCache(tmp_path / "cache.sqlite3")
+    for key in "abcd":
+        clock[0] += 1
+        cache.put(key, "x" * 10)
+    clock[0] += 1
+    cache.get("a")                    # a is now the most recently used
+    cache.close()
+    cache = ResponseCache(tmp_path / "cache.sqlite3", max_bytes=25)
+    assert cache.evicted == 2
+    assert [cache.get(k) is not None for k in "abcd"] == [True, False, False, True]
+
+
+# ── through extract ───────────────────────────────────────────────────────────
+@pytest.fixture
+def model(monkeypatch):
+    calls = []
+
+    def request(messages, *a, **k):
+        calls.append(messages)
+        return answer(messages)
+    monkeypatch.setattr(extract, "request_content", request)
+    return calls
+
+
+def extract_once(data_dir, extract_args, text=REVIEW):
+    dump_records(data_dir / extract.RAW_DATA_FILE,
+                 [{"course_id": "226", "term": "1252", "comment_text": text}])
+    extract.run(extract_args())
+
+
+def outcomes(data_dir):
+    path = data_dir / extract.OUTCOMES_FILE
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_cache_hit_skips_the_request_and_the_outcomes_log(data_dir, extract_args, model):
+    extract_once(data_dir, extract_args)
+    extract_once(data_dir, extract_args, f"  {REVIEW.replace(' ', chr(10), 1)}  ")
+    assert len(model) == 1
+    assert len(outcomes(data_dir)) == 1
+
+
+def test_prompt_version_change_misses(data_dir, extract_args, model, monkeypatch):
+    extract_once(data_dir, extract_args)
+    monkeypatch.setattr(extract, "PROMPT_VERSION", "a-new-prompt")
+    extract_once(data_dir, extract_args)
+    assert len(model) == 2
+    extract_once(data_dir, extract_args)
+    assert len(model) == 2
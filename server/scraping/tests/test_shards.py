@@ -0,0 +1,119 @@
+"""shards: a stable, disjoint partition of the raw comments, and merge-shards deduping their outputs."""
+
+import json, os, subprocess, sys
+from pathlib import Path
+
+import pytest
+
+from snippet_pipeline import cli, extract, merge
+from snippet_pipeline.extract import shard_of
+from snippet_pipeline.fake_openai import answer
+from snippet_pipeline.jsonstream import dump_records, iter_records
+
+COUNT = 3
+
+
+def comments():
+    # six courses, two of them with several comments
+    return [{"course_id": f"{course:03}", "term": "1252", "course_name": f"COS {course:03}",
+             "comment_text": f"Review {i} of course {course}: the weekly problem sets were long but "
+                             f"they taught me more than any other course here. Precept was the best "
+                             f"part of the week and I would take it again."}
+            for i, course in enumerate([1, 2, 2, 3, 4, 4, 4, 5, 6])]
+
+
+@pytest.fixture
+def model(monkeypatch):
+    calls = []
+    monkeypatch.setattr(extract, "request_content",
+                        lambda messages, *a, **k: calls.append(messages) or answer(messages))
+    return calls
+
+
+def shard_dir(data_dir, index, count=COUNT):
+    return data_dir / extract.SHARD_DIR.format(index=index, count=count)
+
+
+def run_shards(data_dir, extract_args, *argv):
+    for index in range(COUNT):
+        extract.run(extract_args("--no-cache", "--shard", f"{index}/{COUNT}", *argv))
+
+
+def merge_shards(data_dir, monkeypatch):
+    monkeypatch.setattr(merge, "DATA_DIR", data_dir)
+    parser, _ = cli.build_parser("merge-shards")
+    merge.run(parser.parse_args([]))
+    return list(iter_records(data_dir / extract.PROCESSED_SNIPPETS_FILE))
+
+
+# ── partition ─────────────────────────────────────────────────────────────────
+def test_partition_is_the_same_in_every_process():
+    here = [[shard_of(c, COUNT, by) for c in comments()] for by in ("course", "comment")]
+    # another interpreter with its own hash seed must agree (no reliance on hash())
+    code = ("import json, sys; from snippet_pipeline.extract import shard_of; "
+            "cs = json.load(sys.stdin); "
+            f"print(json.dumps([[shard_of(c, {COUNT}, by) for c in cs] for by in ('course', 'comment')]))")
+    env = {**os.environ, "PYTHONHASHSEED": "12345"}
+    out = subprocess.run([sys.executable, "-c", code], input=json.dumps(comments()), text=True,
+                         capture_output=True, check=True, env=env,
+                         cwd=Path(__file__).resolve().parent.parent)
+    assert json.loads(out.stdout) == here
+    assert all(0 <= s < COUNT for s in here[0] + here[1])
+
+
+def test_shards_are_disjoint_and_cover_the_input(data_dir, extract_args):
+    raw = data_dir / extract.RAW_DATA_FILE
+    dump_records(raw, comments())
+    split = {}
+    for index in range(COUNT):
+        extract.args = extract_args("--shard", f"{index}/{COUNT}")
+        extract.split_shard(raw, data_dir / f"slice-{index}.json")
+        split[index] = list(iter_records(data_dir / f"slice-{index}.json"))
+
+    texts = [c["comment_text"] for cs in split.values() for c in cs]
+    assert sorted(texts) == sorted(c["comment_text"] for c in comments())     # each exactly once
+    for index, cs in split.items():
+        assert {shard_of(c, COUNT) for c in cs} <= {index}
+    # --shard-by course keeps a course's comments together
+    homes = {}
+    for index, cs in split.items():
+        for c in cs:
+            assert homes.setdefault(c["course_id"], index) == index
+
+
+def test_shard_runs_leave_the_shared_input_alone(data_dir, extract_args, model):
+    raw = data_dir / extract.RAW_DATA_FILE
+    dump_records(raw, comments())
+    before = raw.read_bytes()
+    run_shards(data_dir, extract_args)
+    assert raw.read_bytes() == before
+    assert len(model) == len(comments())                # no comment was sent by two shards
+    for index in range(COUNT):
+        assert list(iter_records(shard_dir(data_dir, index) / extract.RAW_DATA_FILE)) == []
+
+
+# ── merge ─────────────────────────────────────────────────────────────────────
+def test_merge_dedupes_overlapping_shard_outputs(data_dir, extract_args, model, monkeypatch):
+    dump_records(data_dir / extract.RAW_DATA_FILE, comments())
+    run_shards(data_dir, extract_args, "--shard-by", "comment")
+    per_shard = [list(iter_records(shard_dir(data_dir, i) / extract.PROCESSED_SNIPPETS_FILE))
+                 for i in range(COUNT)]
+    texts    = [r["text"] for rs in per_shard for r in rs]
+    expected = sorted(set(texts))
+    assert len(expected) < len(texts)        # the shared closing sentence came out of every shard
+
+    # on top of that, shard 1 re-extracted shard 0's output (e.g. an old split) and shard 2
+    # was killed with a journal line that was never compacted
+    overlap = shard_dir(data_dir, 1) / extract.PROCESSED_SNIPPETS_FILE
+    dump_records(overlap, per_shard[1] + per_shard[0])
+    extract.ProgressJournal(shard_dir(data_dir, 2) / extract.JOURNAL_FILE).append("x", per_shard[2][:1])
+
+    merged = merge_shards(data_dir, monkeypatch)
+    assert sorted(r["text"] for r in merged) == expected
+    # the shards' model verdicts reach the shared outcomes log once
+    outcomes = (data_dir / extract.OUTCOMES_FILE).read_text(encoding="utf-8").splitlines()
+    assert len(outcomes) == len(comments())
+
+    # merging again adds nothing
+    assert merge_shards(data_dir, monkeypatch) == merged
+    assert len((data_dir / extract.OUTCOMES_FILE).read_text(encoding="utf-8").splitlines()) == len(outcomes)
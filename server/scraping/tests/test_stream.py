@@ -0,0 +1,49 @@
+"""stream: handing records to the DB loader never stalls the asyncio engine."""
+
+import asyncio, threading
+
+from snippet_pipeline import extract
+from snippet_pipeline.fake_openai import answer
+from snippet_pipeline.jsonstream import dump_records
+
+
+def comments(n):
+    return [{"course_id": f"{i:03}", "term": "1252", "course_name": f"COS {i:03}",
+             "comment_text": f"Review number {i}: the weekly problem sets were long but they "
+                             f"taught me more than any other course I have taken here."}
+            for i in range(n)]
+
+
+class SlowSink:
+    """The first put() blocks (a DB that fell behind) until another request gets out."""
+
+    def __init__(self):
+        self.released = threading.Event()
+        self.timed_out = False
+        self.calls    = 0
+        self.records  = []
+
+    def put(self, records):
+        self.calls += 1
+        if self.calls == 1:
+            self.timed_out = not self.released.wait(timeout=5)
+        self.records.extend(records)
+        return True
+
+
+def test_full_loader_queue_does_not_block_other_requests(data_dir, extract_args, monkeypatch):
+    dump_records(data_dir / extract.RAW_DATA_FILE, comments(6))
+    sink = SlowSink()
+    requests = []
+
+    async def model(messages, *a, **k):
+        requests.append(messages)
+        if len(requests) > 2:
+            sink.released.set()        # only possible while the first put() is still waiting
+        await asyncio.sleep(0.01)
+        return answer(messages)
+
+    monkeypatch.setattr(extract, "async_request_content", model)
+    extract.run(extract_args("--no-cache", "--concurrency", "2"), sink=sink)
+    assert not sink.timed_out
+    assert len(requests) == 6
@@ -0,0 +1,74 @@
+const db = require('../../config/database');
+const SnippetModel = require('../../models/snippet');
+
+// Unlike snippet.test.js this exercises the real getRandom, with only the
+// database mocked: first the snippet_pool draw, then the ORDER BY RANDOM() fallback.
+jest.mock('../../config/database', () => ({
+  query: jest.fn()
+}));
+
+const missingTable = () =>
+  Object.assign(new Error('relation "snippet_pool_buckets" does not exist'), { code: '42P01' });
+
+describe('Snippet.getRandom selection pool', () => {
+  beforeEach(() => {
+    db.query.mockReset();
+    jest.spyOn(console, 'log').mockImplementation(() => {});
+    jest.spyOn(console, 'error').mockImplementation(() => {});
+  });
+
+  afterEach(() => {
+    jest.restoreAllMocks();
+  });
+
+  it('returns the pooled snippet without a fallback query', async () => {
+    db.query.mockResolvedValueOnce({ rows: [{ id: 7, text: 'Pooled snippet\n' }] });
+
+    const snippet = await SnippetModel.getRandom({
+      difficulty: 2, category: 'course-reviews', subject: 'COS'
+    });
+
+    expect(snippet).toEqual({ id: 7, text: 'Pooled snippet' });
+    expect(db.query).toHaveBeenCalledTimes(1);
+    const [query, params] = db.query.mock.calls[0];
+    expect(query).toContain('snippet_pool_buckets');
+    expect(query).toContain('subject = $3');
+    expect(params).toEqual([2, 'course-reviews', 'COS']);
+  });
+
+  it('falls back to ORDER BY RANDOM() when the draw lands on a hole', async () => {
+    db.query
+      .mockResolvedValueOnce({ rows: [] })
+      .mockResolvedValueOnce({ rows: [{ id: 9, text: 'Fallback snippet' }] });
+
+    const snippet = await SnippetModel.getRandom({ difficulty: 1, category: 'general' });
+
+    expect(snippet).toEqual({ id: 9, text: 'Fallback snippet' });
+    expect(db.query).toHaveBeenCalledTimes(2);
+    const [query, params] = db.query.mock.calls[1];
+    expect(query).toBe(
+      'SELECT * FROM snippets WHERE difficulty = $1 AND category = $2 ORDER BY RANDOM() LIMIT 1'
+    );
+    expect(params).toEqual([1, 'general']);
+  });
+
+  it('falls back to ORDER BY RANDOM() when the pool tables are missing', async () => {
+    db.query
+      .mockRejectedValueOnce(missingTable())
+      .mockResolvedValueOnce({ rows: [{ id: 11, text: 'Fallback snippet' }] });
+
+    const snippet = await SnippetModel.getRandom();
+
+    expect(snippet).toEqual({ id: 11, text: 'Fallback snippet' });
+    expect(db.query).toHaveBeenCalledTimes(2);
+    expect(db.query.mock.calls[1][0]).toBe('SELECT * FROM snippets ORDER BY RANDOM() LIMIT 1');
+  });
+
+  it('rethrows other database errors from the pool query', async () => {
+    const timeout = Object.assign(new Error('canceling statement due to statement timeout'), { code: '57014' });
+    db.query.mockRejectedValueOnce(timeout);
+
+    await expect(SnippetModel.getRandom({ category: 'general' })).rejects.toBe(timeout);
+    expect(db.query).toHaveBeenCalledTimes(1);
+  });
+});